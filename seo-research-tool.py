@@ -1,20 +1,42 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+# pandas、BeautifulSoup、openpyxl、selenium、requests、pyarrow等较重的依赖在用到时才导入，
+# 纯HTTP运行和 --help 不需要为它们付出启动时间
 import time
 import random
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, unquote, urlsplit
 import argparse
+import csv
 import logging
 import json
-import yaml
 import os
-from fake_useragent import UserAgent
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import platform
+import re
+import signal
+import tempfile
+import tracemalloc
+import unicodedata
+import uuid
+import gzip
+import hashlib
+import heapq
+import sqlite3
+import sys
+import statistics
+import subprocess
+import bisect
+import contextlib
+import itertools
+import threading
+import socketserver
+from collections import deque, namedtuple
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    etree = None
+    lxml_html = None
 
 # 设置日志
 logging.basicConfig(
@@ -26,484 +48,4880 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
+# httpx会在INFO级别记录每个请求
+logging.getLogger('httpx').setLevel(logging.WARNING)
 
-class SEOResearchTool:
-    def __init__(self, target_domain, delay_min=0.5, delay_max=1.5, region='com', use_browser=False):
+# 谷歌搜索结果页的界面语言
+GOOGLE_HL = 'zh-CN'
+
+# 各搜索引擎的搜索地址，{region} 替换为谷歌的区域
+SEARCH_ENDPOINTS = {
+    'google': 'https://www.google.{region}/search',
+    'bing': 'https://www.bing.com/search',
+}
+
+# 大页模式下各搜索引擎单次请求的最大结果数 (谷歌num参数, 必应count参数)
+MAX_PAGE_SIZE = {
+    'google': 100,
+    'bing': 50,
+}
+
+# 大页请求连续多少次只返回10条结果后，认定搜索引擎忽略了大页参数
+LARGE_PAGE_STRIKES = 3
+
+# 单个结果页最多尝试的次数
+MAX_PAGE_ATTEMPTS = 3
+# 重试退避的基数和上限(秒)，第n次重试等待 [0.5, 1] x min(上限, 基数 x 2^(n-1))，限流时基数加倍
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0
+
+# 没有解析出结果的页面中出现这些标记（不区分大小写）时视为验证码或同意页，按失败重试；
+# 没有这些标记时，第1页之后的空页面只是结果已经到头
+BLOCKED_PAGE_MARKERS = ('/sorry/', 'captcha', 'unusual traffic', 'consent.google.')
+
+# 各搜索引擎的结果选择器
+# css/xpath 为按顺序尝试的候选结果容器选择器，前一个没有结果时才使用下一个
+SERP_SELECTORS = {
+    'google': {
+        'css': ['div[class*="g"]', 'div[data-hveid]', 'div.MjjYud'],
+        'xpath': [
+            '//div[contains(@class, "g")]',
+            '//div[@data-hveid]',
+            '//div[contains(concat(" ", normalize-space(@class), " "), " MjjYud ")]',
+        ],
+        'link_css': 'a[href]',
+        'link_xpath': './/a[@href]',
+        'title_css': 'h3',
+        'title_xpath': './/h3',
+    },
+    'bing': {
+        'css': ['li.b_algo'],
+        'xpath': ['//li[contains(concat(" ", normalize-space(@class), " "), " b_algo ")]'],
+        'link_css': 'a',
+        'link_xpath': './/a',
+        # 必应的标题直接取链接文本
+        'title_css': None,
+        'title_xpath': None,
+    },
+}
+
+
+def _looks_blocked(html_content):
+    """页面是否像验证码或同意页"""
+    if isinstance(html_content, bytes):
+        html_content = html_content.decode('utf-8', 'replace')
+    html_content = html_content.lower()
+    return any(marker in html_content for marker in BLOCKED_PAGE_MARKERS)
+
+
+def _clean_google_link(link):
+    """去掉Google在URL前添加的/url?q=跳转前缀"""
+    if link.startswith('/url?q='):
+        link = link.split('/url?q=')[1].split('&')[0]
+    return link
+
+
+class SERPExtractor:
+    """
+    搜索结果提取引擎
+
+    默认使用lxml后端：整页只解析一次，并用预编译的XPath一次性取出
+    (页内排名, 标题, URL)。lxml未安装或解析失败时回退到BeautifulSoup。
+
+    谷歌的候选容器会互相嵌套，这里只保留恰好含一个标题的最外层容器，
+    并按规范化URL去重后再编号，保证排名与页面上真实的自然结果一致。
+    """
+
+    BACKENDS = ('auto', 'lxml', 'bs4')
+
+    def __init__(self, backend='auto'):
         """
-        初始化SEO研究工具
+        参数:
+            backend (str): 解析后端 ("auto", "lxml", "bs4")
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的解析后端: {backend}")
+
+        if backend == 'bs4':
+            self.backend = 'bs4'
+        elif lxml_html is None:
+            if backend == 'lxml':
+                logger.warning("未安装lxml，解析将回退到BeautifulSoup")
+            self.backend = 'bs4'
+        else:
+            self.backend = 'lxml'
+
+        self._compiled = {}
+        if self.backend == 'lxml':
+            for engine, selectors in SERP_SELECTORS.items():
+                self._compiled[engine] = {
+                    'containers': [etree.XPath(x) for x in selectors['xpath']],
+                    'link': etree.XPath(selectors['link_xpath']),
+                    'title': etree.XPath(selectors['title_xpath']) if selectors['title_xpath'] else None,
+                }
+
+    def extract(self, html_content, search_engine):
+        """
+        从搜索结果页中提取结果
+
+        参数:
+            html_content (str): 搜索结果页HTML
+            search_engine (str): 搜索引擎 ("google", "bing")
+
+        返回:
+            list: [(页内排名, 标题, URL), ...]，页内排名从1开始
+        """
+        if search_engine not in SERP_SELECTORS:
+            raise ValueError(f"不支持的搜索引擎: {search_engine}")
+        if not html_content:
+            return []
+
+        if self.backend == 'lxml':
+            try:
+                return self._extract_lxml(html_content, search_engine)
+            except Exception as e:
+                logger.warning(f"lxml解析失败，回退到BeautifulSoup: {str(e)}")
+        return self._extract_bs4(html_content, search_engine)
+
+    def _extract_lxml(self, html_content, search_engine):
+        """lxml快速路径"""
+        if isinstance(html_content, str):
+            html_content = html_content.encode('utf-8')
+        root = lxml_html.fromstring(html_content, parser=_LXML_PARSER)
+        compiled = self._compiled[search_engine]
+        title_xpath = compiled['title']
+
+        blocks = []
+        for xpath in compiled['containers']:
+            containers = xpath(root)
+            if title_xpath is not None:
+                # 只保留恰好包含一个标题的容器，排除包住多条结果的外层包装
+                containers = [c for c in containers if len(title_xpath(c)) == 1]
+                # 嵌套容器只保留最外层
+                candidates = set(containers)
+                containers = [c for c in containers
+                              if not any(p in candidates for p in c.iterancestors('div'))]
+            blocks = containers
+            if blocks:
+                break
+
+        candidates = []
+        for block in blocks:
+            if title_xpath is not None:
+                title_element = title_xpath(block)[0]
+                title = title_element.text_content()
+                # 优先使用包住标题的链接
+                link_element = next((a for a in title_element.iterancestors('a') if a.get('href')), None)
+                if link_element is None:
+                    links = compiled['link'](block)
+                    link_element = links[0] if links else None
+            else:
+                links = compiled['link'](block)
+                link_element = links[0] if links else None
+                title = link_element.text_content() if link_element is not None else ''
+            if link_element is None:
+                continue
+            candidates.append((title, link_element.get('href', '')))
+        return _number_results(candidates, search_engine)
+
+    def _extract_bs4(self, html_content, search_engine):
+        """BeautifulSoup后备路径"""
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html_content, 'html.parser')
+        selectors = SERP_SELECTORS[search_engine]
+        title_css = selectors['title_css']
+
+        blocks = []
+        for css in selectors['css']:
+            containers = soup.select(css)
+            if title_css:
+                # 只保留恰好包含一个标题的容器，排除包住多条结果的外层包装
+                containers = [c for c in containers if len(c.select(title_css)) == 1]
+                # 嵌套容器只保留最外层（bs4的Tag按内容判等，这里按对象身份比较）
+                candidates = {id(c) for c in containers}
+                containers = [c for c in containers
+                              if not any(id(p) in candidates for p in c.parents)]
+            blocks = containers
+            if blocks:
+                break
+
+        candidates = []
+        for block in blocks:
+            if title_css:
+                title_element = block.select_one(title_css)
+                title = title_element.get_text()
+                # 优先使用包住标题的链接
+                link_element = title_element.find_parent('a', href=True)
+                if link_element is None:
+                    link_element = block.select_one(selectors['link_css'])
+            else:
+                link_element = block.select_one(selectors['link_css'])
+                title = link_element.get_text() if link_element else ''
+            if not link_element:
+                continue
+            candidates.append((title, link_element.get('href', '')))
+        return _number_results(candidates, search_engine)
+
+
+def _normalize_url(url):
+    """
+    规范化URL用于去重: 忽略协议、www前缀、锚点和末尾斜杠
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = unquote(parts.path).rstrip('/')
+    if parts.query:
+        return f"{host}{path}?{parts.query}"
+    return f"{host}{path}"
+
+
+def _number_results(candidates, search_engine):
+    """
+    过滤站内链接、按规范化URL去重后连续编号
+    
+    参数:
+        candidates (list): 按页面顺序排列的 [(标题, 原始链接), ...]
+        search_engine (str): 搜索引擎
         
+    返回:
+        list: [(页内排名, 标题, URL), ...]
+    """
+    results = []
+    seen = set()
+    for title, link in candidates:
+        if search_engine == 'google':
+            link = _clean_google_link(link)
+        # 站内的相对链接（如"相关搜索"）不是自然结果
+        if not link.startswith(('http://', 'https://')):
+            continue
+        key = _normalize_url(link)
+        if key in seen:
+            continue
+        seen.add(key)
+        results.append((len(results) + 1, title, link))
+    return results
+
+
+_LXML_PARSER = lxml_html.HTMLParser(encoding='utf-8') if lxml_html is not None else None
+
+# 解析进程中按后端缓存的提取器
+_process_extractors = {}
+
+
+def _parse_page(html_content, search_engine, backend):
+    """
+    在解析进程中提取结果，供ProcessPoolExecutor调用
+    
+    返回:
+        list: [(页内排名, 标题, URL), ...]
+    """
+    extractor = _process_extractors.get(backend)
+    if extractor is None:
+        extractor = _process_extractors[backend] = SERPExtractor(backend)
+    return extractor.extract(html_content, search_engine)
+
+
+class ParsePool:
+    """
+    解析进程池
+
+    抓取线程把页面HTML交给进程池解析，解析不再占用抓取进程的GIL，
+    多核机器上解析吞吐随进程数增加。同时在途的页面数有上限，
+    超过时提交的线程阻塞等待，内存占用不会随抓取速度无限增长。
+    """
+
+    def __init__(self, workers, backend='auto', max_pending=None):
+        """
         参数:
-            target_domain (str): 需要跟踪排名的网站域名
-            delay_min (int): 请求之间的最小延迟(秒)
-            delay_max (int): 请求之间的最大延迟(秒)
-            region (str): Google搜索的区域(例如: 'com', 'com.hk', 'co.jp')
-            use_browser (bool): 是否使用浏览器模式
+            workers (int): 解析进程数
+            backend (str): 解析后端，见 SERPExtractor
+            max_pending (int): 同时在途的页面数上限，默认为进程数的2倍
+        """
+        self.workers = workers
+        self.backend = backend
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 2)
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, html_content, search_engine):
+        """提交一个页面，在途页面已满时阻塞；返回Future"""
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(_parse_page, html_content, search_engine, self.backend)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def extract(self, html_content, search_engine):
+        """与 SERPExtractor.extract 相同，在解析进程中执行"""
+        return self.submit(html_content, search_engine).result()
+
+    def close(self):
+        self._executor.shutdown()
+
+
+class HostRateLimiter:
+    """
+    按搜索主机划分的令牌桶限速器
+
+    每个主机一个容量为1的令牌桶，令牌按 delay_min~delay_max 之间的随机间隔补充，
+    所有工作线程共享同一组令牌桶。不同主机（例如google.com、google.com.hk、bing.com）
+    的配额互相独立，可以同时用满。
+
+    每个真实请求（包括重试，不包括缓存命中）放行前都计入该主机当天的请求数，
+    设置了每日预算时超出的请求直接失败，不会发出。
+    """
+
+    def __init__(self, delay_min, delay_max, daily_budget=0, clock=time.monotonic, sleep=time.sleep):
+        """
+        参数:
+            daily_budget (int): 每个主机每天（本地日期）的请求数上限，0为不限
+            clock (callable): 计算时间片使用的单调时钟，测试时可替换
+            sleep (callable): 等待时间片使用的函数，测试时可替换
         """
-        self.target_domain = target_domain
         self.delay_min = delay_min
         self.delay_max = delay_max
-        self.region = region
-        self.ua = UserAgent()
-        self.results = []
-        self.use_browser = use_browser
-        self.driver = None
+        self.daily_budget = daily_budget
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next_slot = {}
+        # 当天的零点，以及主机 -> 当天放行的请求数
+        self._day = None
+        self._today = {}
+
+    def _roll_day(self):
+        """日期变化时清零当天的请求数，调用时已持有锁"""
+        day = _day_start(time.time())
+        if day != self._day:
+            self._day = day
+            self._today = {}
+
+    def acquire(self, host):
+        """
+        阻塞直到该主机的下一个请求时间片
         
-        if self.use_browser:
-            self._init_browser()
-    
-    def _init_browser(self):
-        """初始化浏览器"""
-        try:
-            options = uc.ChromeOptions()
-            options.add_argument('--lang=zh-CN,zh;q=0.9,en;q=0.8')
-            options.add_argument(f'--user-agent={self.ua.random}')
-            
-            # 添加更多的浏览器参数
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-infobars')
-            options.add_argument('--disable-browser-side-navigation')
-            options.add_argument('--disable-features=IsolateOrigins,site-per-process')
-            
-            # 随机设置窗口大小
-            viewports = ["1280x800", "1366x768", "1440x900", "1536x864", "1680x1050", "1920x1080"]
-            viewport = random.choice(viewports)
-            width, height = map(int, viewport.split('x'))
-            options.add_argument(f'--window-size={width},{height}')
-            
-            # 设置代理（如果需要）
-            # options.add_argument('--proxy-server=http://your-proxy-server')
-            
-            self.driver = uc.Chrome(options=options)
-            
-            # 执行反自动化检测的JavaScript代码
-            self.driver.execute_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['zh-CN', 'zh', 'en-US', 'en']
-                });
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5]
-                });
-            """)
-            
-            logger.info("浏览器初始化成功")
-        except Exception as e:
-            logger.error(f"浏览器初始化失败: {str(e)}")
-            self.use_browser = False
-    
-    def get_random_headers(self):
-        """生成随机请求头以模拟不同浏览器"""
-        ua = self.ua.random
-        # 随机生成 viewport 尺寸
-        viewports = [
-            "1280x800", "1366x768", "1440x900", "1536x864", "1680x1050", "1920x1080"
-        ]
-        viewport = random.choice(viewports)
-        width, height = map(int, viewport.split('x'))
+        返回:
+            float: 实际等待的秒数
         
-        # 随机选择平台
-        platforms = ['Windows', 'Macintosh', 'X11']
-        platform = random.choice(platforms)
+        异常:
+            FetchError: 该主机当天的请求数已达上限 (budget)
+        """
+        with self._lock:
+            self._roll_day()
+            used = self._today.get(host, 0)
+            if self.daily_budget and used >= self.daily_budget:
+                raise FetchError('budget', f"{host} 今日请求已达上限 {self.daily_budget}")
+            self._today[host] = used + 1
+            now = self._clock()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + random.uniform(self.delay_min, self.delay_max)
+        wait_time = slot - now
+        if wait_time > 0:
+            self._sleep(wait_time)
+        return wait_time
+
+    def requests_today(self):
+        """各主机当天放行的请求数（含重试）: 主机 -> 次数"""
+        with self._lock:
+            self._roll_day()
+            return dict(self._today)
+
+    def remaining_today(self, host):
+        """该主机当天还能放行的请求数，不限时为None"""
+        if not self.daily_budget:
+            return None
+        with self._lock:
+            self._roll_day()
+            return max(0, self.daily_budget - self._today.get(host, 0))
+
+    def backoff(self, host, seconds):
+        """出错后推迟该主机的下一个时间片"""
+        with self._lock:
+            now = self._clock()
+            self._next_slot[host] = max(self._next_slot.get(host, now), now) + seconds
+
+
+class FetchError(Exception):
+    """
+    获取结果页失败
+
+    kind 为失败类型:
+        throttled: 429/503限流, server: 其他5xx, http: 其他非200状态码,
+        timeout: 超时, connection: 连接失败, browser: 浏览器加载失败,
+        empty: 页面没有解析出结果，且是第1页或带有验证码、同意页的标记,
+        circuit_open: 主机已熔断, budget: 主机当天的请求数已达上限,
+        replay_miss: 回放模式下缓存中没有, error: 其他错误
+    """
+
+    RETRYABLE = {'throttled', 'server', 'timeout', 'connection', 'browser', 'empty'}
+
+    def __init__(self, kind, message, status=None):
+        super().__init__(message)
+        self.kind = kind
+        self.status = status
+
+    @property
+    def retryable(self):
+        return self.kind in self.RETRYABLE
+
+
+def _classify_exception(error):
+    """把请求库抛出的异常归类为FetchError的失败类型"""
+    if isinstance(error, FetchError):
+        return error.kind
+    import requests
+    # httpx是可选依赖，按异常类名判断
+    name = type(error).__name__
+    if isinstance(error, (requests.exceptions.Timeout, TimeoutError)) or 'Timeout' in name:
+        return 'timeout'
+    if isinstance(error, (requests.exceptions.ConnectionError, ConnectionError)) or 'Connect' in name:
+        return 'connection'
+    return 'error'
+
+
+class RetryBudget:
+    """单个关键词的剩余重试次数，一个关键词的所有页面共用"""
+
+    def __init__(self, retries):
+        self.remaining = retries
+
+    def take(self):
+        """消耗一次重试，没有剩余时返回False"""
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    按主机的熔断器
+
+    某个主机连续失败达到阈值后熔断，冷却期内对该主机的请求直接失败；
+    冷却期过后只放行一个试探请求，成功则恢复，失败则再次熔断。
+    """
+
+    def __init__(self, threshold=5, cooldown=120):
+        """
+        参数:
+            threshold (int): 触发熔断的连续失败次数
+            cooldown (float): 熔断持续的秒数
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._open_until = {}
+        self._probing = set()
+
+    def allow(self, host):
+        """该主机当前是否可以请求"""
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return True
+            if time.monotonic() < open_until or host in self._probing:
+                return False
+            # 冷却期已过，放行一个试探请求
+            self._probing.add(host)
+            return True
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+            self._probing.discard(host)
+
+    def release(self, host):
+        """结束试探但不改变熔断状态，用于与主机无关的失败；下一个请求重新试探"""
+        with self._lock:
+            self._probing.discard(host)
+
+    def record_failure(self, host):
+        """记录一次失败，返回该主机是否因此熔断"""
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.threshold or host in self._probing:
+                self._probing.discard(host)
+                self._open_until[host] = time.monotonic() + self.cooldown
+                return True
+            return False
+
+
+class HTTPFetcher:
+    """
+    非浏览器模式下的HTTP抓取器
+
+    默认使用requests.Session，每个主机保持一个可复用的连接池，省去每次请求的
+    TCP/TLS握手；开启http2且安装了httpx[http2]时改用httpx客户端。
+    线程安全，所有工作线程共享同一个实例。
+    """
+
+    # 保留连接池的主机数上限，超过后最久未用的主机连接池会被关闭
+    MAX_HOSTS = 32
+
+    def __init__(self, pool_size=10, http2=False, timeout=10):
+        """
+        参数:
+            pool_size (int): 每个主机保持的最大连接数
+            http2 (bool): 是否尝试使用HTTP/2（需要httpx[http2]）
+            timeout (float): 请求超时时间(秒)
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.http2 = False
+        self._client = None
+        self._session = None
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._connections = 0
+
+        if http2:
+            try:
+                import httpx
+                self._client = httpx.Client(
+                    http2=True,
+                    timeout=timeout,
+                    limits=httpx.Limits(max_connections=pool_size * self.MAX_HOSTS,
+                                        max_keepalive_connections=pool_size * self.MAX_HOSTS),
+                )
+                self.http2 = True
+            except ImportError:
+                logger.warning("未安装httpx[http2]，回退到HTTP/1.1连接池")
+
+        if self._client is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self._session = requests.Session()
+            self._adapter = HTTPAdapter(pool_connections=self.MAX_HOSTS, pool_maxsize=pool_size)
+            self._session.mount('https://', self._adapter)
+            self._session.mount('http://', self._adapter)
+
+    def get(self, url, headers=None):
+        """
+        发送GET请求
         
-        # 随机选择Chrome版本
-        chrome_versions = ['112', '113', '114', '115', '116', '117']
-        chrome_version = random.choice(chrome_versions)
+        返回:
+            tuple: (状态码, 页面文本)
+        """
+        with self._lock:
+            self._requests += 1
+        if self._client is not None:
+            response = self._client.get(url, headers=headers,
+                                        extensions={'trace': self._trace})
+            return response.status_code, response.text
+        response = self._session.get(url, headers=headers, timeout=self.timeout)
+        return response.status_code, response.text
 
-        headers = {
-            'User-Agent': ua,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,zh-TW;q=0.7,zh-HK;q=0.6,ja;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0',
-            'Sec-Ch-Ua': f'"Google Chrome";v="{chrome_version}", "Chromium";v="{chrome_version}", "Not=A?Brand";v="99"',
-            'Sec-Ch-Ua-Mobile': '?0',
-            'Sec-Ch-Ua-Platform': f'"{platform}"',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Pragma': 'no-cache',
-            'Priority': 'u=0, i',
-            'DNT': '1',
-            'Viewport-Width': str(width),
-            'Device-Memory': f'{random.choice([4, 8, 16])}',
-            'Referer': 'https://www.google.com/',
-            'Cookie': f'1P_JAR=2024-{random.randint(1,12):02d}-{random.randint(1,28):02d}-{random.randint(0,23):02d}; NID={random.randint(100000000,999999999)}; DV={"".join([str(random.randint(0,9)) for _ in range(20)])}',
-        }
+    def _trace(self, event_name, info):
+        """httpx的连接事件回调，用来统计新建连接数"""
+        if event_name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self._connections += 1
+
+    def connection_stats(self):
+        """
+        连接复用统计
         
-        # 随机添加额外的现代浏览器特征
-        if random.random() > 0.5:
-            headers.update({
-                'Sec-Ch-Ua-Full-Version': f'"{chrome_version}.0.{random.randint(1000,9999)}.{random.randint(100,999)}"',
-                'Sec-Ch-Ua-Arch': random.choice(['"x86"', '"arm"']),
-                'Sec-Ch-Ua-Model': '""',
-                'Sec-Ch-Ua-Bitness': random.choice(['"64"', '"32"']),
-                'Sec-Ch-Ua-Full-Version-List': f'"Google Chrome";v="{chrome_version}.0.{random.randint(1000,9999)}.{random.randint(100,999)}", "Chromium";v="{chrome_version}.0.{random.randint(1000,9999)}.{random.randint(100,999)}", "Not=A?Brand";v="99.0.0.0"',
-            })
+        返回:
+            dict: requests(请求数), connections(新建连接数), reused(复用连接的请求数)
+        """
+        if self._session is not None:
+            connections = 0
+            pools = self._adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+        else:
+            connections = self._connections
+        return {
+            'requests': self._requests,
+            'connections': connections,
+            'reused': max(0, self._requests - connections),
+        }
+
+    def close(self):
+        """关闭所有连接"""
+        if self._client is not None:
+            self._client.close()
+        if self._session is not None:
+            self._session.close()
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Metrics:
+    """
+    运行指标：各环节耗时的直方图和计数器，线程安全
+
+    环节:
+        fetch: HTTP请求, browser_wait: 浏览器加载和模拟浏览, parse: 解析结果页,
+        match: 匹配跟踪域名, delay: 限速和重试退避的等待, export: 导出Excel, keyword: 单个关键词的总耗时
+
+    可以输出为Prometheus文本格式，写入node_exporter的textfile目录，或通过本地HTTP端口提供。
+    """
+
+    PHASES = ('fetch', 'browser_wait', 'parse', 'match', 'delay', 'export', 'analytics', 'keyword')
+    # 直方图桶的上界(秒)
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+    COUNTERS = {
+        'http_responses_total': ('code', '按状态码统计的HTTP响应数'),
+        'empty_pages_total': ('search_engine', '没有解析出结果的页面数'),
+        'fetch_errors_total': ('kind', '按失败类型统计的获取失败次数（含之后重试成功的）'),
+        'retries_total': ('kind', '按失败类型统计的重试次数'),
+        'browsers_retired_total': ('reason', '被关闭替换的浏览器数 (crashed: 崩溃, recycled: 达到页面数上限)'),
+        'scan_pages_total': ('kind', '自适应扫描的请求页数 (fetched: 实际请求, sequential: 从第1页逐页扫描需要的页数)'),
+        'keywords_skipped_total': ('search_engine', '自适应扫描中连续多次未找到、本次跳过的关键词数'),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 环节 -> [各桶计数(最后一个为+Inf), 总耗时, 最大耗时]
+        self._histograms = {phase: [[0] * (len(self.BUCKETS) + 1), 0.0, 0.0] for phase in self.PHASES}
+        self._counters = {name: {} for name in self.COUNTERS}
+
+    def observe(self, phase, seconds):
+        """记录一次耗时"""
+        index = bisect.bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            histogram = self._histograms[phase]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            if seconds > histogram[2]:
+                histogram[2] = seconds
+
+    @contextlib.contextmanager
+    def time(self, phase):
+        """统计with块的耗时"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def inc(self, name, label, value=1):
+        """计数器加一"""
+        label = str(label)
+        with self._lock:
+            counter = self._counters[name]
+            counter[label] = counter.get(label, 0) + value
+
+    def counter(self, name):
+        """返回计数器的副本: 标签值 -> 计数"""
+        with self._lock:
+            return dict(self._counters[name])
+
+    def summary_rows(self):
+        """
+        各环节的汇总，只包含有记录的环节
+
+        返回:
+            list: [(环节, 次数, 总秒数, 平均毫秒, p50上界毫秒, p95上界毫秒, 最大毫秒), ...]
+        """
+        rows = []
+        with self._lock:
+            snapshot = [(phase, list(h[0]), h[1], h[2]) for phase, h in self._histograms.items()]
+        for phase, buckets, total, maximum in snapshot:
+            count = sum(buckets)
+            if not count:
+                continue
+            rows.append((phase, count, total, total / count * 1000,
+                         self._quantile(buckets, count, 0.5, maximum) * 1000,
+                         self._quantile(buckets, count, 0.95, maximum) * 1000,
+                         maximum * 1000))
+        return rows
+
+    def _quantile(self, buckets, count, q, maximum):
+        """按桶估计分位数，返回所在桶的上界（不超过最大值）"""
+        cumulative = 0
+        for index, bucket_count in enumerate(buckets):
+            cumulative += bucket_count
+            if cumulative >= q * count:
+                upper = self.BUCKETS[index] if index < len(self.BUCKETS) else maximum
+                return min(upper, maximum)
+        return maximum
+
+    def render(self):
+        """Prometheus文本格式"""
+        lines = ['# HELP seo_phase_seconds 各环节耗时', '# TYPE seo_phase_seconds histogram']
+        with self._lock:
+            for phase, (buckets, total, _) in self._histograms.items():
+                cumulative = 0
+                for upper, bucket_count in zip(self.BUCKETS + ('+Inf',), buckets):
+                    cumulative += bucket_count
+                    lines.append(f'seo_phase_seconds_bucket{{phase="{phase}",le="{upper}"}} {cumulative}')
+                lines.append(f'seo_phase_seconds_sum{{phase="{phase}"}} {total:.6f}')
+                lines.append(f'seo_phase_seconds_count{{phase="{phase}"}} {cumulative}')
+            for name, (label, help_text) in self.COUNTERS.items():
+                lines.append(f'# HELP seo_{name} {help_text}')
+                lines.append(f'# TYPE seo_{name} counter')
+                for value, count in sorted(self._counters[name].items()):
+                    lines.append(f'seo_{name}{{{label}="{value}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """原子地写入Prometheus textfile，避免采集到写了一半的文件"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """
+        在后台线程中通过HTTP提供 /metrics
+
+        返回:
+            HTTPServer: 调用shutdown()停止
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = _ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class StandInSearchServer:
+    """
+    本地的模拟搜索引擎HTTP服务器，用于基准测试
+
+    默认对所有GET请求返回同一个页面；给出pages时按路径 /<搜索引擎>/search 返回
+    该引擎的样本页，并按翻页位置轮换。支持HTTP/1.1 keep-alive。
+
+    用法:
+        with StandInSearchServer(body) as server:
+            requests.get(server.base_url + '/search?q=test')
+
+        with StandInSearchServer(pages={'google': [html]}) as server:
+            tool.search_endpoints = server.search_endpoints()
+    """
+
+    def __init__(self, body=b'<html><body></body></html>', latency=0.0, pages=None):
+        """
+        参数:
+            body (bytes): 返回的页面内容
+            latency (float): 每个请求的模拟延迟(秒)
+            pages (dict): 搜索引擎 -> 样本页内容(bytes)列表
+        """
+        self.body = body
+        self.latency = latency
+        self.pages = pages or {}
+        self.base_url = None
+        self._server = None
+        self._thread = None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头和正文分两次写出，keep-alive时需要关闭Nagle避免40ms的延迟确认
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server._page_for(self.path)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _page_for(self, path):
+        """按请求路径选出要返回的页面"""
+        parts = urlsplit(path)
+        engine = parts.path.strip('/').split('/')[0]
+        bodies = self.pages.get(engine)
+        if not bodies:
+            return self.body
+        query = dict(pair.split('=', 1) for pair in parts.query.split('&') if '=' in pair)
+        # 谷歌用start(从0开始)，必应用first(从1开始)
+        offset = int(query.get('start') or int(query.get('first', 1)) - 1)
+        size = int(query.get('num') or query.get('count') or 10)
+        return bodies[(offset // size) % len(bodies)]
+
+    def search_endpoints(self):
+        """返回指向本服务器的搜索地址，可直接赋给 SEOResearchTool.search_endpoints"""
+        return {engine: f"{self.base_url}/{engine}/search" for engine in SEARCH_ENDPOINTS}
+
+    def __enter__(self):
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SERPCache:
+    """
+    原始搜索结果页的磁盘缓存
+
+    以(搜索引擎, 区域, 关键词, 起始位置, 界面语言)的SHA-256作为文件名，页面用gzip压缩保存。
+    文件的修改时间记录写入时间，用于判断是否过期；访问时间记录最近一次命中，
+    缓存总大小超过上限时按访问时间淘汰最久未用的页面。
+    """
+
+    def __init__(self, directory, ttl=86400, max_bytes=512 * 1024 * 1024):
+        """
+        参数:
+            directory (str): 缓存目录
+            ttl (float): 缓存有效期(秒)
+            max_bytes (int): 缓存总大小上限(字节)
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(os.path.getsize(path) for path, _ in self._entries())
+
+    @staticmethod
+    def make_key(search_engine, region, keyword, start, hl=None, num=10):
+        """生成缓存键，每页10条时与不带每页条数的旧缓存键一致"""
+        parts = [search_engine, region, keyword, start, hl]
+        if num != 10:
+            parts.append(num)
+        raw = json.dumps(parts, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.html.gz")
+
+    def _entries(self):
+        """遍历缓存文件，返回 (路径, stat结果)"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.html.gz'):
+                    path = os.path.join(root, name)
+                    try:
+                        yield path, os.stat(path)
+                    except OSError:
+                        continue
+
+    def get(self, key, ignore_ttl=False):
+        """
+        读取缓存页面
+        
+        参数:
+            key (str): 缓存键
+            ignore_ttl (bool): 是否忽略有效期（回放模式）
+            
+        返回:
+            str: 页面HTML，未命中或已过期时返回None
+        """
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if not ignore_ttl and time.time() - stat.st_mtime > self.ttl:
+                self._count(hit=False)
+                return None
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                html_content = f.read()
+            # 只更新访问时间，修改时间保留为写入时间
+            os.utime(path, (time.time(), stat.st_mtime))
+        except (OSError, EOFError):
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        return html_content
+
+    def _count(self, hit):
+        """更新命中计数，缓存由多个抓取线程共用"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, html_content):
+        """写入缓存页面，必要时淘汰旧页面"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = gzip.compress(html_content.encode('utf-8'))
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            try:
+                self._total_bytes -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到总大小降到上限的90%"""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_atime)
+        target = self.max_bytes * 0.9
+        for path, stat in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= stat.st_size
+            except OSError:
+                continue
+
+
+def _normalize_domain(domain):
+    """把类似 https://www.Example.com/path 的输入规范化为主机名 example.com"""
+    domain = domain.strip().lower()
+    if '://' not in domain:
+        domain = f"//{domain}"
+    host = urlsplit(domain).hostname or ''
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+
+class DomainMatcher:
+    """
+    跟踪域名的主机名后缀索引
+
+    结果URL的主机名按后缀逐级查表（a.b.example.com -> b.example.com -> example.com），
+    子域名也算作所属域名；与子串匹配不同，notexample.com不会被当成example.com。
+    """
+
+    def __init__(self, domains):
+        """
+        参数:
+            domains (list): 跟踪的域名列表，顺序即输出顺序
+        """
+        self.domains = []
+        self._index = {}
+        for domain in domains:
+            normalized = _normalize_domain(domain)
+            if normalized and normalized not in self._index:
+                self._index[normalized] = normalized
+                self.domains.append(normalized)
+
+    def match(self, url):
+        """
+        返回URL所属的跟踪域名，不属于任何跟踪域名时返回None
+        """
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            return None
+        if not host:
+            return None
+        parts = host.split('.')
+        for i in range(len(parts)):
+            domain = self._index.get('.'.join(parts[i:]))
+            if domain:
+                return domain
+        return None
+
+
+class Competitor(namedtuple('Competitor', ['rank', 'title', 'url'])):
+    """
+    一条竞争对手结果
+
+    元组没有每个实例的字典，比 {'rank', 'title', 'url'} 字典小得多，对比见 bench records。
+    标题和URL的字符串共享只在不启用结果日志（作为库使用）时生效，命令行运行不使用。
+    写入JSON时是 [rank, title, url] 列表。
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, value):
+        """从JSON读回，兼容旧日志中的字典格式"""
+        if isinstance(value, dict):
+            return cls(value['rank'], value['title'], value['url'])
+        return cls(*value)
+
+
+def _load_record(text):
+    """解析一行JSON结果，竞争对手还原为 Competitor"""
+    record = json.loads(text)
+    if 'competitors' in record:
+        record['competitors'] = [Competitor.from_json(value) for value in record['competitors']]
+    return record
+
+
+def _task_key(record):
+    """结果对应的任务键 (关键词, 搜索引擎, 区域)"""
+    return record['keyword'], record['search_engine'], record['region']
+
+
+def _competitor_count(record):
+    """竞争对手数量，竞争对手列表已转存到日志的结果只保留了数量"""
+    if 'competitors' in record:
+        return len(record['competitors'])
+    return record.get('competitor_count', 0)
+
+
+def _without_competitors(record):
+    """返回去掉竞争对手列表、只保留数量的结果副本"""
+    light = {key: value for key, value in record.items() if key != 'competitors'}
+    light['competitor_count'] = _competitor_count(record)
+    return light
+
+
+class ResultJournal:
+    """
+    关键词结果的JSONL日志
+
+    每个关键词完成后立即追加一行并刷到磁盘，进程中途崩溃时已完成的结果不会丢失。
+    竞争对手列表只保存在日志里，内存中的结果只保留数量，导出时再从日志读回。
+    """
+
+    def __init__(self, path, resume=False):
+        """
+        参数:
+            path (str): 日志文件路径
+            resume (bool): 是否在已有日志上继续；否则清空旧日志
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        if not resume and os.path.exists(path):
+            logger.info(f"清空旧的结果日志 {path}")
+            os.remove(path)
+        elif os.path.exists(path):
+            self._truncate_torn_tail(path)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _truncate_torn_tail(path, chunk_size=65536):
+        """去掉崩溃时写了一半、没有换行符的最后一行，免得继续追加的结果接在它后面一起被丢弃"""
+        with open(path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - chunk_size)
+                f.seek(start)
+                chunk = f.read(position - start)
+                newline = chunk.rfind(b'\n')
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                logger.warning(f"结果日志 {path} 的最后一行不完整，已截掉 {end - position} 字节")
+                f.truncate(position)
+
+    def append(self, record):
+        """追加一条结果并刷到磁盘"""
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def __iter__(self):
+        """按写入顺序遍历日志中的结果"""
+        with self._lock:
+            self._file.flush()
+        return self.read(self.path)
+
+    @staticmethod
+    def read(path):
+        """按写入顺序读取日志文件中的结果，跳过崩溃时写了一半的行"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield _load_record(line)
+                except ValueError:
+                    continue
+
+    @classmethod
+    def read_latest(cls, path):
+        """读取日志文件中每个任务最后一次的结果，继续运行时重新执行过的任务只取最新一条"""
+        latest = {_task_key(record): record.get('checked_at') for record in cls.read(path)}
+        for record in cls.read(path):
+            if latest.get(_task_key(record)) == record.get('checked_at'):
+                yield record
+
+    def completed(self):
+        """
+        已完成的任务
+        
+        返回:
+            dict: 任务键 -> 去掉竞争对手列表的结果
+        """
+        return {_task_key(record): _without_competitors(record) for record in self}
+
+    def close(self):
+        self._file.close()
+
+
+def _url_host(url):
+    """URL的规范化主机名，用作竞争对手标识"""
+    try:
+        host = urlsplit(url).hostname or ''
+    except ValueError:
+        return ''
+    return host[4:] if host.startswith('www.') else host
+
+
+class RankStore:
+    """
+    基于SQLite的历史排名库
+
+    每次运行的排名和竞争对手记为一个run，按(域名, 关键词, 时间)和(竞争对手主机, 关键词)建索引，
+    用于查询排名走势、两次运行间变化最大的关键词和竞争对手的曝光份额。
+    曝光份额在写入时按运行预先汇总，查询时不再扫描竞争对手明细。
+    """
+
+    BATCH_SIZE = 5000
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at REAL NOT NULL,
+            label TEXT
+        );
+        CREATE TABLE IF NOT EXISTS rankings (
+            run_id INTEGER NOT NULL,
+            ts REAL NOT NULL,
+            keyword TEXT NOT NULL,
+            search_engine TEXT NOT NULL,
+            region TEXT,
+            domain TEXT NOT NULL,
+            found INTEGER NOT NULL,
+            rank INTEGER,
+            page INTEGER,
+            url TEXT,
+            pages INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_rankings_domain_keyword_ts ON rankings (domain, keyword, ts);
+        CREATE INDEX IF NOT EXISTS idx_rankings_run_domain ON rankings (run_id, domain);
+        CREATE TABLE IF NOT EXISTS competitors (
+            run_id INTEGER NOT NULL,
+            ts REAL NOT NULL,
+            keyword TEXT NOT NULL,
+            search_engine TEXT NOT NULL,
+            region TEXT,
+            competitor_host TEXT NOT NULL,
+            rank INTEGER,
+            title TEXT,
+            url TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_competitors_host_keyword ON competitors (competitor_host, keyword);
+        CREATE INDEX IF NOT EXISTS idx_competitors_run_host ON competitors (run_id, competitor_host, keyword);
+        CREATE TABLE IF NOT EXISTS competitor_share (
+            run_id INTEGER NOT NULL,
+            competitor_host TEXT NOT NULL,
+            hits INTEGER NOT NULL,
+            keywords INTEGER NOT NULL,
+            rank_sum INTEGER NOT NULL,
+            PRIMARY KEY (run_id, competitor_host)
+        );
+    """
+
+    def __init__(self, path):
+        """
+        参数:
+            path (str): SQLite数据库文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        # 旧版本的库没有记录检查的页数
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(rankings)')]
+        if 'pages' not in columns:
+            with self._conn:
+                self._conn.execute('ALTER TABLE rankings ADD COLUMN pages INTEGER')
+
+    def start_run(self, started_at=None, label=None):
+        """
+        登记一次新的运行
+        
+        返回:
+            int: run_id
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute('INSERT INTO runs (started_at, label) VALUES (?, ?)',
+                                        (started_at or time.time(), label))
+            return cursor.lastrowid
+
+    def save_results(self, run_id, results, started_at=None, refresh_share=True):
+        """
+        在一个事务中分批写入一次运行的结果
+        
+        参数:
+            run_id (int): start_run返回的运行编号
+            results (iterable): 带竞争对手列表的关键词结果
+            started_at (float): 结果缺少检查时间时使用的时间戳
+            refresh_share (bool): 是否重新汇总该运行的竞争对手曝光；
+                逐条追加结果时设为False，写完后调用 refresh_share
+            
+        返回:
+            tuple: (写入的排名行数, 写入的竞争对手行数)
+        """
+        started_at = started_at or time.time()
+        ranking_rows = []
+        competitor_rows = []
+        totals = [0, 0]
+        with self._lock, self._conn:
+            for r in results:
+                ts = r.get('checked_at') or started_at
+                for ranking in r['rankings']:
+                    # 有页面没取到时"未找到"并不可靠，不写入，免得被当成掉出排名
+                    if not ranking['found'] and r.get('incomplete_pages'):
+                        continue
+                    ranking_rows.append((run_id, ts, r['keyword'], r['search_engine'], r['region'],
+                                         ranking['domain'], int(ranking['found']), ranking['rank'],
+                                         ranking['page'], ranking['url'], r.get('pages')))
+                for competitor in r.get('competitors', ()):
+                    competitor_rows.append((run_id, ts, r['keyword'], r['search_engine'], r['region'],
+                                            _url_host(competitor.url), competitor.rank,
+                                            competitor.title, competitor.url))
+                if len(ranking_rows) + len(competitor_rows) >= self.BATCH_SIZE:
+                    self._flush(ranking_rows, competitor_rows, totals)
+                    ranking_rows, competitor_rows = [], []
+            self._flush(ranking_rows, competitor_rows, totals)
+            if refresh_share:
+                self._refresh_share(run_id)
+        return tuple(totals)
+
+    def refresh_share(self, run_id):
+        """重新汇总一次运行的竞争对手曝光"""
+        with self._lock, self._conn:
+            self._refresh_share(run_id)
+
+    def _refresh_share(self, run_id):
+        """在当前事务中重新汇总一次运行的竞争对手曝光"""
+        self._conn.execute('DELETE FROM competitor_share WHERE run_id = ?', (run_id,))
+        self._conn.execute("""
+            INSERT INTO competitor_share (run_id, competitor_host, hits, keywords, rank_sum)
+            SELECT run_id, competitor_host, COUNT(*), COUNT(DISTINCT keyword), SUM(rank)
+            FROM competitors
+            WHERE run_id = ?
+            GROUP BY competitor_host
+        """, (run_id,))
+
+    def _flush(self, ranking_rows, competitor_rows, totals):
+        """在当前事务中写入一批行"""
+        self._conn.executemany('INSERT INTO rankings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', ranking_rows)
+        self._conn.executemany('INSERT INTO competitors VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', competitor_rows)
+        totals[0] += len(ranking_rows)
+        totals[1] += len(competitor_rows)
+
+    def scan_history(self, domain, keep=3, lookback_runs=30):
+        """
+        最近几次运行中某个域名在各关键词上的检查记录，供自适应扫描使用
+        
+        参数:
+            domain (str): 域名
+            keep (int): 每个关键词保留的最近记录数
+            lookback_runs (int): 只读取最近多少次运行
+            
+        返回:
+            dict: (关键词, 搜索引擎, 区域) -> [(是否找到, 排名, 页码, 检查的页数, 时间戳), ...]，按时间排序
+        """
+        history = {}
+        rows = self._conn.execute(
+            'SELECT keyword, search_engine, region, found, rank, page, pages, ts FROM rankings '
+            'WHERE domain = ? AND run_id > (SELECT COALESCE(MAX(run_id), 0) - ? FROM runs) ORDER BY ts',
+            (_normalize_domain(domain), lookback_runs))
+        for keyword, search_engine, region, found, rank, page, pages, ts in rows:
+            entries = history.setdefault((keyword, search_engine, region), [])
+            entries.append((bool(found), rank, page, pages, ts))
+            if len(entries) > keep:
+                del entries[0]
+        return history
+
+    def runs(self, limit=20):
+        """最近的运行列表 [(run_id, started_at, label), ...]，新的在前"""
+        return self._conn.execute('SELECT run_id, started_at, label FROM runs ORDER BY run_id DESC LIMIT ?',
+                                  (limit,)).fetchall()
+
+    def rank_history(self, domain, keyword, search_engine=None, region=None):
+        """
+        某个域名在某个关键词上的排名走势
+        
+        返回:
+            list: [(时间戳, run_id, 搜索引擎, 区域, 排名, 页码), ...]，按时间排序，未找到时排名为None
+        """
+        sql = ('SELECT ts, run_id, search_engine, region, rank, page FROM rankings '
+               'WHERE domain = ? AND keyword = ?')
+        params = [_normalize_domain(domain), keyword]
+        if search_engine:
+            sql += ' AND search_engine = ?'
+            params.append(search_engine)
+        if region:
+            sql += ' AND region = ?'
+            params.append(region)
+        return self._conn.execute(sql + ' ORDER BY ts', params).fetchall()
+
+    def movers(self, domain, run_a=None, run_b=None, limit=20, not_found_rank=101):
+        """
+        两次运行之间排名变化最大的关键词
+        
+        参数:
+            domain (str): 域名
+            run_a (int): 较早的运行，默认倒数第二次
+            run_b (int): 较晚的运行，默认最近一次
+            limit (int): 返回条数
+            not_found_rank (int): 未找到时按这个排名计算变化
+            
+        返回:
+            list: [(关键词, 搜索引擎, 区域, 旧排名, 新排名, 上升名次), ...]，按变化幅度排序
+        """
+        if run_a is None or run_b is None:
+            recent = [row[0] for row in self.runs(2)]
+            if len(recent) < 2:
+                return []
+            run_b, run_a = recent
+        sql = """
+            SELECT a.keyword, a.search_engine, a.region, a.rank, b.rank,
+                   COALESCE(a.rank, :nf) - COALESCE(b.rank, :nf) AS delta
+            FROM rankings a
+            JOIN rankings b
+              ON b.run_id = :run_b AND b.domain = a.domain AND b.keyword = a.keyword
+             AND b.search_engine = a.search_engine AND b.region IS a.region
+            WHERE a.run_id = :run_a AND a.domain = :domain AND delta != 0
+            ORDER BY ABS(delta) DESC, a.keyword
+            LIMIT :limit
+        """
+        return self._conn.execute(sql, {'nf': not_found_rank, 'run_a': run_a, 'run_b': run_b,
+                                        'domain': _normalize_domain(domain), 'limit': limit}).fetchall()
+
+    def share_of_voice(self, run_id=None, limit=20):
+        """
+        一次运行中各竞争对手主机的曝光份额
+        
+        返回:
+            list: [(主机, 出现次数, 覆盖关键词数, 平均排名, 份额), ...]，按出现次数排序
+        """
+        if run_id is None:
+            recent = self.runs(1)
+            if not recent:
+                return []
+            run_id = recent[0][0]
+        total = self._conn.execute('SELECT SUM(hits) FROM competitor_share WHERE run_id = ?',
+                                   (run_id,)).fetchone()[0]
+        if not total:
+            return []
+        sql = """
+            SELECT competitor_host, hits, keywords, CAST(rank_sum AS REAL) / hits
+            FROM competitor_share
+            WHERE run_id = ?
+            ORDER BY hits DESC
+            LIMIT ?
+        """
+        return [row + (row[1] / total,) for row in self._conn.execute(sql, (run_id, limit))]
+
+    def close(self):
+        self._conn.close()
+
+
+def _scan_order(predicted_page, num_pages):
+    """从预测的页码开始由近及远的请求顺序，例如预测第3页、共5页时为 3, 2, 4, 1, 5"""
+    predicted = min(max(predicted_page, 1), num_pages)
+    order = [predicted]
+    for distance in range(1, num_pages):
+        for page in (predicted - distance, predicted + distance):
+            if 1 <= page <= num_pages:
+                order.append(page)
+    return order
+
+
+class ScanPlanner:
+    """
+    自适应扫描: 按历史排名决定每个关键词先请求哪一页、本次是否跳过
+
+    上次找到主域名的关键词先请求上次所在的页，没找到再向两边逐页扩大；
+    按当前页数连续多次完整检查都没找到的关键词，在复查间隔内跳过。
+    排名升到预测页之前时，记录的是预测页上的位置。
+    """
+
+    def __init__(self, history, skip_after=3, recheck_after=7 * 86400):
+        """
+        参数:
+            history (dict): RankStore.scan_history 的返回值
+            skip_after (int): 连续多少次未找到后开始跳过
+            recheck_after (float): 跳过的关键词多少秒后复查一次
+        """
+        self.history = history
+        self.skip_after = skip_after
+        self.recheck_after = recheck_after
+
+    def plan(self, keyword, search_engine, region, num_pages, now=None):
+        """
+        返回:
+            tuple: (是否跳过, 预测的页码)，没有可用的历史时为 (False, None)
+        """
+        entries = self.history.get((keyword, search_engine, region))
+        if not entries:
+            return False, None
+        found, _, page, _, checked_at = entries[-1]
+        if found:
+            return False, page if page and page <= num_pages else None
+        # 检查的页数少于本次时，"未找到"不能说明更深的页里也没有
+        misses = 0
+        for found, _, _, pages, _ in reversed(entries):
+            if found or not pages or pages < num_pages:
+                break
+            misses += 1
+        if misses >= self.skip_after and (now or time.time()) - checked_at < self.recheck_after:
+            return True, None
+        return False, None
+
+
+def _rank_value(found, rank, pages):
+    """用于计算波动的排名，未找到按检查深度之后一名计"""
+    return rank if found else (pages or 10) * 10 + 1
+
+
+def _rank_volatility(ranks):
+    """相邻两次检查排名变化的平均值，以页（10名）为单位，不足两次时为0"""
+    if len(ranks) < 2:
+        return 0.0
+    ranks = list(ranks)
+    return sum(abs(b - a) for a, b in zip(ranks, ranks[1:])) / (len(ranks) - 1) / 10
+
+
+class KeywordScheduler:
+    """
+    常驻模式的检查计划: 最小堆按下次检查时间排序
+
+    下次检查时间 = 上次检查时间 + interval / (1 + 波动)，不短于 min_interval。
+    排名越不稳定检查越频繁，同样到期的任务里等得越久的越先执行；
+    没有历史的任务立即到期，有页面没取到的结果在 min_interval 后重查。
+    """
+
+    def __init__(self, tasks, history=None, interval=86400, min_interval=3600, keep=10):
+        """
+        参数:
+            tasks (iterable): (关键词, 搜索引擎, 区域, 页数) 任务
+            history (dict): RankStore.scan_history 的返回值，用于恢复上次检查时间和排名波动
+            interval (float): 排名稳定的关键词的检查间隔(秒)
+            min_interval (float): 最短检查间隔(秒)
+            keep (int): 计算波动使用的最近检查次数
+        """
+        self.interval = interval
+        self.min_interval = min_interval
+        self._ranks = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        history = history or {}
+        for task in tasks:
+            keyword, search_engine, region, pages = task
+            entries = history.get((keyword, search_engine, region), ())
+            ranks = self._ranks[task[:3]] = deque(
+                (_rank_value(found, rank, checked_pages) for found, rank, _, checked_pages, _ in entries),
+                maxlen=keep)
+            due = self._next_due(entries[-1][4], ranks) if entries else 0.0
+            self.push(task, due)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _next_due(self, checked_at, ranks):
+        return checked_at + max(self.min_interval, self.interval / (1 + _rank_volatility(ranks)))
+
+    def push(self, task, due):
+        """加入任务，due为到期的时间戳"""
+        heapq.heappush(self._heap, (due, next(self._sequence), task))
+
+    def pop_due(self, now):
+        """
+        取出一个已到期的任务
+
+        返回:
+            tuple: (关键词, 搜索引擎, 区域, 页数)，没有到期的任务时返回None
+        """
+        if self._heap and self._heap[0][0] <= now:
+            return heapq.heappop(self._heap)[2]
+        return None
+
+    def due_count(self, now):
+        """已到期的任务数"""
+        return sum(1 for due, _, _ in self._heap if due <= now)
+
+    def seconds_until_due(self, now):
+        """距离下一个任务到期的秒数，没有任务时为None"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now)
+
+    def complete(self, task, record):
+        """记录检查结果并按主域名的排名波动安排下次检查"""
+        ranks = self._ranks[task[:3]]
+        checked_at = record.get('checked_at') or time.time()
+        ranking = record['rankings'][0]
+        if not ranking['found'] and record.get('incomplete_pages'):
+            # 排名未知，不计入波动，稍后重查
+            self.push(task, checked_at + self.min_interval)
+            return
+        ranks.append(_rank_value(ranking['found'], ranking['rank'], record.get('pages')))
+        self.push(task, self._next_due(checked_at, ranks))
+
+
+class JobQueue:
+    """
+    基于SQLite的分片任务队列，用于同一台机器上的多个进程分担同一批关键词
+
+    协调进程把关键词切成分片写入队列，工作进程以租约方式领取分片，
+    执行完后把带竞争对手列表的结果写回队列。租约到期仍未完成的分片（工作进程崩溃或失联）
+    会被其他工作进程重新领取；同一分片只接受第一份完成的结果。
+    各搜索主机的下一个请求时间片和当天的请求数也保存在队列中（见 QueueRateLimiter），
+    所有工作进程合起来仍只按一个进程的速度和每日预算请求同一主机。
+    队列文件必须放在本机磁盘上: NFS/SMB等网络文件系统上SQLite的文件锁不可靠，
+    可能把同一分片同时交给两个工作进程，甚至损坏数据库，所以不支持多台机器共用。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS shards (
+            shard_id INTEGER PRIMARY KEY,
+            keywords TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending',
+            worker TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_shards_state ON shards (state, lease_expires);
+        CREATE TABLE IF NOT EXISTS results (
+            shard_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            record TEXT NOT NULL,
+            PRIMARY KEY (shard_id, seq)
+        );
+        CREATE TABLE IF NOT EXISTS host_slots (
+            host TEXT PRIMARY KEY,
+            next_slot REAL NOT NULL,
+            day REAL NOT NULL,
+            used INTEGER NOT NULL DEFAULT 0
+        );
+    """
+
+    def __init__(self, path):
+        """
+        参数:
+            path (str): SQLite数据库文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # 自动提交模式，写操作显式使用 BEGIN IMMEDIATE，多个进程领取分片时不会重复。
+        # 使用回滚日志而不是WAL: 队列的写入量很小，回滚日志只依赖文件锁，不需要共享内存文件
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=DELETE')
+        self._conn.executescript(self.SCHEMA)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def create(self, keywords, shard_size, settings):
+        """
+        清空队列并写入新的分片
+
+        参数:
+            keywords (iterable): 关键词，可以是惰性的生成器
+            shard_size (int): 每个分片的关键词数
+            settings (dict): 本批任务的设置（域名、搜索引擎、区域、页数），工作进程按它执行
+
+        返回:
+            int: 分片数
+        """
+        keywords = iter(keywords)
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM results')
+            conn.execute('DELETE FROM shards')
+            conn.execute('DELETE FROM settings')
+            conn.executemany('INSERT INTO settings (key, value) VALUES (?, ?)',
+                             [(key, json.dumps(value, ensure_ascii=False)) for key, value in settings.items()])
+            count = 0
+            while True:
+                shard = list(itertools.islice(keywords, max(1, shard_size)))
+                if not shard:
+                    break
+                count += 1
+                conn.execute('INSERT INTO shards (shard_id, keywords) VALUES (?, ?)',
+                             (count, json.dumps(shard, ensure_ascii=False)))
+        return count
+
+    def settings(self):
+        """本批任务的设置"""
+        with self._lock:
+            rows = self._conn.execute('SELECT key, value FROM settings').fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def lease(self, worker, lease_seconds):
+        """
+        领取一个待执行或租约已过期的分片
+
+        参数:
+            worker (str): 工作进程标识
+            lease_seconds (float): 租约时长(秒)，执行期间需要用 renew 续约
+
+        返回:
+            tuple: (分片编号, 关键词列表, 第几次领取)，没有可领取的分片时返回None
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT shard_id, keywords, attempts FROM shards "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY shard_id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            shard_id, keywords, attempts = row
+            conn.execute("UPDATE shards SET state = 'leased', worker = ?, lease_expires = ?, "
+                         "attempts = attempts + 1 WHERE shard_id = ?",
+                         (worker, now + lease_seconds, shard_id))
+        return shard_id, json.loads(keywords), attempts + 1
+
+    def renew(self, shard_id, worker, lease_seconds):
+        """
+        续约
+
+        返回:
+            bool: 租约是否仍属于该工作进程
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute("UPDATE shards SET lease_expires = ? "
+                                  "WHERE shard_id = ? AND worker = ? AND state = 'leased'",
+                                  (time.time() + lease_seconds, shard_id, worker))
+        return cursor.rowcount == 1
+
+    @contextlib.contextmanager
+    def keep_leased(self, shard_id, worker, lease_seconds):
+        """执行分片期间在后台线程中定期续约"""
+        stop = threading.Event()
+
+        def renew_loop():
+            while not stop.wait(lease_seconds / 3):
+                try:
+                    if not self.renew(shard_id, worker, lease_seconds):
+                        logger.warning(f"分片 {shard_id} 的租约已被其他工作进程接管")
+                        return
+                except sqlite3.Error as e:
+                    logger.warning(f"分片 {shard_id} 续约失败: {str(e)}")
+
+        thread = threading.Thread(target=renew_loop, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def release(self, shard_id, worker):
+        """放弃租约，让其他工作进程立即领取"""
+        with self._transaction() as conn:
+            conn.execute("UPDATE shards SET state = 'pending', worker = NULL, lease_expires = NULL "
+                         "WHERE shard_id = ? AND worker = ? AND state = 'leased'", (shard_id, worker))
+
+    def complete(self, shard_id, worker, records):
+        """
+        写回分片的结果
+
+        参数:
+            shard_id (int): 分片编号
+            worker (str): 工作进程标识
+            records (list): 带竞争对手列表的关键词结果
+
+        返回:
+            bool: 是否被接受；分片已由其他工作进程完成时丢弃本次结果并返回False
+        """
+        with self._transaction() as conn:
+            row = conn.execute('SELECT state FROM shards WHERE shard_id = ?', (shard_id,)).fetchone()
+            if row is None or row[0] == 'done':
+                return False
+            conn.executemany('INSERT INTO results (shard_id, seq, record) VALUES (?, ?, ?)',
+                             [(shard_id, seq, json.dumps(record, ensure_ascii=False))
+                              for seq, record in enumerate(records)])
+            conn.execute("UPDATE shards SET state = 'done', worker = ?, lease_expires = NULL, finished_at = ? "
+                         "WHERE shard_id = ?", (worker, time.time(), shard_id))
+        return True
+
+    def progress(self):
+        """
+        各状态的分片数
+
+        返回:
+            dict: pending / leased / done / expired（租约已过期、等待重新领取）/ total
+        """
+        with self._lock:
+            counts = dict(self._conn.execute('SELECT state, COUNT(*) FROM shards GROUP BY state').fetchall())
+            expired = self._conn.execute("SELECT COUNT(*) FROM shards WHERE state = 'leased' AND lease_expires < ?",
+                                         (time.time(),)).fetchone()[0]
+        progress = {state: counts.get(state, 0) for state in ('pending', 'leased', 'done')}
+        progress['expired'] = expired
+        progress['total'] = sum(counts.values())
+        return progress
+
+    def take_slot(self, host, interval, daily_budget=0):
+        """
+        领取该主机的下一个请求时间片，并计入当天的请求数
+
+        时间片和请求数在同一个事务中更新，多个工作进程不会拿到同一个时间片。
+
+        参数:
+            host (str): 搜索主机
+            interval (float): 这个时间片之后到下一个时间片的间隔(秒)
+            daily_budget (int): 每天的请求数上限，0为不限
+
+        返回:
+            float: 时间片的时间戳，当天的请求数已达上限时返回None
+        """
+        now = time.time()
+        today = _day_start(now)
+        with self._transaction() as conn:
+            row = conn.execute('SELECT next_slot, day, used FROM host_slots WHERE host = ?', (host,)).fetchone()
+            next_slot, day, used = row if row is not None else (now, today, 0)
+            if day != today:
+                used = 0
+            if daily_budget and used >= daily_budget:
+                return None
+            slot = max(now, next_slot)
+            conn.execute('INSERT OR REPLACE INTO host_slots (host, next_slot, day, used) VALUES (?, ?, ?, ?)',
+                         (host, slot + interval, today, used + 1))
+        return slot
+
+    def delay_slot(self, host, seconds):
+        """把该主机的下一个时间片推迟seconds秒"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('UPDATE host_slots SET next_slot = MAX(next_slot, ?) + ? WHERE host = ?',
+                         (now, seconds, host))
+
+    def requests_today(self):
+        """所有工作进程当天对各主机放行的请求数: 主机 -> 次数"""
+        with self._lock:
+            rows = self._conn.execute('SELECT host, used FROM host_slots WHERE day = ?',
+                                      (_day_start(time.time()),)).fetchall()
+        return dict(rows)
+
+    def iter_results(self):
+        """按分片和关键词的原始顺序遍历已完成的结果"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute('SELECT record FROM results ORDER BY shard_id, seq')
+        for (record,) in cursor:
+            yield _load_record(record)
+
+    def close(self):
+        self._conn.close()
+
+
+class QueueRateLimiter(HostRateLimiter):
+    """
+    保存在任务队列中的按主机限速器
+
+    与 HostRateLimiter 相同，但时间片和当天的请求数由同一队列的所有工作进程共享:
+    开多少个工作进程，同一搜索主机收到的请求仍是一个进程的速度，每日预算也是合计的。
+    """
+
+    def __init__(self, queue, delay_min, delay_max, daily_budget=0):
+        """
+        参数:
+            queue (JobQueue): 任务队列
+            daily_budget (int): 所有工作进程合计的每个主机每天的请求数上限，0为不限
+        """
+        super().__init__(delay_min, delay_max, daily_budget)
+        self.queue = queue
+
+    def acquire(self, host):
+        slot = self.queue.take_slot(host, random.uniform(self.delay_min, self.delay_max), self.daily_budget)
+        if slot is None:
+            raise FetchError('budget', f"{host} 今日请求已达上限 {self.daily_budget}")
+        wait_time = slot - time.time()
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return max(wait_time, 0.0)
+
+    def requests_today(self):
+        return self.queue.requests_today()
+
+    def remaining_today(self, host):
+        if not self.daily_budget:
+            return None
+        return max(0, self.daily_budget - self.queue.requests_today().get(host, 0))
+
+    def backoff(self, host, seconds):
+        self.queue.delay_slot(host, seconds)
+
+
+class ColumnarWriter:
+    """
+    结果的列式输出 (Parquet 或 Arrow IPC)
+
+    每个关键词完成后追加到缓冲区，攒够 ROW_GROUP_ROWS 行就写出一个行组，
+    大批量运行时不需要在内存中保留完整的表。排名和竞争对手分别写成按运行分区的数据集:
+        <目录>/results/run=<运行时间>-<随机后缀>/part-0.parquet
+        <目录>/competitors/run=<运行时间>-<随机后缀>/part-0.parquet
+    运行时间精确到微秒，再加随机后缀，同一秒内启动的多个运行不会写到同一个分区。
+    关键词、搜索引擎、区域、域名使用字典编码，排名和页码为可空整数。
+    """
+
+    ROW_GROUP_ROWS = 10000
+    FORMATS = ('parquet', 'arrow')
+
+    def __init__(self, directory, fmt='parquet', run_ts=None):
+        """
+        参数:
+            directory (str): 输出目录
+            fmt (str): "parquet" 或 "arrow" (Arrow IPC流格式)
+            run_ts (float): 本次运行的时间戳，用作分区和run_ts列
+        """
+        self.check(directory, fmt)
+        import pyarrow as pa
+        self.directory = directory
+        self.fmt = fmt
+        self.run_ts = run_ts or time.time()
+        self._lock = threading.Lock()
+
+        category = pa.dictionary(pa.int32(), pa.string())
+        timestamp = pa.timestamp('ms', tz='UTC')
+        self._schemas = {
+            'results': pa.schema([
+                ('run_ts', timestamp),
+                ('checked_at', timestamp),
+                ('keyword', category),
+                ('search_engine', category),
+                ('region', category),
+                ('domain', category),
+                ('found', pa.bool_()),
+                ('rank', pa.int32()),
+                ('page', pa.int32()),
+                ('url', pa.string()),
+                ('competitor_count', pa.int32()),
+                ('incomplete_pages', pa.list_(pa.int32())),
+            ]),
+            'competitors': pa.schema([
+                ('run_ts', timestamp),
+                ('checked_at', timestamp),
+                ('keyword', category),
+                ('search_engine', category),
+                ('region', category),
+                ('competitor_host', category),
+                ('rank', pa.int32()),
+                ('title', pa.string()),
+                ('url', pa.string()),
+            ]),
+        }
+        self._buffers = {name: {field.name: [] for field in schema} for name, schema in self._schemas.items()}
+        self._writers = {}
+        self.paths = {}
+
+        micros = int(self.run_ts * 1000000) % 1000000
+        self.partition = (f"run={time.strftime('%Y%m%dT%H%M%S', time.gmtime(self.run_ts))}.{micros:06d}Z"
+                          f"-{uuid.uuid4().hex[:8]}")
+        extension = 'parquet' if fmt == 'parquet' else 'arrows'
+        for name in self._schemas:
+            path = os.path.join(directory, name, self.partition, f"part-0.{extension}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.paths[name] = path
+
+    @classmethod
+    def check(cls, directory, fmt):
+        """
+        检查pyarrow、格式和输出目录，不创建任何文件或目录
+
+        异常:
+            ImportError: 未安装pyarrow
+            ValueError: 格式不支持，或输出目录不可写
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("列式输出需要安装pyarrow: pip install pyarrow")
+        if fmt not in cls.FORMATS:
+            raise ValueError(f"不支持的列式格式: {fmt}")
+        # 目录还不存在时检查最近一级已存在的上级目录
+        existing = os.path.abspath(directory)
+        while not os.path.exists(existing):
+            existing = os.path.dirname(existing)
+        if not os.path.isdir(existing) or not os.access(existing, os.W_OK | os.X_OK):
+            raise ValueError(f"列式输出目录不可写: {directory}")
+
+    def write(self, record):
+        """追加一条带竞争对手列表的关键词结果"""
+        run_ms = int(self.run_ts * 1000)
+        checked_ms = int((record.get('checked_at') or self.run_ts) * 1000)
+        with self._lock:
+            buffer = self._buffers['results']
+            for ranking in record['rankings']:
+                buffer['run_ts'].append(run_ms)
+                buffer['checked_at'].append(checked_ms)
+                buffer['keyword'].append(record['keyword'])
+                buffer['search_engine'].append(record['search_engine'])
+                buffer['region'].append(record['region'])
+                buffer['domain'].append(ranking['domain'])
+                buffer['found'].append(ranking['found'])
+                buffer['rank'].append(ranking['rank'])
+                buffer['page'].append(ranking['page'])
+                buffer['url'].append(ranking['url'])
+                buffer['competitor_count'].append(_competitor_count(record))
+                buffer['incomplete_pages'].append(record.get('incomplete_pages') or [])
+
+            buffer = self._buffers['competitors']
+            for competitor in record.get('competitors', ()):
+                buffer['run_ts'].append(run_ms)
+                buffer['checked_at'].append(checked_ms)
+                buffer['keyword'].append(record['keyword'])
+                buffer['search_engine'].append(record['search_engine'])
+                buffer['region'].append(record['region'])
+                buffer['competitor_host'].append(_url_host(competitor.url))
+                buffer['rank'].append(competitor.rank)
+                buffer['title'].append(competitor.title)
+                buffer['url'].append(competitor.url)
+
+            for name, buffer in self._buffers.items():
+                if len(buffer['run_ts']) >= self.ROW_GROUP_ROWS:
+                    self._flush(name)
+
+    def _flush(self, name):
+        """把缓冲区写成一个行组"""
+        buffer = self._buffers[name]
+        if not buffer['run_ts']:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = self._schemas[name]
+        table = pa.Table.from_arrays(
+            [pa.array(buffer[field.name], type=field.type) for field in schema], schema=schema)
+        writer = self._writers.get(name)
+        if writer is None:
+            if self.fmt == 'parquet':
+                writer = pq.ParquetWriter(self.paths[name], schema, compression='zstd')
+            else:
+                writer = pa.ipc.new_stream(self.paths[name], schema)
+            self._writers[name] = writer
+        writer.write_table(table)
+        for values in buffer.values():
+            values.clear()
+
+    def close(self):
+        """写出剩余的行并关闭文件"""
+        with self._lock:
+            for name in self._schemas:
+                self._flush(name)
+            for writer in self._writers.values():
+                writer.close()
+            self._writers = {}
+
+
+# 主要结果表的列
+SUMMARY_COLUMNS = ['keyword', 'search_engine', 'region', 'domain', 'found', 'rank', 'page', 'url',
+                   'competitor_count', 'incomplete_pages']
+
+# 竞争对手长表的列
+COMPETITOR_COLUMNS = ['keyword', 'search_engine', 'region', 'rank', 'title', 'url']
+
+
+def _unique_sheet_name(label, suffix, used):
+    """
+    生成不重复且符合Excel限制（不超过31个字符、不含 \\ / ? * [ ] :）的工作表名
+    
+    参数:
+        label (str): 名称主体，过长时截断
+        suffix (str): 固定的后缀
+        used (set): 已使用的名称（小写），会被更新
+    """
+    base = re.sub(r'[\\/?*\[\]:]', '_', label)[:31 - len(suffix)]
+    name = f"{base}{suffix}"
+    index = 2
+    while name.lower() in used:
+        tag = f"~{index}"
+        name = f"{base[:31 - len(suffix) - len(tag)]}{tag}{suffix}"
+        index += 1
+    used.add(name.lower())
+    return name
+
+
+# 自动模式下按关键词分表导出竞争对手的上限，超过后改用长表
+MAX_COMPETITOR_SHEETS = 200
+
+
+def export_excel(filename, summary_rows, full_results, result_count, competitor_layout="auto",
+                 label_engine=False, analytics_rows=None):
+    """
+    把摘要和竞争对手逐行写入Excel
+    
+    使用openpyxl的只写模式，内存占用不随关键词数量增长。
+    
+    参数:
+        filename (str): 输出文件名
+        summary_rows (list): 每个(关键词, 域名)一行的摘要
+        full_results (iterable): 带竞争对手列表的关键词结果
+        result_count (int): 关键词结果的数量
+        competitor_layout (str): 竞争对手的输出方式
+            "sheets": 每个关键词一个工作表
+            "long": 所有竞争对手写在同一个"竞争对手"长表里
+            "auto": 关键词不超过 MAX_COMPETITOR_SHEETS 个时按关键词分表，否则使用长表
+        label_engine (bool): 分表时表名是否带上搜索引擎和区域
+        analytics_rows (list): 竞争对手分析的行，见 ANALYTICS_COLUMNS；设置时写入"竞争对手分析"表
+    """
+    if competitor_layout == "auto":
+        competitor_layout = "sheets" if result_count <= MAX_COMPETITOR_SHEETS else "long"
+    
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    
+    # 主结果表
+    sheet = workbook.create_sheet('主要结果')
+    sheet.append(SUMMARY_COLUMNS)
+    for row in summary_rows:
+        sheet.append([row[column] for column in SUMMARY_COLUMNS])
+    
+    if analytics_rows is not None:
+        sheet = workbook.create_sheet('竞争对手分析')
+        sheet.append(ANALYTICS_COLUMNS)
+        for row in analytics_rows:
+            sheet.append([row[column] for column in ANALYTICS_COLUMNS])
+    
+    if competitor_layout == "long":
+        sheet = workbook.create_sheet('竞争对手')
+        sheet.append(COMPETITOR_COLUMNS)
+        for result in full_results:
+            for competitor in result['competitors']:
+                sheet.append([result['keyword'], result['search_engine'], result['region'],
+                              competitor.rank, competitor.title, competitor.url])
+    else:
+        used = {'主要结果', '竞争对手', '竞争对手分析'}
+        for result in full_results:
+            if not result['competitors']:
+                continue
+            label = result['keyword']
+            if label_engine:
+                label = f"{label} {result['search_engine']}{'-' + result['region'] if result['region'] else ''}"
+            sheet = workbook.create_sheet(_unique_sheet_name(label, '竞争对手', used))
+            sheet.append(['rank', 'title', 'url'])
+            for competitor in result['competitors']:
+                sheet.append(list(competitor))
+    
+    workbook.save(filename)
+
+
+def _format_pages(pages):
+    """页码列表格式化为 "2,3"，没有时返回None"""
+    return ",".join(str(page) for page in pages) if pages else None
+
+
+def _summary_rows(results):
+    """
+    把关键词结果展开为每个(关键词, 域名)一行的摘要
+    
+    参数:
+        results (list): search_keyword返回的结果列表
+        
+    返回:
+        list: 摘要字典列表
+    """
+    rows = []
+    for r in results:
+        for ranking in r['rankings']:
+            rows.append({
+                'keyword': r['keyword'],
+                'search_engine': r['search_engine'],
+                'region': r['region'],
+                'domain': ranking['domain'],
+                'found': ranking['found'],
+                'rank': ranking['rank'],
+                'page': ranking['page'],
+                'url': ranking['url'],
+                'competitor_count': _competitor_count(r),
+                'incomplete_pages': _format_pages(r.get('incomplete_pages')),
+            })
+    return rows
+
+
+# 竞争对手分析表的列
+ANALYTICS_COLUMNS = ['host', 'tracked', 'keywords', 'hits', 'avg_rank', 'best_rank', 'top10',
+                     'visibility', 'share_of_voice', 'overlap', 'outranks']
+
+
+def competitor_frame(results):
+    """
+    把所有结果的竞争对手和跟踪域名的排名展开成一个列式表
+    
+    参数:
+        results (iterable): 带竞争对手列表的关键词结果，只遍历一次
+        
+    返回:
+        tuple: (pandas.DataFrame, int)
+            表的列为 task（结果序号）、host（规范化主机名）、rank、tracked（是否跟踪的域名）；
+            第二项为结果总数，包括没有任何竞争对手的结果
+    """
+    import pandas as pd
+    tasks, hosts, ranks, tracked = [], [], [], []
+    # 同一URL在不同关键词里反复出现，主机名只解析一次
+    host_of = {}
+    task_count = 0
+    for task, record in enumerate(results):
+        task_count += 1
+        for ranking in record['rankings']:
+            if ranking['found']:
+                tasks.append(task)
+                hosts.append(ranking['domain'])
+                ranks.append(ranking['rank'])
+                tracked.append(True)
+        for competitor in record.get('competitors', ()):
+            host = host_of.get(competitor.url)
+            if host is None:
+                host = host_of[competitor.url] = _url_host(competitor.url)
+            tasks.append(task)
+            hosts.append(host)
+            ranks.append(competitor.rank)
+            tracked.append(False)
+    frame = pd.DataFrame({
+        'task': pd.Series(tasks, dtype='int32'),
+        'host': pd.Categorical(hosts),
+        'rank': pd.Series(ranks, dtype='int32'),
+        'tracked': pd.Series(tracked, dtype='bool'),
+    })
+    return frame, task_count
+
+
+def competitor_analytics(frame, task_count, primary_domain, limit=None):
+    """
+    按主机汇总一次运行的竞争格局，全部使用分组向量运算
+    
+    同一主机在一个结果页上出现多次时按最好的排名计。
+    可见度按排名加权（第1名1分，第n名1/n分）后除以结果总数，每个关键词都排第1时为1；
+    曝光份额是各主机可见度占全部主机可见度之和的比例。
+    
+    参数:
+        frame (pandas.DataFrame): competitor_frame 返回的表
+        task_count (int): 结果总数
+        primary_domain (str): 主域名，用于计算关键词重叠
+        limit (int): 只返回可见度最高的前几个主机，None表示全部
+        
+    返回:
+        pandas.DataFrame: 列见 ANALYTICS_COLUMNS，按可见度从高到低排序
+            keywords: 出现的结果数, hits: 出现的次数, top10: 排进前10的结果数,
+            overlap: 主域名也出现的结果数, outranks: 其中排在主域名之前的结果数
+    """
+    import pandas as pd
+    if frame.empty:
+        return pd.DataFrame(columns=ANALYTICS_COLUMNS)
+    
+    hits = frame.groupby('host', observed=True).size()
+    best = frame.groupby(['host', 'task'], observed=True, sort=False).agg(
+        rank=('rank', 'min'), tracked=('tracked', 'any')).reset_index()
+    ours = best.loc[best['host'] == primary_domain, ['task', 'rank']]
+    best['our_rank'] = best['task'].map(ours.set_index('task')['rank'])
+    best['visibility'] = 1.0 / best['rank']
+    best['top10'] = best['rank'] <= 10
+    best['overlap'] = best['our_rank'].notna() & (best['host'] != primary_domain)
+    # 与NaN比较为False，主域名未出现的结果不算
+    best['outranks'] = best['rank'] < best['our_rank']
+    
+    grouped = best.groupby('host', observed=True)
+    table = grouped.agg(tracked=('tracked', 'any'), keywords=('task', 'size'), avg_rank=('rank', 'mean'),
+                        best_rank=('rank', 'min'), top10=('top10', 'sum'), visibility=('visibility', 'sum'),
+                        overlap=('overlap', 'sum'), outranks=('outranks', 'sum'))
+    table['hits'] = hits
+    table['visibility'] = table['visibility'] / max(task_count, 1)
+    table['share_of_voice'] = table['visibility'] / table['visibility'].sum()
+    table = table.sort_values('visibility', ascending=False)
+    if limit:
+        table = table.head(limit)
+    return table.reset_index()[ANALYTICS_COLUMNS]
+
+
+def _analytics_rows(table):
+    """分析表转为写入Excel的字典行，数值转成Python类型"""
+    return [{column: value.item() if hasattr(value, 'item') else value for column, value in row.items()}
+            for row in table.to_dict('records')]
+
+
+def _log_analytics(table):
+    """打印可见度最高的主机"""
+    logger.info("\n竞争对手分析 (按排名加权的可见度):")
+    for row in table.itertuples(index=False):
+        mark = " *" if row.tracked else ""
+        logger.info(f"- {row.host}{mark}: 可见度 {row.visibility:.3f}, 曝光份额 {row.share_of_voice:.1%}, "
+                    f"出现在 {row.keywords} 个结果中, 平均排名 {row.avg_rank:.1f}, 前10名 {row.top10} 次, "
+                    f"与主域名重叠 {row.overlap} 次 (其中排在前面 {row.outranks} 次)")
+
+
+def _split_list(value):
+    """把逗号分隔的字符串或列表统一成去掉空白的列表"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def _normalize_keyword(keyword):
+    """统一全角/半角字符并合并连续空白"""
+    return ' '.join(unicodedata.normalize('NFKC', keyword).split())
+
+
+class KeywordDeduper:
+    """
+    内存占用有上限的关键词去重集合
+
+    只保存键的64位哈希，存放在进程私有的临时SQLite库中，超出页缓存的部分写到临时文件，
+    百万级关键词时内存占用仍然固定；进程结束或close后临时库自动删除。
+    """
+
+    def __init__(self, cache_mb=16):
+        # 空文件名表示临时库，只在页缓存放不下时落盘
+        self._conn = sqlite3.connect('')
+        self._conn.execute('PRAGMA journal_mode=OFF')
+        self._conn.execute('PRAGMA synchronous=OFF')
+        self._conn.execute(f'PRAGMA cache_size=-{cache_mb * 1024}')
+        self._conn.execute('CREATE TABLE seen (digest INTEGER PRIMARY KEY)')
+
+    def add(self, key):
+        """
+        加入一个键
+
+        返回:
+            bool: 之前是否未出现过
+        """
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+        cursor = self._conn.execute('INSERT OR IGNORE INTO seen (digest) VALUES (?)',
+                                    (int.from_bytes(digest, 'big', signed=True),))
+        return cursor.rowcount == 1
+
+    def close(self):
+        self._conn.close()
+
+
+# 关键词文件中可以按行覆盖设置的列
+KEYWORD_FILE_COLUMNS = ('keyword', 'search_engine', 'region', 'pages')
+
+
+def _keyword_file_rows(path):
+    """
+    逐行读取关键词文件，返回 (行号, 关键词, 覆盖设置) 的生成器
+
+    CSV/TSV文件有 keyword 表头时按列名读取，可带 search_engine、region、pages 列，
+    没有表头时取第一列；其他文件每行一个关键词，忽略以 # 开头的行。
+    """
+    # utf-8-sig 兼容Excel导出的带BOM的文件
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in ('.csv', '.tsv'):
+            for line_number, line in enumerate(f, 1):
+                if not line.lstrip().startswith('#'):
+                    yield line_number, line, {}
+            return
+        reader = csv.reader(f, delimiter='\t' if extension == '.tsv' else ',')
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [column.strip().lower() for column in header]
+        if 'keyword' not in columns:
+            # 没有表头，第一行也是关键词
+            yield 1, header[0] if header else '', {}
+            for line_number, row in enumerate(reader, 2):
+                yield line_number, row[0] if row else '', {}
+            return
+        index = {name: columns.index(name) for name in KEYWORD_FILE_COLUMNS if name in columns}
+        for line_number, row in enumerate(reader, 2):
+            values = {name: row[i].strip() for name, i in index.items() if i < len(row) and row[i].strip()}
+            yield line_number, values.pop('keyword', ''), values
+
+
+def iter_keyword_file(path, dedupe=True):
+    """
+    流式读取关键词文件，可以直接传给 check_keywords，文件不会整体读入内存
+
+    关键词统一全角/半角和空白后去重（不区分大小写），相同关键词带不同覆盖设置时各保留一条。
+
+    参数:
+        path (str): CSV/TSV/TXT 文件路径，格式见 _keyword_file_rows
+        dedupe (bool): 是否去重
+
+    返回:
+        generator: 没有覆盖设置的行返回关键词字符串，否则返回
+            {'keyword', 'search_engine', 'region', 'pages'} 字典，缺少的键使用运行的设置
+    """
+    deduper = KeywordDeduper() if dedupe else None
+    skipped = 0
+    try:
+        for line_number, keyword, overrides in _keyword_file_rows(path):
+            keyword = _normalize_keyword(keyword)
+            if not keyword:
+                continue
+            engines = _split_list(overrides.get('search_engine', '').lower())
+            unsupported = [engine for engine in engines if engine not in SERP_SELECTORS]
+            if unsupported:
+                logger.warning(f"{path} 第 {line_number} 行: 不支持的搜索引擎 {', '.join(unsupported)}，跳过")
+                continue
+            if engines:
+                overrides['search_engine'] = ','.join(engines)
+            if 'pages' in overrides:
+                try:
+                    pages = int(overrides['pages'])
+                except ValueError:
+                    pages = 0
+                if pages < 1:
+                    logger.warning(f"{path} 第 {line_number} 行: 页数 '{overrides['pages']}' 无效，使用默认页数")
+                    del overrides['pages']
+                else:
+                    overrides['pages'] = pages
+            if deduper is not None:
+                key = '\t'.join([keyword.lower(), overrides.get('search_engine', ''), overrides.get('region', ''),
+                                  str(overrides.get('pages', ''))])
+                if not deduper.add(key):
+                    skipped += 1
+                    continue
+            if overrides:
+                overrides['keyword'] = keyword
+                yield overrides
+            else:
+                yield keyword
+    finally:
+        if deduper is not None:
+            deduper.close()
+        if skipped:
+            logger.info(f"{path}: 跳过 {skipped} 个重复的关键词")
+
+
+# 常见桌面浏览器的User-Agent快照，用 fake-useragent 的数据生成
+USER_AGENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'user_agents.json')
+_user_agents = None
+
+
+def load_user_agents(path=USER_AGENTS_FILE):
+    """
+    读取User-Agent列表，整个进程只读取一次
+    
+    快照文件缺失或为空时回退到 fake-useragent，从中抽取一批后缓存。
+    
+    返回:
+        list: User-Agent字符串列表
+    """
+    global _user_agents
+    if _user_agents is None:
+        agents = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                agents = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取User-Agent快照 {path} 失败: {str(e)}")
+        if not agents:
+            from fake_useragent import UserAgent
+            ua = UserAgent()
+            agents = list({ua.random for _ in range(50)})
+        _user_agents = agents
+    return _user_agents
+
+
+class BrowserPool:
+    """
+    可复用的浏览器池，供浏览器模式使用
+
+    每个浏览器只启动一次，在关键词之间复用；页面加载使用eager策略（DOM就绪即返回），
+    并按资源类型屏蔽图片、网络字体和自动播放的媒体，样式表按URL屏蔽。取出浏览器前做健康检查，
+    崩溃的浏览器会被关闭并按需重建，取出过一定次数的浏览器也会被替换，避免内存膨胀。
+
+    用法:
+        with pool.driver() as driver:
+            driver.get(url)
+    """
+
+    # 结果页只需要HTML。图片按内容设置屏蔽，与URL无关，没有扩展名的缩略图地址也不会加载
+    BLOCKED_CONTENT_PREFS = {'profile.managed_default_content_settings.images': 2}
+    # 网络字体和自动播放的媒体按类型屏蔽
+    BLOCKED_CONTENT_ARGUMENTS = ['--disable-remote-fonts', '--autoplay-policy=user-gesture-required']
+    # 样式表没有按类型屏蔽的开关，按URL屏蔽，带查询参数的地址也匹配
+    BLOCKED_URLS = ['*.css', '*.css?*']
+    # 每个新文档加载前执行的反自动化检测脚本
+    STEALTH_SCRIPT = """
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => undefined
+        });
+        Object.defineProperty(navigator, 'languages', {
+            get: () => ['zh-CN', 'zh', 'en-US', 'en']
+        });
+        Object.defineProperty(navigator, 'plugins', {
+            get: () => [1, 2, 3, 4, 5]
+        });
+    """
+
+    def __init__(self, size, user_agents, headless=True, max_pages=100, metrics=None):
+        """
+        参数:
+            size (int): 最多同时运行的浏览器数
+            user_agents (list): 每个浏览器随机选用的User-Agent
+            headless (bool): 是否使用无头模式
+            max_pages (int): 每个浏览器取出多少次后替换
+            metrics (Metrics): 记录浏览器回收次数
+        """
+        self.size = max(1, size)
+        self.user_agents = user_agents
+        self.headless = headless
+        self.max_pages = max_pages
+        self.metrics = metrics
+        # 空闲的浏览器；归还或关闭浏览器时通知等待的线程
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        # undetected_chromedriver启动时会修补chromedriver文件，启动需要串行
+        self._create_lock = threading.Lock()
+        # 已启动和正在启动的浏览器数
+        self._live = 0
+        # 浏览器 -> 已处理的页面数
+        self._drivers = {}
+
+    def start(self):
+        """启动第一个浏览器，浏览器不可用时在这里抛出异常"""
+        with self._lock:
+            self._live += 1
+        driver = self._spawn()
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    def _create_driver(self):
+        import undetected_chromedriver as uc
+        options = uc.ChromeOptions()
+        options.page_load_strategy = 'eager'
+        options.add_argument('--lang=zh-CN,zh;q=0.9,en;q=0.8')
+        options.add_argument(f'--user-agent={random.choice(self.user_agents)}')
+        
+        # 添加更多的浏览器参数
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-infobars')
+        options.add_argument('--disable-browser-side-navigation')
+        options.add_argument('--disable-features=IsolateOrigins,site-per-process')
+        for argument in self.BLOCKED_CONTENT_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_experimental_option('prefs', self.BLOCKED_CONTENT_PREFS)
+        
+        # 随机设置窗口大小
+        viewports = ["1280x800", "1366x768", "1440x900", "1536x864", "1680x1050", "1920x1080"]
+        width, height = map(int, random.choice(viewports).split('x'))
+        options.add_argument(f'--window-size={width},{height}')
+        
+        # 设置代理（如果需要）
+        # options.add_argument('--proxy-server=http://your-proxy-server')
+        
+        driver = uc.Chrome(options=options, headless=self.headless)
+        driver.set_page_load_timeout(30)
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.BLOCKED_URLS})
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': self.STEALTH_SCRIPT})
+        return driver
+
+    def _spawn(self):
+        """启动一个浏览器，调用前已占用了一个名额，失败时释放"""
+        try:
+            with self._create_lock:
+                driver = self._create_driver()
+        except Exception:
+            with self._available:
+                self._live -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self._drivers[driver] = 0
+        logger.info(f"浏览器已启动 (共 {len(self._drivers)} 个)")
+        return driver
+
+    def healthy(self, driver):
+        """浏览器进程和会话是否仍然可用"""
+        try:
+            driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def _retire(self, driver, reason):
+        """关闭并移除一个浏览器，之后按需重建"""
+        with self._available:
+            if self._drivers.pop(driver, None) is None:
+                return
+            self._live -= 1
+            self._available.notify()
+        if self.metrics is not None:
+            self.metrics.inc('browsers_retired_total', reason)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def checkout(self):
+        """取出一个健康的浏览器，没有空闲浏览器且已达上限时阻塞；用完后调用 checkin 归还"""
+        while True:
+            with self._available:
+                while not self._idle and self._live >= self.size:
+                    self._available.wait()
+                driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    self._live += 1
+            if driver is None:
+                return self._spawn()
+            if self.healthy(driver):
+                return driver
+            logger.warning("浏览器已崩溃，重新启动")
+            self._retire(driver, 'crashed')
+
+    def checkin(self, driver, broken=False):
+        """归还浏览器，broken为True时关闭它，之后按需重建"""
+        if broken:
+            logger.warning("浏览器已崩溃，关闭并在需要时重新启动")
+            self._retire(driver, 'crashed')
+            return
+        with self._lock:
+            if driver not in self._drivers:
+                return
+            self._drivers[driver] += 1
+            worn_out = self._drivers[driver] >= self.max_pages
+        if worn_out:
+            self._retire(driver, 'recycled')
+            return
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    def replace(self, driver):
+        """关闭已崩溃的浏览器，换一个健康的浏览器给调用方继续使用"""
+        self._retire(driver, 'crashed')
+        return self.checkout()
+
+    @contextlib.contextmanager
+    def driver(self):
+        """取出一个健康的浏览器，用完归还；没有空闲浏览器且已达上限时阻塞"""
+        driver = self.checkout()
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            # 超时等普通错误不影响浏览器继续使用
+            broken = not self.healthy(driver)
+            raise
+        finally:
+            self.checkin(driver, broken)
+
+    def close(self):
+        """关闭所有浏览器，可重复调用"""
+        with self._lock:
+            drivers = list(self._drivers)
+            self._drivers.clear()
+            self._idle = []
+            self._live = 0
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+class SEOResearchTool:
+    def __init__(self, target_domain, delay_min=0.5, delay_max=1.5, region='com', use_browser=False,
+                 parser='auto', workers=4, pool_size=10, http2=False, cache=None, replay=False,
+                 journal=None, columnar=None, large_pages=False, metrics=None, retry_budget=4,
+                 breaker=None, parse_workers=0, headless=True, planner=None, daily_budget=0,
+                 rate_limiter=None):
+        """
+        初始化SEO研究工具
+        
+        参数:
+            target_domain (str|list): 需要跟踪排名的网站域名，可以是多个（第一个为主域名）
+            delay_min (int): 请求之间的最小延迟(秒)
+            delay_max (int): 请求之间的最大延迟(秒)
+            region (str): Google搜索的区域(例如: 'com', 'com.hk', 'co.jp')
+            use_browser (bool): 是否使用浏览器模式
+            parser (str): 结果页解析后端 ("auto", "lxml", "bs4")
+            workers (int): 并发执行的关键词数，浏览器模式下每个线程一个浏览器
+            pool_size (int): 每个搜索主机保持的HTTP连接数
+            http2 (bool): 是否尝试使用HTTP/2
+            cache (SERPCache): 结果页磁盘缓存，None表示不缓存
+            replay (bool): 回放模式，只读取缓存、从不访问网络
+            journal (ResultJournal): 结果日志，设置后每个结果完成即写盘，竞争对手列表不再留在内存中
+            columnar (ColumnarWriter): 列式输出，每个结果完成后追加
+            large_pages (bool): 大页模式，每次请求搜索引擎支持的最大结果数
+            metrics (Metrics): 运行指标，为None时自动创建
+            retry_budget (int): 每个关键词所有页面共用的重试次数
+            breaker (CircuitBreaker): 按主机的熔断器，为None时使用默认阈值
+            parse_workers (int): 解析进程数，0表示在抓取线程中直接解析
+            headless (bool): 浏览器模式下是否使用无头浏览器
+            planner (ScanPlanner): 自适应扫描，为None时每个关键词都从第1页开始；大页模式下不使用
+            daily_budget (int): 每个搜索主机每天的请求数上限（含重试），0为不限
+            rate_limiter (HostRateLimiter): 限速器，为None时按delay_min、delay_max和daily_budget新建
+        """
+        self.domain_matcher = DomainMatcher(_split_list(target_domain))
+        if not self.domain_matcher.domains:
+            raise ValueError("至少需要一个目标域名")
+        self.target_domains = self.domain_matcher.domains
+        self.target_domain = self.target_domains[0]
+        self.delay_min = delay_min
+        self.delay_max = delay_max
+        self.region = region
+        self.user_agents = load_user_agents()
+        self.results = []
+        self._summary = None
+        # 回放模式不访问网络，也就不需要浏览器
+        self.use_browser = use_browser and not replay
+        self.browser_pool = None
+        self.extractor = SERPExtractor(parser)
+        self.parse_pool = ParsePool(parse_workers, self.extractor.backend) if parse_workers > 0 else None
+        self.rate_limiter = rate_limiter or HostRateLimiter(delay_min, delay_max, daily_budget)
+        self.workers = max(1, workers)
+        self.fetcher = HTTPFetcher(max(pool_size, 1), http2)
+        self.cache = cache
+        self.replay = replay
+        self.set_outputs(journal, columnar)
+        self.large_pages = large_pages
+        self.search_endpoints = dict(SEARCH_ENDPOINTS)
+        self.metrics = metrics or Metrics()
+        self.retry_budget = retry_budget
+        self.breaker = breaker or CircuitBreaker()
+        # 大页模式下一次请求已覆盖多页，按页预测没有意义
+        self.planner = planner if not large_pages else None
+        # 忽略了大页参数的搜索引擎，以及各搜索引擎连续只返回10条结果的大页请求数
+        self._large_pages_ignored = set()
+        self._large_page_strikes = {}
+        # 已确认按大页参数返回过多于10条结果的搜索引擎
+        self._large_pages_honoured = set()
+        self._large_pages_lock = threading.Lock()
+        if self.replay and self.cache is None:
+            raise ValueError("回放模式需要指定缓存目录")
+        
+        # 浏览器模式下当前线程正在处理的关键词占用的浏览器
+        self._browser_local = threading.local()
+        if self.use_browser:
+            # 每个并发线程最多占用一个浏览器
+            self.browser_pool = BrowserPool(self.workers, self.user_agents, headless, metrics=self.metrics)
+            try:
+                self.browser_pool.start()
+                logger.info("浏览器初始化成功")
+            except Exception as e:
+                logger.error(f"浏览器初始化失败: {str(e)}")
+                self.browser_pool.close()
+                self.browser_pool = None
+                self.use_browser = False
+    
+    def get_random_headers(self):
+        """生成随机请求头以模拟不同浏览器"""
+        ua = random.choice(self.user_agents)
+        # 随机生成 viewport 尺寸
+        viewports = [
+            "1280x800", "1366x768", "1440x900", "1536x864", "1680x1050", "1920x1080"
+        ]
+        viewport = random.choice(viewports)
+        width, height = map(int, viewport.split('x'))
+        
+        # 随机选择平台
+        platforms = ['Windows', 'Macintosh', 'X11']
+        platform = random.choice(platforms)
+        
+        # 随机选择Chrome版本
+        chrome_versions = ['112', '113', '114', '115', '116', '117']
+        chrome_version = random.choice(chrome_versions)
+
+        headers = {
+            'User-Agent': ua,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,zh-TW;q=0.7,zh-HK;q=0.6,ja;q=0.5',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Cache-Control': 'max-age=0',
+            'Sec-Ch-Ua': f'"Google Chrome";v="{chrome_version}", "Chromium";v="{chrome_version}", "Not=A?Brand";v="99"',
+            'Sec-Ch-Ua-Mobile': '?0',
+            'Sec-Ch-Ua-Platform': f'"{platform}"',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Sec-Fetch-User': '?1',
+            'Pragma': 'no-cache',
+            'Priority': 'u=0, i',
+            'DNT': '1',
+            'Viewport-Width': str(width),
+            'Device-Memory': f'{random.choice([4, 8, 16])}',
+            'Referer': 'https://www.google.com/',
+            'Cookie': f'1P_JAR=2024-{random.randint(1,12):02d}-{random.randint(1,28):02d}-{random.randint(0,23):02d}; NID={random.randint(100000000,999999999)}; DV={"".join([str(random.randint(0,9)) for _ in range(20)])}',
+        }
+        
+        # 随机添加额外的现代浏览器特征
+        if random.random() > 0.5:
+            headers.update({
+                'Sec-Ch-Ua-Full-Version': f'"{chrome_version}.0.{random.randint(1000,9999)}.{random.randint(100,999)}"',
+                'Sec-Ch-Ua-Arch': random.choice(['"x86"', '"arm"']),
+                'Sec-Ch-Ua-Model': '""',
+                'Sec-Ch-Ua-Bitness': random.choice(['"64"', '"32"']),
+                'Sec-Ch-Ua-Full-Version-List': f'"Google Chrome";v="{chrome_version}.0.{random.randint(1000,9999)}.{random.randint(100,999)}", "Chromium";v="{chrome_version}.0.{random.randint(1000,9999)}.{random.randint(100,999)}", "Not=A?Brand";v="99.0.0.0"',
+            })
+        
+        return headers
+    
+    @contextlib.contextmanager
+    def _keyword_browser(self):
+        """浏览器模式下一个关键词的所有页面使用同一个浏览器，点击跟踪的结果时它仍显示着结果页"""
+        if self.browser_pool is None:
+            yield
+            return
+        self._browser_local.driver = self.browser_pool.checkout()
+        try:
+            yield
+        finally:
+            driver = self._browser_local.driver
+            self._browser_local.driver = None
+            self.browser_pool.checkin(driver, not self.browser_pool.healthy(driver))
+
+    def _get_page_with_browser(self, url, search_engine="google"):
+        """使用当前关键词占用的浏览器获取页面内容，浏览器崩溃时换一个，之后的重试使用新浏览器"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        driver = self._browser_local.driver
+        try:
+            with self.metrics.time('browser_wait'):
+                driver.get(url)
+                # 等待搜索结果加载
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, SERP_SELECTORS[search_engine]['css'][0]))
+                )
+            return driver.page_source
+        except Exception as e:
+            logger.error(f"浏览器获取页面失败: {str(e)}")
+            if not self.browser_pool.healthy(driver):
+                logger.warning("浏览器已崩溃，换一个浏览器继续")
+                self._browser_local.driver = self.browser_pool.replace(driver)
+            return None
+
+    def _simulate_user_browsing(self, url, driver):
+        """
+        模拟用户浏览行为
+        
+        参数:
+            url (str): 要点击的结果
+            driver: 当前显示着结果页的浏览器
+        """
+        try:
+            logger.info(f"模拟用户点击并浏览: {url}")
+            
+            # 保存当前窗口句柄
+            original_window = driver.current_window_handle
+            try:
+                # 打开新标签页
+                driver.execute_script(f"window.open('{url}', '_blank');")
+                
+                # 切换到新标签页
+                driver.switch_to.window(driver.window_handles[-1])
+                
+                # 模拟用户浏览行为
+                total_height = int(driver.execute_script("return document.body.scrollHeight"))
+                for i in range(0, total_height, 100):
+                    driver.execute_script(f"window.scrollTo(0, {i});")
+                    time.sleep(random.uniform(0.1, 0.3))
+                
+                # 在页面停留随机时间（5-10秒）
+                time.sleep(random.uniform(5, 10))
+                
+                # 关闭当前标签页
+                driver.close()
+            finally:
+                # 确保切回结果页，之后的页面还要用这个浏览器
+                driver.switch_to.window(original_window)
+        except Exception as e:
+            logger.error(f"模拟用户浏览时出错: {str(e)}")
+
+    def _build_search_url(self, keyword, search_engine, start, region=None, num=10):
+        """
+        构建搜索URL
+        
+        参数:
+            start (int): 第一条结果的偏移量（从0开始）
+            num (int): 每页结果数
+        
+        返回:
+            str: 搜索URL，不支持的搜索引擎返回None
+        """
+        endpoint = self.search_endpoints.get(search_engine)
+        if search_engine == "google":
+            # 谷歌搜索的起始结果索引从0开始
+            url = f"{endpoint.format(region=region or self.region)}?q={quote_plus(keyword)}&start={start}&hl={GOOGLE_HL}"
+            return f"{url}&num={num}" if num != 10 else url
+        if search_engine == "bing":
+            # 必应搜索的起始结果从1开始
+            url = f"{endpoint}?q={quote_plus(keyword)}&first={start + 1}"
+            return f"{url}&count={num}" if num != 10 else url
+        return None
+
+    def _page_size(self, search_engine, remaining=None):
+        """
+        本次请求使用的每页结果数
+        
+        参数:
+            remaining (int): 还要检查的结果数，大页不超过该数
+        """
+        if self.large_pages and search_engine not in self._large_pages_ignored:
+            size = MAX_PAGE_SIZE.get(search_engine, 10)
+            return max(10, min(size, remaining)) if remaining else size
+        return 10
+
+    def _covered_results(self, search_engine, num, count):
+        """
+        大页请求实际覆盖的结果数
+        
+        返回不超过10条时无法区分"搜索引擎忽略了大页参数"（谷歌此时常常只返回8、9条）
+        和"这个关键词只有这么多结果"，这一页只按10条推进，不会漏掉后面的结果；
+        连续 LARGE_PAGE_STRIKES 次都这样才认定该搜索引擎忽略了大页参数，之后改回每页10条。
+        多于10条说明参数有效，此后该搜索引擎的大页返回不超过10条时才认为已是最后一页。
+        
+        参数:
+            num (int): 请求的每页结果数
+            count (int): 返回的结果数
+        
+        返回:
+            int: 本页覆盖的结果数
+        """
+        if num <= 10:
+            return num
+        with self._large_pages_lock:
+            if count > 10:
+                self._large_page_strikes[search_engine] = 0
+                self._large_pages_honoured.add(search_engine)
+                return num
+            if search_engine in self._large_pages_honoured:
+                # 参数有效时结果少说明已经到头
+                return num
+            strikes = self._large_page_strikes.get(search_engine, 0) + 1
+            self._large_page_strikes[search_engine] = strikes
+            if strikes >= LARGE_PAGE_STRIKES and search_engine not in self._large_pages_ignored:
+                logger.info(f"{search_engine} 连续 {strikes} 次未按每页 {num} 条返回结果，改为每页10条")
+                self._large_pages_ignored.add(search_engine)
+        return 10
+
+    def _fetch_page(self, search_url, search_engine="google"):
+        """
+        获取搜索结果页HTML
+        
+        返回:
+            str: 页面HTML
+        
+        异常:
+            FetchError: 非200状态码或浏览器加载失败；网络异常原样抛出
+        """
+        if self.use_browser:
+            html_content = self._get_page_with_browser(search_url, search_engine)
+            if not html_content:
+                raise FetchError('browser', "浏览器未能加载结果页")
+            return html_content
+        
+        headers = self.get_random_headers()
+        with self.metrics.time('fetch'):
+            status_code, html_content = self.fetcher.get(search_url, headers=headers)
+        self.metrics.inc('http_responses_total', status_code)
+        if status_code != 200:
+            if status_code in (429, 503):
+                kind = 'throttled'
+            elif status_code >= 500:
+                kind = 'server'
+            else:
+                kind = 'http'
+            raise FetchError(kind, f"状态码 {status_code}", status_code)
+        return html_content
+
+    def _retry_delay(self, attempt, kind):
+        """第attempt次重试前的退避秒数，带随机抖动"""
+        base = RETRY_BASE_DELAY * (2 if kind == 'throttled' else 1)
+        return random.uniform(0.5, 1.0) * min(RETRY_MAX_DELAY, base * 2 ** (attempt - 1))
+
+    def _new_keyword_data(self, keyword, search_engine, region, num_pages=None):
+        """创建一条空的关键词结果，每个跟踪域名一条排名"""
+        return {
+            'keyword': keyword,
+            'search_engine': search_engine,
+            'region': region,
+            'checked_at': time.time(),
+            # 检查的页数，自适应扫描据此判断历史上的"未找到"是否可信
+            'pages': num_pages,
+            'rankings': [{
+                'domain': domain,
+                'found': False,
+                'rank': None,
+                'page': None,
+                'url': None,
+            } for domain in self.target_domains],
+            'competitors': [],
+            # 重试后仍未获取到的页码，这些页面上的排名未知
+            'incomplete_pages': [],
+        }
+
+    def search_keyword(self, keyword, search_engine="google", num_pages=8, region=None, predicted_page=None):
+        """
+        搜索关键词并分析结果
+        
+        参数:
+            keyword (str): 要搜索的关键词
+            search_engine (str): 使用的搜索引擎 ("google", "bing")
+            num_pages (int): 要分析的搜索结果页数
+            region (str): Google搜索的区域，默认使用实例的region
+            predicted_page (int): 自适应扫描预测的页码，设置时从该页开始由近及远请求
+        
+        返回:
+            dict: 包含各跟踪域名排名信息的字典
+        """
+        with self._keyword_browser():
+            return self._search_pages(keyword, search_engine, num_pages, region, predicted_page)
+
+    def _search_pages(self, keyword, search_engine, num_pages, region, predicted_page):
+        """search_keyword 的实现，浏览器模式下在占用的浏览器中执行"""
+        if search_engine == "google":
+            region = region or self.region
+        else:
+            region = None
+        keyword_data = self._new_keyword_data(keyword, search_engine, region, num_pages)
+        rankings = {ranking['domain']: ranking for ranking in keyword_data['rankings']}
+        remaining = len(rankings)
+        if search_engine not in SERP_SELECTORS:
+            logger.error(f"不支持的搜索引擎: {search_engine}")
+            return keyword_data
+        
+        logger.info(f"搜索关键词: '{keyword}'")
+        
+        # 要检查的结果数；大页模式下一次请求覆盖多个页面，排名和页码仍按每页10条换算
+        depth = num_pages * 10
+        budget = RetryBudget(self.retry_budget)
+        # 自适应扫描时按页码顺序表逐页请求，否则从第1页开始顺序翻页
+        order = _scan_order(predicted_page, num_pages) if predicted_page and not self.large_pages else None
+        fetched = 0
+        start = 0
+        while True:
+            if order is not None:
+                if not order:
+                    break
+                start = (order.pop(0) - 1) * 10
+            elif start >= depth:
+                break
+            num = self._page_size(search_engine, depth - start)
+            fetched += 1
+            try:
+                search_results = self._get_results_page(keyword, search_engine, region, start, num, budget)
+            except FetchError as e:
+                if order is not None:
+                    # 按页码顺序表请求时只有这一页和顺序表中剩下的页没取到，已取到的页不在其中
+                    keyword_data['incomplete_pages'].append(start // 10 + 1)
+                    # 主机熔断或当天预算用完时剩下的页面也不再请求
+                    if e.kind in ('circuit_open', 'budget'):
+                        keyword_data['incomplete_pages'].extend(order)
+                        order = []
+                    continue
+                end = min(start + num, depth)
+                # 主机熔断或当天预算用完时剩下的页面也不再请求
+                if e.kind in ('circuit_open', 'budget'):
+                    end = depth
+                keyword_data['incomplete_pages'].extend(range(start // 10 + 1, end // 10 + 1))
+                start = end
+                continue
+            
+            if not search_results:
+                # 结果到头了: 之后的页面也不会有结果，不再请求，也不算未完成
+                logger.info(f"关键词 '{keyword}' 的结果在第 {start // 10 + 1} 页之前结束")
+                if order is not None:
+                    order = [page for page in order if page <= start // 10]
+                    continue
+                break
+            
+            # 大页请求只返回了一页的量时只按10条推进
+            num = self._covered_results(search_engine, num, len(search_results))
+            
+            match_started = time.perf_counter()
+            browsing_time = 0.0
+            for position, title, link in search_results:
+                # 计算实际排名和用户看到的页码
+                rank = start + position
+                if rank > depth:
+                    break
+                page = (rank - 1) // 10 + 1
+                
+                # 检查是否是跟踪的网站
+                domain = self.domain_matcher.match(link)
+                if domain:
+                    ranking = rankings[domain]
+                    # 同一域名只记录排名最靠前的结果
+                    if ranking['found']:
+                        continue
+                    ranking['found'] = True
+                    ranking['rank'] = rank
+                    ranking['page'] = page
+                    ranking['url'] = link
+                    remaining -= 1
+                    logger.info(f"在{search_engine}结果中找到 {domain}: 排名 #{rank}, 页面 #{page}, URL: {link}")
+                    
+                    # 模拟用户点击和浏览行为
+                    if self.use_browser and search_engine == "google" and domain == self.target_domain:
+                        browsing_started = time.perf_counter()
+                        with self.metrics.time('browser_wait'):
+                            self._simulate_user_browsing(link, self._browser_local.driver)
+                        browsing_time += time.perf_counter() - browsing_started
+                else:
+                    # 收集竞争对手数据
+                    keyword_data['competitors'].append(Competitor(rank, self._shared(title), self._shared(link)))
+            self.metrics.observe('match', time.perf_counter() - match_started - browsing_time)
+            
+            # 所有跟踪的网站都已找到时提前退出循环
+            if remaining == 0:
+                break
+            start += num
+        
+        if order is not None:
+            keyword_data['incomplete_pages'].sort()
+        if self.planner is not None:
+            # 顺序翻页时会一直请求到最后找到的跟踪域名所在的页
+            sequential = max(r['page'] for r in rankings.values()) if remaining == 0 else num_pages
+            self.metrics.inc('scan_pages_total', 'fetched', fetched)
+            self.metrics.inc('scan_pages_total', 'sequential', sequential)
+        return keyword_data
+    
+    def _get_results_page(self, keyword, search_engine, region, start, num, budget=None):
+        """
+        获取并解析一页搜索结果，优先读取缓存
+        
+        第1页之后没有解析出结果、也不像验证码或同意页的页面是结果的末尾，返回空列表，
+        不重试也不计入熔断。
+        
+        可重试的失败（限流、5xx、超时、连接失败、空结果页）按带抖动的指数退避重试，
+        每页最多 MAX_PAGE_ATTEMPTS 次，并消耗关键词的重试次数；退避通过推迟该主机
+        的限速时间片实现，其他线程也会一起避让。
+        
+        参数:
+            start (int): 第一条结果的偏移量
+            num (int): 每页结果数
+            budget (RetryBudget): 关键词的重试次数，为None时不重试
+        
+        返回:
+            list: [(页内排名, 标题, URL), ...]
+        
+        异常:
+            FetchError: 重试用尽或不可重试的失败
+        """
+        page = start // 10 + 1
+        search_url = self._build_search_url(keyword, search_engine, start, region, num)
+        host = urlsplit(search_url).netloc
+        cache_key = None
+        if self.cache is not None:
+            cache_key = SERPCache.make_key(search_engine, region, keyword, start,
+                                           GOOGLE_HL if search_engine == "google" else None, num)
+        
+        # 缓存命中时既不请求也不等待
+        html_content = self.cache.get(cache_key, self.replay) if cache_key else None
+        if html_content is not None:
+            logger.info(f"缓存命中页面 {page}: {search_url}")
+            with self.metrics.time('parse'):
+                return self._extract(html_content, search_engine)
+        if self.replay:
+            logger.warning(f"回放模式下缓存中没有页面 {page}: {search_url}")
+            raise FetchError('replay_miss', f"缓存中没有页面 {page}")
+        
+        attempt = 0
+        while True:
+            if not self.breaker.allow(host):
+                logger.warning(f"{host} 处于熔断状态，跳过页面 {page}")
+                raise FetchError('circuit_open', f"{host} 处于熔断状态")
+            
+            # 按主机限速，避免被搜索引擎检测为自动脚本；当天预算用完时不再请求
+            try:
+                delay_time = self.rate_limiter.acquire(host)
+            except FetchError as e:
+                self.breaker.release(host)
+                logger.warning(f"{e}，跳过页面 {page}")
+                raise
+            self.metrics.observe('delay', delay_time)
+            if delay_time > 0:
+                logger.debug(f"{host} 限速等待 {delay_time:.2f} 秒")
+            logger.info(f"请求页面 {page}: {search_url}" + (f" (第 {attempt + 1} 次尝试)" if attempt else ""))
+            
+            try:
+                html_content = self._fetch_page(search_url, search_engine)
+                with self.metrics.time('parse'):
+                    search_results = self._extract(html_content, search_engine)
+                if not search_results and (start == 0 or _looks_blocked(html_content)):
+                    self.metrics.inc('empty_pages_total', search_engine)
+                    raise FetchError('empty', "未解析出搜索结果")
+            except Exception as e:
+                error = e if isinstance(e, FetchError) else FetchError(_classify_exception(e), str(e))
+            else:
+                self.breaker.record_success(host)
+                # 只缓存解析出结果的页面，验证码页不会被回放；结果末尾的空页下次仍重新请求
+                if cache_key and search_results:
+                    self.cache.put(cache_key, html_content)
+                return search_results
+            
+            self.metrics.inc('fetch_errors_total', error.kind)
+            # 本地的未知错误（例如解析进程异常）与搜索主机无关，不计入熔断，
+            # 但这次若是熔断后的试探请求也要结束试探，否则该主机再也不会被请求
+            if error.kind == 'error':
+                self.breaker.release(host)
+            elif self.breaker.record_failure(host):
+                logger.warning(f"{host} 连续失败，熔断 {self.breaker.cooldown:.0f} 秒")
+            attempt += 1
+            if (not error.retryable or attempt >= MAX_PAGE_ATTEMPTS
+                    or budget is None or not budget.take()):
+                logger.error(f"关键词 '{keyword}' 页面 {page} 获取失败 ({error.kind}): {error}")
+                raise error
+            
+            retry_delay = self._retry_delay(attempt, error.kind)
+            logger.warning(f"关键词 '{keyword}' 页面 {page} 获取失败 ({error.kind}): {error}，"
+                           f"{retry_delay:.1f} 秒后重试")
+            self.metrics.inc('retries_total', error.kind)
+            self.rate_limiter.backoff(host, retry_delay)
+    
+    def set_outputs(self, journal=None, columnar=None):
+        """
+        设置之后的结果写到哪里，常驻运行时按天更换
+        
+        参数:
+            journal (ResultJournal): 结果日志，None表示结果留在内存中
+            columnar (ColumnarWriter): 列式输出，None表示不输出
+        """
+        self.journal = journal
+        self.columnar = columnar
+        # 竞争对手留在内存中时（作为库使用、不启用结果日志），不同关键词里重复出现的标题和URL只保存一份。
+        # 命令行运行总是启用结果日志，竞争对手写盘后即释放，内存中本来就没有它们，
+        # 共享表反而会让字符串常驻，不使用
+        self._strings = {} if journal is None else None
+
+    def search_host(self, search_engine, region=None):
+        """搜索引擎和区域对应的搜索主机，也就是限速、熔断和每日预算的单位"""
+        return urlsplit(self._build_search_url('', search_engine, 0, region)).netloc
+
+    def _shared(self, text):
+        """返回共享表中相同的字符串"""
+        if self._strings is None:
+            return text
+        return self._strings.setdefault(text, text)
+
+    def _extract(self, html_content, search_engine):
+        """解析结果页，开启解析进程池时交给进程池"""
+        if self.parse_pool is not None:
+            return self.parse_pool.extract(html_content, search_engine)
+        return self.extractor.extract(html_content, search_engine)
+    
+    def iter_tasks(self, keywords_list, search_engines, regions, num_pages):
+        """
+        展开(关键词, 搜索引擎, 区域, 页数)任务；必应不区分区域
+        
+        相邻任务落在不同主机上，让各主机的限速配额可以同时被用满。
+        关键词可以是带覆盖设置的字典（见 iter_keyword_file），覆盖的搜索引擎、区域和页数只对该行生效。
+        """
+        for item in keywords_list:
+            if isinstance(item, dict):
+                keyword = item['keyword']
+                engines = _split_list(item.get('search_engine')) or search_engines
+                row_regions = _split_list(item.get('region')) or regions
+                pages = item.get('pages') or num_pages
+            else:
+                keyword, engines, row_regions, pages = item, search_engines, regions, num_pages
+            for search_engine in engines:
+                if search_engine == "google":
+                    for region in row_regions:
+                        yield keyword, search_engine, region, pages
+                else:
+                    yield keyword, search_engine, None, pages
+
+    def run_task(self, keyword, search_engine, num_pages, region, predicted_page=None):
+        """
+        执行单个任务，可在工作线程中调用
+        
+        与 search_keyword 相同，但异常不会抛出: 出错的任务返回所有页面都未完成的结果，
+        不会中断整个批次。
+        
+        返回:
+            dict: 关键词结果，见 search_keyword
+        """
+        try:
+            with self.metrics.time('keyword'):
+                return self.search_keyword(keyword, search_engine, num_pages, region, predicted_page)
+        except Exception as e:
+            logger.error(f"处理关键词 '{keyword}' 时出错: {str(e)}")
+            keyword_data = self._new_keyword_data(keyword, search_engine, region, num_pages)
+            keyword_data['incomplete_pages'] = list(range(1, num_pages + 1))
+            return keyword_data
+
+    def summary_rows(self):
+        """每个(关键词, 域名)一行的摘要，analyze_keywords已经构建过时直接复用"""
+        if self._summary is None:
+            self._summary = _summary_rows(self.results)
+        return self._summary
+
+    def record_result(self, keyword_data):
+        """
+        保存刚完成的结果到 set_outputs 设置的列式输出和结果日志
+        
+        返回:
+            dict: 启用结果日志时返回去掉竞争对手列表的副本，否则原样返回
+        """
+        if self.columnar is not None:
+            self.columnar.write(keyword_data)
+        if self.journal is None:
+            return keyword_data
+        self.journal.append(keyword_data)
+        return _without_competitors(keyword_data)
+
+    def iter_full_results(self):
+        """
+        遍历本次运行带竞争对手列表的完整结果
+        
+        启用结果日志时按完成顺序从日志读取，同一任务只取本次运行的那条；
+        否则直接返回内存中的结果。可以多次调用，每次都重新遍历。
+        """
+        if self.journal is None:
+            for result in self.results:
+                yield result
+            return
+        # 同一任务重新执行过时日志中有多条，按检查时间取本次结果对应的那条
+        wanted = {_task_key(result): result.get('checked_at') for result in self.results}
+        for record in self.journal:
+            key = _task_key(record)
+            if key in wanted and wanted[key] == record.get('checked_at'):
+                del wanted[key]
+                yield record
+
+    def analyze_keywords(self, keywords_list, search_engine="google", num_pages=10, regions=None):
+        """
+        分析多个关键词的排名
+        
+        参数同 check_keywords
+            
+        返回:
+            pandas.DataFrame: 包含所有关键词排名数据的DataFrame
+        """
+        import pandas as pd
+        return pd.DataFrame(self.check_keywords(keywords_list, search_engine, num_pages, regions),
+                            columns=SUMMARY_COLUMNS)
+    
+    def check_keywords(self, keywords_list, search_engine="google", num_pages=10, regions=None):
+        """
+        分析多个关键词的排名，返回摘要行，不需要pandas
+        
+        关键词在线程池中并发执行，各搜索主机共享同一个限速器，
+        等待限速时其他线程的解析和匹配可以同时进行。
+        启用自适应扫描时，本次跳过的关键词不出现在结果中。
+        
+        参数:
+            keywords_list (iterable): 要分析的关键词，可以是惰性的生成器；
+                元素可以是带覆盖设置的字典，见 iter_keyword_file
+            search_engine (str|list): 使用的搜索引擎，可以是多个
+            num_pages (int): 要检查的页数
+            regions (list): Google搜索的区域列表，默认使用实例的region
+            
+        返回:
+            list: 每个(关键词, 域名)一行的摘要字典，列见 SUMMARY_COLUMNS
+        """
+        search_engines = _split_list(search_engine)
+        regions = _split_list(regions) or [self.region]
+        # 共享表只在一次运行内有效，之前的结果仍引用各自的字符串
+        if self._strings is not None:
+            self._strings = {}
+        
+        # 继续上次的运行时跳过日志中已完成的任务，有页面没取到的任务重新执行
+        resumed = {}
+        if self.journal:
+            resumed = {key: record for key, record in self.journal.completed().items()
+                       if not record.get('incomplete_pages')}
+        if resumed:
+            logger.info(f"从结果日志恢复了 {len(resumed)} 个已完成的任务")
+        
+        completed = {}
+        # 本次关键词列表中从日志恢复的任务: 任务键 -> 检查时间
+        reused = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+            tasks = self.iter_tasks(keywords_list, search_engines, regions, num_pages)
+            for index, (keyword, engine, region, pages) in enumerate(tasks):
+                previous = resumed.get((keyword, engine, region))
+                if previous is not None:
+                    completed[index] = previous
+                    reused[keyword, engine, region] = previous.get('checked_at')
+                    continue
+                predicted_page = None
+                if self.planner is not None:
+                    skip, predicted_page = self.planner.plan(keyword, engine, region, pages)
+                    if skip:
+                        self.metrics.inc('keywords_skipped_total', engine)
+                        self.metrics.inc('scan_pages_total', 'sequential', pages)
+                        continue
+                future = executor.submit(self.run_task, keyword, engine, pages, region, predicted_page)
+                pending[future] = index
+                # 限制排队的任务数，关键词列表可以是惰性的生成器
+                if len(pending) >= self.workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        completed[pending.pop(future)] = self.record_result(future.result())
+            for future in list(pending):
+                completed[pending.pop(future)] = self.record_result(future.result())
+        
+        # 恢复的结果也写入本次的列式输出，只写本次关键词列表中的任务，每个任务一条
+        if reused and self.columnar is not None:
+            for record in self.journal:
+                key = _task_key(record)
+                if key in reused and reused[key] == record.get('checked_at'):
+                    del reused[key]
+                    self.columnar.write(record)
+        
+        # 按输入顺序保存结果
+        self.results = [completed[index] for index in sorted(completed)]
+        
+        # 每个(关键词, 域名)一行；摘要只构建一次，导出时复用
+        self._summary = _summary_rows(self.results)
+        return self._summary
+    
+    def competitor_analytics(self, limit=None):
+        """
+        本次运行的竞争对手分析，见 competitor_analytics
+        
+        返回:
+            pandas.DataFrame: 每个主机一行
+        """
+        with self.metrics.time('analytics'):
+            frame, task_count = competitor_frame(self.iter_full_results())
+            return competitor_analytics(frame, task_count, self.target_domain, limit)
+    
+    def export_results(self, filename="seo_analysis_results.xlsx", competitor_layout="auto", analytics=None):
+        """
+        将结果导出到Excel文件
+        
+        参数:
+            filename (str): 输出文件名
+            competitor_layout (str): 竞争对手的输出方式 ("auto", "sheets", "long")，见 export_excel
+            analytics (pandas.DataFrame): competitor_analytics 的结果，设置时写入"竞争对手分析"表
+        """
+        if not self.results:
+            logger.warning("没有可导出的结果")
+            return
+        
+        multiple = len({(r['search_engine'], r['region']) for r in self.results}) > 1
+        with self.metrics.time('export'):
+            export_excel(filename, self.summary_rows(), self.iter_full_results(), len(self.results),
+                         competitor_layout, multiple, _analytics_rows(analytics) if analytics is not None else None)
+        logger.info(f"结果已导出到 {filename}")
+        
+        return filename
+
+    def close(self):
+        """关闭连接池、解析进程池和浏览器池，可重复调用"""
+        self.fetcher.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+            self.parse_pool = None
+        if self.browser_pool is not None:
+            self.browser_pool.close()
+            self.browser_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_config(config_file='config.yaml'):
+    """
+    从配置文件加载配置
+    
+    参数:
+        config_file (str): 配置文件路径
+        
+    返回:
+        dict: 包含配置的字典
+    """
+    if not os.path.exists(config_file):
+        logger.warning(f"配置文件 {config_file} 不存在，将使用默认配置")
+        return {}
+        
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            if config_file.endswith('.yaml') or config_file.endswith('.yml'):
+                import yaml
+                config = yaml.safe_load(f)
+            elif config_file.endswith('.json'):
+                config = json.load(f)
+            else:
+                logger.error(f"不支持的配置文件格式: {config_file}")
+                return {}
+                
+        logger.info(f"已从 {config_file} 加载配置")
+        return config
+    except Exception as e:
+        logger.error(f"读取配置文件 {config_file} 时出错: {str(e)}")
+        return {}
+
+def _detect_engine(path):
+    """根据保存的页面文件名推断搜索引擎"""
+    return 'bing' if 'bing' in os.path.basename(path).lower() else 'google'
+
+
+def benchmark_parsers(pages, rounds=20, backends=('lxml', 'bs4')):
+    """
+    对比不同解析后端在保存的搜索结果页上的速度
+    
+    参数:
+        pages (list): [(搜索引擎, HTML), ...]
+        rounds (int): 每个页面重复解析的次数
+        backends (tuple): 要对比的解析后端
+        
+    返回:
+        list: 每个后端一条的统计字典
+    """
+    stats = []
+    for backend in backends:
+        extractor = SERPExtractor(backend)
+        if extractor.backend != backend:
+            logger.warning(f"解析后端 {backend} 不可用，跳过")
+            continue
+        
+        result_count = 0
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for engine, html_content in pages:
+                result_count += len(extractor.extract(html_content, engine))
+        elapsed = time.perf_counter() - started
+        
+        parsed = rounds * len(pages)
+        stats.append({
+            'backend': backend,
+            'pages': parsed,
+            'seconds': elapsed,
+            'pages_per_sec': parsed / elapsed if elapsed else float('inf'),
+            'results_per_page': result_count / parsed if parsed else 0,
+        })
+    return stats
+
+
+def benchmark_parse_pool(pages, rounds=20, worker_counts=(1, 2, 4), backend='auto'):
+    """
+    解析进程池在不同进程数下的吞吐
+    
+    参数:
+        pages (list): [(搜索引擎, HTML), ...]
+        rounds (int): 每个页面重复解析的次数
+        worker_counts (list): 要测试的进程数
+        backend (str): 解析后端
+        
+    返回:
+        list: 每个进程数一条的统计字典
+    """
+    stats = []
+    for workers in worker_counts:
+        pool = ParsePool(workers, backend)
+        try:
+            # 预热：让每个进程先完成启动和提取器初始化
+            for future in [pool.submit(html_content, engine) for engine, html_content in pages * workers]:
+                future.result()
+            
+            started = time.perf_counter()
+            futures = []
+            for _ in range(rounds):
+                for engine, html_content in pages:
+                    futures.append(pool.submit(html_content, engine))
+            result_count = sum(len(future.result()) for future in futures)
+            elapsed = time.perf_counter() - started
+        finally:
+            pool.close()
+        
+        parsed = len(futures)
+        stats.append({
+            'workers': workers,
+            'pages': parsed,
+            'seconds': elapsed,
+            'pages_per_sec': parsed / elapsed if elapsed else float('inf'),
+            'results_per_page': result_count / parsed if parsed else 0,
+        })
+    return stats
+
+
+def benchmark_fetch(num_requests=200, pool_size=10, http2=False):
+    """
+    在本地模拟服务器上对比逐次requests.get与连接池抓取
+    
+    参数:
+        num_requests (int): 请求次数
+        pool_size (int): 连接池大小
+        http2 (bool): 连接池是否使用HTTP/2
+        
+    返回:
+        list: 每种方式一条的统计字典
+    """
+    import requests
+    stats = []
+    with StandInSearchServer() as server:
+        url = f"{server.base_url}/search?q=benchmark"
+        
+        started = time.perf_counter()
+        for _ in range(num_requests):
+            requests.get(url, timeout=10).text
+        elapsed = time.perf_counter() - started
+        stats.append({'mode': 'requests.get', 'seconds': elapsed,
+                      'requests': num_requests, 'connections': num_requests})
+        
+        fetcher = HTTPFetcher(pool_size, http2)
+        started = time.perf_counter()
+        for _ in range(num_requests):
+            fetcher.get(url)
+        elapsed = time.perf_counter() - started
+        connection_stats = fetcher.connection_stats()
+        fetcher.close()
+        stats.append({'mode': 'http2-pool' if fetcher.http2 else 'session-pool', 'seconds': elapsed,
+                      'requests': connection_stats['requests'],
+                      'connections': connection_stats['connections']})
+    return stats
+
+
+# 启动时不应导入的重依赖
+HEAVY_MODULES = ('pandas', 'bs4', 'openpyxl', 'selenium', 'undetected_chromedriver', 'fake_useragent',
+                 'pyarrow', 'requests', 'yaml', 'httpx')
+
+# 在子进程中导入本脚本，输出导入耗时和被导入的重依赖
+_IMPORT_PROBE = """
+import importlib.util, json, sys, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location('seo_startup_probe', sys.argv[1])
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'modules': sorted(m for m in sys.argv[2:] if m in sys.modules)}))
+"""
+
+
+def benchmark_startup(rounds=5):
+    """
+    启动耗时：子进程运行 --help 的总耗时，以及导入本脚本的耗时和导入了哪些重依赖
+    
+    参数:
+        rounds (int): 重复次数，耗时取中位数
+    
+    返回:
+        dict: python_seconds(空解释器启动), help_seconds, import_seconds, heavy_modules
+    """
+    script = os.path.abspath(__file__)
+    commands = {
+        'python_seconds': [sys.executable, '-c', 'pass'],
+        'help_seconds': [sys.executable, script, '--help'],
+    }
+    timings = {name: [] for name in commands}
+    imports = []
+    heavy_modules = []
+    with tempfile.TemporaryDirectory() as directory:
+        # 在临时目录中运行，日志文件不会写到当前目录
+        for _ in range(rounds):
+            for name, command in commands.items():
+                started = time.perf_counter()
+                subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=directory, check=True)
+                timings[name].append(time.perf_counter() - started)
+            output = subprocess.run([sys.executable, '-c', _IMPORT_PROBE, script] + list(HEAVY_MODULES),
+                                    stdout=subprocess.PIPE, cwd=directory, check=True).stdout
+            probe = json.loads(output)
+            imports.append(probe['seconds'])
+            heavy_modules = probe['modules']
+    
+    stats = {name: statistics.median(values) for name, values in timings.items()}
+    stats['import_seconds'] = statistics.median(imports)
+    stats['heavy_modules'] = heavy_modules
+    return stats
+
+
+def _synthetic_results(num_keywords, domains=('example.com',), competitors_per_keyword=30, layout='compact',
+                       strings=None):
+    """
+    生成用于导出和内存基准的模拟结果
+    
+    相关关键词的结果页里大量重复同一批页面；标题和URL每次都新建字符串，和解析结果一样。
+    
+    参数:
+        layout (str): "compact" 竞争对手为 Competitor，"dict" 为改用元组之前的字典格式
+        strings (dict): 字符串共享表，为None时不共享
+    """
+    def shared(text):
+        return strings.setdefault(text, text) if strings is not None else text
+    
+    for index in range(num_keywords):
+        yield {
+            'keyword': f"关键词{index}",
+            'search_engine': 'google',
+            'region': 'com',
+            'checked_at': time.time(),
+            'rankings': [{
+                'domain': domain,
+                'found': index % 3 == 0,
+                'rank': index % 50 + 1 if index % 3 == 0 else None,
+                'page': index % 50 // 10 + 1 if index % 3 == 0 else None,
+                'url': f"https://{domain}/page{index}" if index % 3 == 0 else None,
+            } for domain in domains],
+            'competitors': [_synthetic_competitor(rank, (index * 7 + rank) % 2000, layout, shared)
+                            for rank in range(1, competitors_per_keyword + 1)],
+        }
+
+
+def _synthetic_competitor(rank, page, layout, shared):
+    title = shared(f"竞争对手页面标题 {page}")
+    url = shared(f"https://site{page % 500}.com/article/{page}")
+    if layout == 'dict':
+        return {'rank': rank, 'title': title, 'url': url}
+    return Competitor(rank, title, url)
+
+
+def benchmark_records(sizes=(1000, 10000), competitors_per_keyword=100):
+    """
+    结果在内存中的占用：改用元组之前的字典格式与 Competitor 加字符串共享的对比
+    
+    统计的是结果列表构建完后仍被引用的内存，也就是导出之前一直占着的部分。
+    
+    参数:
+        sizes (list): 关键词数量
+        competitors_per_keyword (int): 每个关键词的竞争对手数，100相当于检查10页
+    
+    返回:
+        list: 每个规模一条的统计字典 (keywords, competitors, dict_mb, compact_mb, ratio)
+    """
+    stats = []
+    for size in sizes:
+        row = {'keywords': size, 'competitors': size * competitors_per_keyword}
+        for layout in ('dict', 'compact'):
+            strings = {} if layout == 'compact' else None
+            tracemalloc.start()
+            results = list(_synthetic_results(size, competitors_per_keyword=competitors_per_keyword,
+                                              layout=layout, strings=strings))
+            row[f'{layout}_mb'] = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+            tracemalloc.stop()
+            del results, strings
+        row['ratio'] = row['compact_mb'] / row['dict_mb']
+        stats.append(row)
+    return stats
+
+
+def benchmark_export(sizes=(100, 1000, 10000), layout='long', measure_memory=False):
+    """
+    不同关键词数量下的Excel导出耗时和峰值内存
+    
+    参数:
+        sizes (list): 关键词数量
+        layout (str): 竞争对手的输出方式
+        measure_memory (bool): 是否用tracemalloc统计峰值内存（会明显拖慢导出）
+    
+    返回:
+        list: 每个规模一条的统计字典，未统计内存时peak_mb为None
+    """
+    stats = []
+    for size in sizes:
+        results = list(_synthetic_results(size))
+        summary = _summary_rows(results)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'benchmark.xlsx')
+            # 只统计导出过程中新分配的内存
+            if measure_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            export_excel(filename, summary, results, size, layout)
+            elapsed = time.perf_counter() - started
+            peak_mb = None
+            if measure_memory:
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                tracemalloc.stop()
+            file_size = os.path.getsize(filename)
+        stats.append({'keywords': size, 'seconds': elapsed, 'peak_mb': peak_mb,
+                      'file_mb': file_size / 1024 / 1024})
+    return stats
+
+
+# 仓库自带的离线结果页样本
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'serp')
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """
+    读取样本结果页
+    
+    参数:
+        directory (str): 样本目录，文件名包含bing的按必应解析，其余按谷歌解析
+        
+    返回:
+        list: [(搜索引擎, HTML), ...]，按文件名排序
+    """
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='replace') as f:
+                pages.append((_detect_engine(name), f.read()))
+    return pages
+
+
+def benchmark_end_to_end(pages, num_keywords=50, num_pages=3, engines=('google', 'bing'),
+                         workers=4, latency=0.02, measure_memory=False, parse_workers=0):
+    """
+    在本地模拟搜索服务器上端到端跑一遍关键词分析（抓取、解析、匹配），请求间不做延迟
+    
+    目标域名不在样本中，每个关键词都会翻满num_pages页。
+    
+    参数:
+        pages (list): [(搜索引擎, HTML), ...]
+        num_keywords (int): 关键词数量
+        num_pages (int): 每个关键词检查的页数
+        engines (tuple): 要测试的搜索引擎
+        workers (int): 并发线程数
+        latency (float): 模拟服务器每个请求的延迟(秒)
+        measure_memory (bool): 是否用tracemalloc统计峰值内存（只统计本进程）
+        parse_workers (int): 解析进程数，0表示在抓取线程中解析
+        
+    返回:
+        dict: 统计结果，未统计内存时peak_mb为None
+    """
+    bodies = {}
+    for engine, html_content in pages:
+        bodies.setdefault(engine, []).append(html_content.encode('utf-8'))
+    engines = [engine for engine in engines if engine in bodies]
+    keywords = [f"基准关键词{index}" for index in range(num_keywords)]
+    
+    with StandInSearchServer(latency=latency, pages=bodies) as server:
+        tool = SEOResearchTool('not-in-fixtures.invalid', delay_min=0, delay_max=0, workers=workers,
+                               parse_workers=parse_workers)
+        tool.search_endpoints = server.search_endpoints()
+        # 逐页的日志会淹没结果，也会拖慢测量
+        level = logger.level
+        logger.setLevel(logging.WARNING)
+        if measure_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            for engine in engines:
+                tool.check_keywords(keywords, engine, num_pages)
+        finally:
+            logger.setLevel(level)
+        elapsed = time.perf_counter() - started
+        peak_mb = None
+        if measure_memory:
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+        requests_made = tool.fetcher.connection_stats()['requests']
+        tool.close()
+    
+    checked = num_keywords * len(engines)
+    return {
+        'keywords': checked,
+        'pages': requests_made,
+        'seconds': elapsed,
+        'keywords_per_sec': checked / elapsed if elapsed else float('inf'),
+        'pages_per_sec': requests_made / elapsed if elapsed else float('inf'),
+        'peak_mb': peak_mb,
+    }
+
+
+def run_benchmark_suite(pages, rounds=20, num_keywords=50, num_pages=3, latency=0.02,
+                        sizes=(100, 1000, 10000), layout='long', measure_memory=False):
+    """
+    依次跑解析、端到端和导出基准，汇总成扁平的指标字典
+    
+    指标名以 _per_sec 结尾的越大越好，其余(秒、MB)越小越好。
+    
+    返回:
+        dict: 指标名 -> 数值
+    """
+    metrics = {}
+    startup = benchmark_startup()
+    metrics['startup.help_seconds'] = startup['help_seconds']
+    metrics['startup.import_seconds'] = startup['import_seconds']
+    
+    for row in benchmark_parsers(pages, rounds):
+        metrics[f"parse.{row['backend']}.pages_per_sec"] = row['pages_per_sec']
+    
+    e2e = benchmark_end_to_end(pages, num_keywords, num_pages, latency=latency,
+                               measure_memory=measure_memory)
+    metrics['e2e.keywords_per_sec'] = e2e['keywords_per_sec']
+    metrics['e2e.pages_per_sec'] = e2e['pages_per_sec']
+    if e2e['peak_mb'] is not None:
+        metrics['e2e.peak_mb'] = e2e['peak_mb']
+    
+    for row in benchmark_export(sizes, layout, measure_memory):
+        metrics[f"export.{row['keywords']}.seconds"] = row['seconds']
+        if row['peak_mb'] is not None:
+            metrics[f"export.{row['keywords']}.peak_mb"] = row['peak_mb']
+    
+    for row in benchmark_records((1000,)):
+        metrics[f"records.{row['keywords']}.compact_mb"] = row['compact_mb']
+    
+    for row in benchmark_analytics((1000,)):
+        metrics[f"analytics.{row['keywords']}.seconds"] = row['frame_seconds'] + row['aggregate_seconds']
+    return metrics
+
+
+def _bench_parse(args):
+    """解析后端基准"""
+    pages = []
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append((_detect_engine(path), f.read()))
+    if not pages:
+        pages = load_fixtures(args.fixtures)
+    
+    stats = benchmark_parsers(pages, args.rounds)
+    logger.info(f"解析基准 ({len(pages)} 个页面 x {args.rounds} 轮):")
+    for row in stats:
+        logger.info(f"- {row['backend']:<5} {row['pages_per_sec']:>10.1f} 页/秒 "
+                    f"(共 {row['seconds']:.3f} 秒, 平均每页 {row['results_per_page']:.1f} 条结果)")
+    if len(stats) == 2 and stats[1]['pages_per_sec']:
+        logger.info(f"- 加速比: {stats[0]['pages_per_sec'] / stats[1]['pages_per_sec']:.2f}x")
+    
+    worker_counts = [workers for workers in args.parse_workers if workers > 0]
+    if worker_counts:
+        pool_stats = benchmark_parse_pool(pages, args.rounds, worker_counts)
+        single = pool_stats[0]['pages_per_sec'] / pool_stats[0]['workers']
+        logger.info(f"解析进程池 (本机 {os.cpu_count()} 核):")
+        for row in pool_stats:
+            logger.info(f"- {row['workers']:>2} 个进程 {row['pages_per_sec']:>10.1f} 页/秒 "
+                        f"(相对单进程 {row['pages_per_sec'] / single:.2f}x)")
+
+
+def _bench_fetch(args):
+    """连接池基准"""
+    stats = benchmark_fetch(args.requests, args.pool_size, args.http2)
+    logger.info(f"抓取基准 (本地模拟服务器, {args.requests} 个请求):")
+    for row in stats:
+        logger.info(f"- {row['mode']:<13} {row['requests'] / row['seconds']:>8.1f} 请求/秒 "
+                    f"(共 {row['seconds']:.3f} 秒, 新建连接 {row['connections']} 个)")
+
+
+def _bench_export(args):
+    """Excel导出基准"""
+    stats = benchmark_export(args.sizes, args.layout, args.memory)
+    logger.info(f"导出基准 (每个关键词30个竞争对手, 竞争对手输出方式: {args.layout}):")
+    for row in stats:
+        memory = f", 峰值内存 {row['peak_mb']:.1f} MB" if row['peak_mb'] is not None else ""
+        logger.info(f"- {row['keywords']:>6} 个关键词: {row['seconds']:.2f} 秒{memory}, 文件 {row['file_mb']:.1f} MB")
+
+
+def benchmark_analytics(sizes=(1000, 10000), competitors_per_keyword=100):
+    """
+    竞争对手分析的耗时：展开成列式表和分组汇总分别计时
+    
+    返回:
+        list: 每个规模一条的统计字典 (keywords, rows, frame_seconds, aggregate_seconds)
+    """
+    stats = []
+    for size in sizes:
+        results = list(_synthetic_results(size, competitors_per_keyword=competitors_per_keyword, strings={}))
+        started = time.perf_counter()
+        frame, task_count = competitor_frame(results)
+        built = time.perf_counter()
+        competitor_analytics(frame, task_count, 'example.com')
+        stats.append({'keywords': size, 'rows': len(frame), 'frame_seconds': built - started,
+                      'aggregate_seconds': time.perf_counter() - built})
+    return stats
+
+
+def _bench_analytics(args):
+    """竞争对手分析基准"""
+    stats = benchmark_analytics(args.sizes)
+    logger.info("竞争对手分析 (每个关键词100个竞争对手):")
+    for row in stats:
+        logger.info(f"- {row['keywords']:>6} 个关键词 ({row['rows']} 条排名): 展开 {row['frame_seconds']:.2f} 秒, "
+                    f"汇总 {row['aggregate_seconds']:.2f} 秒")
+
+
+def _bench_records(args):
+    """结果内存占用基准"""
+    stats = benchmark_records(args.sizes)
+    logger.info("结果内存占用 (每个关键词100个竞争对手, 即检查10页):")
+    for row in stats:
+        logger.info(f"- {row['keywords']:>6} 个关键词 ({row['competitors']} 个竞争对手): 字典 {row['dict_mb']:.1f} MB, "
+                    f"Competitor+字符串共享 {row['compact_mb']:.1f} MB ({row['ratio']:.0%})")
+
+
+def _bench_startup(args):
+    """启动耗时基准"""
+    stats = benchmark_startup(args.rounds)
+    logger.info(f"启动基准 ({args.rounds} 轮中位数):")
+    logger.info(f"- 空解释器启动:   {stats['python_seconds'] * 1000:>8.1f} ms")
+    logger.info(f"- --help 总耗时:  {stats['help_seconds'] * 1000:>8.1f} ms")
+    logger.info(f"- 导入本脚本:     {stats['import_seconds'] * 1000:>8.1f} ms")
+    if stats['heavy_modules']:
+        logger.warning(f"导入时加载了重依赖: {', '.join(stats['heavy_modules'])}")
+    else:
+        logger.info("- 导入时没有加载重依赖")
+
+
+def _bench_e2e(args):
+    """端到端基准"""
+    pages = load_fixtures(args.fixtures)
+    logger.info(f"端到端基准 (本地模拟服务器, 每个请求延迟 {args.latency * 1000:.0f} ms, {args.workers} 个线程):")
+    for parse_workers in args.parse_workers or [0]:
+        row = benchmark_end_to_end(pages, args.keywords, args.pages, workers=args.workers,
+                                   latency=args.latency, measure_memory=args.memory,
+                                   parse_workers=parse_workers)
+        memory = f", 峰值内存 {row['peak_mb']:.1f} MB" if row['peak_mb'] is not None else ""
+        mode = f"{parse_workers} 个解析进程" if parse_workers else "线程内解析"
+        logger.info(f"- [{mode}] {row['keywords']} 个关键词, {row['pages']} 个页面, 共 {row['seconds']:.2f} 秒{memory}, "
+                    f"{row['keywords_per_sec']:.1f} 关键词/秒, {row['pages_per_sec']:.1f} 页/秒")
+
+
+def _bench_suite(args):
+    """
+    完整基准套件，打印各项指标
+    
+    与基线对比、防止性能回退使用 tests/benchmarks 中的 pytest-benchmark 测试
+    """
+    pages = load_fixtures(args.fixtures)
+    metrics = run_benchmark_suite(pages, args.rounds, args.keywords, args.pages, args.latency,
+                                  args.sizes, args.layout, args.memory)
+    logger.info(f"基准套件 ({len(pages)} 个样本页):")
+    for name, value in metrics.items():
+        logger.info(f"- {name:<32} {value:>12.3f}")
+
+
+BENCHMARKS = {
+    'parse': _bench_parse,
+    'fetch': _bench_fetch,
+    'export': _bench_export,
+    'records': _bench_records,
+    'analytics': _bench_analytics,
+    'e2e': _bench_e2e,
+    'startup': _bench_startup,
+    'suite': _bench_suite,
+}
+
+
+def bench_main(argv):
+    """基准测试子命令"""
+    parser = argparse.ArgumentParser(prog='seo-research-tool.py bench',
+                                     description='SEO研究工具性能基准测试')
+    parser.add_argument('target', choices=list(BENCHMARKS),
+                        help='要测试的环节 (parse: 结果页解析, fetch: 连接池抓取, export: Excel导出, '
+                             'records: 结果内存占用, analytics: 竞争对手分析, e2e: 端到端关键词分析, startup: 启动耗时, '
+                             'suite: 以上全部)')
+    parser.add_argument('files', nargs='*',
+                        help='parse基准使用的结果页HTML文件，文件名包含bing的按必应解析，其余按谷歌解析 (默认: 自带样本)')
+    parser.add_argument('--fixtures', type=str, default=FIXTURES_DIR,
+                        help='样本结果页目录 (默认: fixtures/serp)')
+    parser.add_argument('--rounds', type=int, default=20,
+                        help='每个页面重复解析的次数，startup基准的重复次数 (默认: 20)')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='fetch基准的请求次数 (默认: 200)')
+    parser.add_argument('--pool-size', type=int, default=10,
+                        help='fetch基准的连接池大小 (默认: 10)')
+    parser.add_argument('--http2', action='store_true',
+                        help='fetch基准的连接池使用HTTP/2')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='export/records/analytics基准的关键词数量 (默认: 100 1000 10000)')
+    parser.add_argument('--layout', choices=['sheets', 'long'], default='long',
+                        help='export基准的竞争对手输出方式 (默认: long)')
+    parser.add_argument('--keywords', type=int, default=50,
+                        help='e2e基准的关键词数量 (默认: 50)')
+    parser.add_argument('--pages', type=int, default=3,
+                        help='e2e基准每个关键词检查的页数 (默认: 3)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='e2e基准的并发线程数 (默认: 4)')
+    parser.add_argument('--parse-workers', type=int, nargs='+', default=[],
+                        help='parse: 额外测试这些进程数的解析进程池; e2e: 依次用这些解析进程数运行，0为线程内解析')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='模拟服务器每个请求的延迟秒数 (默认: 0.02)')
+    parser.add_argument('--memory', action='store_true',
+                        help='统计峰值内存 (使用tracemalloc，耗时会明显增加)')
+    args = parser.parse_args(argv)
+    
+    return BENCHMARKS[args.target](args)
+
+
+def _log_metrics_summary(metrics):
+    """打印各环节耗时汇总表和计数器"""
+    rows = metrics.summary_rows()
+    if rows:
+        logger.info("\n各环节耗时 (毫秒, 分位数为直方图桶上界):")
+        logger.info(f"  {'环节':<12} {'次数':>8} {'总秒数':>10} {'平均':>10} {'p50':>10} {'p95':>10} {'最大':>10}")
+        for phase, count, total, mean, p50, p95, maximum in rows:
+            logger.info(f"  {phase:<12} {count:>8} {total:>10.2f} {mean:>10.1f} {p50:>10.1f} {p95:>10.1f} {maximum:>10.1f}")
+    statuses = metrics.counter('http_responses_total')
+    if statuses:
+        logger.info("- HTTP状态码: " + ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items())))
+    for name, label in (('empty_pages_total', '空结果页'), ('fetch_errors_total', '获取失败'),
+                        ('retries_total', '重试')):
+        counts = metrics.counter(name)
+        if counts:
+            logger.info(f"- {label}: " + ", ".join(f"{engine}: {count}" for engine, count in sorted(counts.items())))
+
+
+def _format_rank(rank):
+    return f"#{rank}" if rank is not None else "未找到"
+
+
+def history_main(argv):
+    """历史排名查询子命令"""
+    parser = argparse.ArgumentParser(prog='seo-research-tool.py history',
+                                     description='查询历史排名库')
+    parser.add_argument('query', choices=['runs', 'rank', 'movers', 'sov'],
+                        help='runs: 运行列表, rank: 排名走势, movers: 变化最大的关键词, sov: 竞争对手曝光份额')
+    parser.add_argument('--store', type=str, default='seo_rank_history.db',
+                        help='历史排名库路径 (默认: seo_rank_history.db)')
+    parser.add_argument('--domain', '-d', type=str,
+                        help='域名 (rank/movers需要)')
+    parser.add_argument('--keyword', '-k', type=str,
+                        help='关键词 (rank需要)')
+    parser.add_argument('--search-engine', '-s', type=str,
+                        help='只看某个搜索引擎')
+    parser.add_argument('--region', '-r', type=str,
+                        help='只看某个区域')
+    parser.add_argument('--runs', type=int, nargs=2, metavar=('OLD', 'NEW'),
+                        help='movers对比的两次运行编号 (默认: 最近两次)')
+    parser.add_argument('--run', type=int,
+                        help='sov统计的运行编号 (默认: 最近一次)')
+    parser.add_argument('--limit', type=int, default=20,
+                        help='返回条数 (默认: 20)')
+    args = parser.parse_args(argv)
+    
+    if not os.path.exists(args.store):
+        logger.error(f"历史排名库 {args.store} 不存在")
+        return
+    if args.query in ('rank', 'movers') and not args.domain:
+        parser.error(f"{args.query} 需要 --domain")
+    if args.query == 'rank' and not args.keyword:
+        parser.error("rank 需要 --keyword")
+    
+    store = RankStore(args.store)
+    started = time.perf_counter()
+    if args.query == 'runs':
+        rows = store.runs(args.limit)
+        lines = [f"- run {run_id}: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started_at))}"
+                 f"{' ' + label if label else ''}" for run_id, started_at, label in rows]
+    elif args.query == 'rank':
+        rows = store.rank_history(args.domain, args.keyword, args.search_engine, args.region)
+        lines = [f"- {time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))} run {run_id} "
+                 f"[{engine}{'/' + region if region else ''}]: {_format_rank(rank)}"
+                 for ts, run_id, engine, region, rank, page in rows]
+    elif args.query == 'movers':
+        run_a, run_b = args.runs or (None, None)
+        rows = store.movers(args.domain, run_a, run_b, args.limit)
+        lines = [f"- '{keyword}' [{engine}{'/' + region if region else ''}]: "
+                 f"{_format_rank(old)} -> {_format_rank(new)} ({'+' if delta > 0 else ''}{delta})"
+                 for keyword, engine, region, old, new, delta in rows]
+    else:
+        rows = store.share_of_voice(args.run, args.limit)
+        lines = [f"- {host}: {share:.1%} (出现 {hits} 次, 覆盖 {keywords} 个关键词, 平均排名 {avg_rank:.1f})"
+                 for host, hits, keywords, avg_rank, share in rows]
+    elapsed = time.perf_counter() - started
+    store.close()
+    
+    for line in lines:
+        logger.info(line)
+    logger.info(f"共 {len(rows)} 条 (查询耗时 {elapsed * 1000:.1f} 毫秒)")
+
+
+def _add_tool_arguments(parser):
+    """抓取和解析相关的参数，主命令和 worker 子命令共用"""
+    parser.add_argument('--delay-min', type=float,
+                        help='请求之间的最小延迟(秒)')
+    
+    parser.add_argument('--delay-max', type=float,
+                        help='请求之间的最大延迟(秒)')
+    
+    parser.add_argument('--use-browser', '-b', action='store_true',
+                        help='使用浏览器模式进行搜索，每个并发线程一个无头浏览器 (默认: False)')
+    
+    parser.add_argument('--show-browser', action='store_true',
+                        help='浏览器模式下显示浏览器窗口，不使用无头模式')
+    
+    parser.add_argument('--large-pages', action='store_true',
+                        help='大页模式: 每次请求搜索引擎支持的最大结果数 (谷歌100条, 必应50条)，减少请求次数')
+    
+    parser.add_argument('--parser', type=str,
+                        choices=list(SERPExtractor.BACKENDS),
+                        help='结果页解析后端 (默认: auto，优先lxml)')
+    
+    parser.add_argument('--workers', '-w', type=int,
+                        help='并发执行的关键词数 (默认: 4)')
+    
+    parser.add_argument('--pool-size', type=int,
+                        help='每个搜索主机保持的HTTP连接数 (默认: 10)')
+    
+    parser.add_argument('--http2', action='store_true',
+                        help='尝试使用HTTP/2 (需要安装httpx[http2])')
+    
+    parser.add_argument('--cache-dir', type=str,
+                        help='结果页磁盘缓存目录 (默认不缓存)')
+    
+    parser.add_argument('--cache-ttl', type=float,
+                        help='缓存有效期(小时) (默认: 24)')
+    
+    parser.add_argument('--cache-size', type=int,
+                        help='缓存总大小上限(MB) (默认: 512)')
+    
+    parser.add_argument('--replay', action='store_true',
+                        help='回放模式: 只使用缓存中的页面，从不访问网络')
+    
+    parser.add_argument('--parse-workers', type=int,
+                        help='解析进程数，多核机器上把结果页解析放到独立进程，0为在抓取线程中解析 (默认: 0)')
+    
+    parser.add_argument('--retries', type=int,
+                        help='每个关键词所有页面共用的重试次数，限流、超时等失败时按指数退避重试 (默认: 4)')
+    
+    parser.add_argument('--breaker-threshold', type=int,
+                        help='同一搜索主机连续失败多少次后熔断 (默认: 5)')
+    
+    parser.add_argument('--breaker-cooldown', type=float,
+                        help='熔断持续的秒数，之后放行一个试探请求 (默认: 120)')
+
+
+def _build_tool(args, config, domains, region, metrics, journal=None, columnar=None, planner=None,
+                daily_budget=0, queue=None):
+    """
+    按 _add_tool_arguments 的参数和配置文件创建SEOResearchTool
+    
+    命令行参数优先于配置文件，配置文件优先于默认值。给出queue（JobQueue）时
+    限速时间片和每日预算保存在任务队列中，与该队列的其他工作进程共享。
+    """
+    delay_min = args.delay_min or config.get('delay_min', 0.5)
+    delay_max = args.delay_max or config.get('delay_max', 1.5)
+    use_browser = args.use_browser or config.get('use_browser', False)
+    show_browser = args.show_browser or config.get('show_browser', False)
+    large_pages = args.large_pages or config.get('large_pages', False)
+    html_parser = args.parser or config.get('parser', 'auto')
+    workers = args.workers or config.get('workers', 4)
+    pool_size = args.pool_size or config.get('pool_size', 10)
+    http2 = args.http2 or config.get('http2', False)
+    replay = args.replay or config.get('replay', False)
+    cache_dir = args.cache_dir or config.get('cache_dir') or ('.serp_cache' if replay else None)
+    cache_ttl = args.cache_ttl or config.get('cache_ttl', 24)
+    cache_size = args.cache_size or config.get('cache_size', 512)
+    parse_workers = args.parse_workers or config.get('parse_workers', 0)
+    retries = args.retries if args.retries is not None else config.get('retries', 4)
+    breaker_threshold = args.breaker_threshold or config.get('breaker_threshold', 5)
+    breaker_cooldown = args.breaker_cooldown or config.get('breaker_cooldown', 120)
+    
+    cache = SERPCache(cache_dir, cache_ttl * 3600, cache_size * 1024 * 1024) if cache_dir else None
+    rate_limiter = QueueRateLimiter(queue, delay_min, delay_max, daily_budget) if queue is not None else None
+    return SEOResearchTool(domains, delay_min, delay_max, region, use_browser, html_parser, workers,
+                           pool_size, http2, cache, replay, journal, columnar, large_pages, metrics,
+                           retries, CircuitBreaker(breaker_threshold, breaker_cooldown), parse_workers,
+                           not show_browser, planner, daily_budget, rate_limiter)
+
+
+def _load_keywords(keywords_str, config, keywords_file=None):
+    """
+    从命令行参数、关键词文件或配置文件读取关键词
+    
+    返回:
+        iterable: 关键词列表，关键词文件为流式读取的生成器；未提供或无法解析时记录错误并返回None
+    """
+    keywords_file = keywords_file or config.get('keywords_file')
+    if not keywords_str and not keywords_file and not (config.get('keywords_list') or config.get('keywords')):
+        logger.error("未提供关键词，请通过命令行参数 --keywords、--keywords-file 或配置文件指定")
+        return None
+    
+    if keywords_file and not keywords_str:
+        if not os.path.exists(keywords_file):
+            logger.error(f"关键词文件 {keywords_file} 不存在")
+            return None
+        logger.info(f"从 {keywords_file} 流式读取关键词")
+        return iter_keyword_file(keywords_file)
+    if keywords_str:
+        # 从命令行参数获取关键词列表
+        return [k.strip() for k in keywords_str.split(',')]
+    if isinstance(config.get('keywords'), str):
+        # 配置文件中的关键词是字符串
+        return [k.strip() for k in config['keywords'].split(',')]
+    if isinstance(config.get('keywords_list'), list):
+        # 配置文件中的关键词是列表
+        return config['keywords_list']
+    logger.error("无法解析关键词列表")
+    return None
+
+
+def _log_run_summary(summary, target_domains):
+    """打印关键词排名摘要（以主域名为准）"""
+    if len(target_domains) > 1:
+        logger.info("\n各域名找到的关键词数:")
+        for tracked_domain in target_domains:
+            found = sum(1 for row in summary if row['domain'] == tracked_domain and row['found'])
+            logger.info(f"- {tracked_domain}: {found}")
+    summary = [row for row in summary if row['domain'] == target_domains[0]]
+    found_rows = [row for row in summary if row['found']]
+    # 没找到但有页面没取到的关键词排名未知，不算作未找到
+    incomplete_count = sum(1 for row in summary if not row['found'] and row['incomplete_pages'])
+    logger.info("\n关键词排名摘要:")
+    logger.info(f"- 分析的关键词总数: {len(summary)}")
+    logger.info(f"- 在搜索结果中找到的关键词数: {len(found_rows)}")
+    logger.info(f"- 未找到的关键词数: {len(summary) - len(found_rows) - incomplete_count}")
+    if incomplete_count:
+        logger.info(f"- 有页面未能获取、排名未知的关键词数: {incomplete_count} (见结果表的incomplete_pages列，--resume可重新检查)")
+    
+    if found_rows:
+        avg_rank = sum(row['rank'] for row in found_rows) / len(found_rows)
+        logger.info(f"- 平均排名位置: {avg_rank:.2f}")
         
-        return headers
+        # 打印排名靠前的关键词
+        logger.info("\n排名最好的关键词:")
+        for row in sorted(found_rows, key=lambda row: row['rank'])[:5]:
+            logger.info(f"- '{row['keyword']}' [{row['search_engine']}]: #{row['rank']} (第{row['page']}页)")
+
+
+def run_worker(queue, tool, worker_id, lease_seconds=600, poll=10, exit_when_idle=False):
+    """
+    从任务队列领取分片并执行，直到所有分片完成
+    
+    其他工作进程还持有租约时继续等待，它们失联后接手其分片。
     
-    def _get_page_with_browser(self, url):
-        """使用浏览器获取页面内容"""
+    参数:
+        queue (JobQueue): 任务队列
+        tool (SEOResearchTool): 执行分片的工具，目标域名需与队列设置一致
+        worker_id (str): 工作进程标识
+        lease_seconds (float): 租约时长(秒)
+        poll (float): 没有可领取的分片时的等待间隔(秒)
+        exit_when_idle (bool): 没有可领取的分片时立即退出，不等待其他工作进程
+        
+    返回:
+        int: 本进程完成的分片数
+    """
+    settings = queue.settings()
+    finished = 0
+    while True:
+        shard = queue.lease(worker_id, lease_seconds)
+        if shard is None:
+            progress = queue.progress()
+            if progress['done'] == progress['total'] or exit_when_idle:
+                break
+            time.sleep(poll)
+            continue
+        
+        shard_id, keywords, attempt = shard
+        if attempt > 1:
+            logger.warning(f"重新领取分片 {shard_id} (第 {attempt} 次)，上一个工作进程未在租约内完成")
+        logger.info(f"[{worker_id}] 执行分片 {shard_id}: {len(keywords)} 个关键词")
         try:
-            self.driver.get(url)
-            # 等待搜索结果加载
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[class*="g"]'))
-            )
-            return self.driver.page_source
-        except Exception as e:
-            logger.error(f"浏览器获取页面失败: {str(e)}")
-            return None
+            with queue.keep_leased(shard_id, worker_id, lease_seconds):
+                tool.check_keywords(keywords, settings['search_engines'], settings['pages'], settings['regions'])
+                records = list(tool.iter_full_results())
+        except BaseException:
+            # 中断或意外错误时交还分片，让其他工作进程立即接手
+            queue.release(shard_id, worker_id)
+            raise
+        if queue.complete(shard_id, worker_id, records):
+            finished += 1
+        else:
+            logger.warning(f"分片 {shard_id} 已由其他工作进程完成，丢弃本次结果")
+    return finished
 
-    def _simulate_user_browsing(self, url):
-        """模拟用户浏览行为"""
-        try:
-            if not self.use_browser:
-                logger.info("需要启用浏览器模式才能模拟用户浏览行为")
-                return
 
-            logger.info(f"模拟用户点击并浏览: {url}")
-            
-            # 保存当前窗口句柄
-            original_window = self.driver.current_window_handle
-            
-            # 打开新标签页
-            self.driver.execute_script(f"window.open('{url}', '_blank');")
-            
-            # 切换到新标签页
-            self.driver.switch_to.window(self.driver.window_handles[-1])
-            
-            # 模拟用户浏览行为
-            total_height = int(self.driver.execute_script("return document.body.scrollHeight"))
-            for i in range(0, total_height, 100):
-                self.driver.execute_script(f"window.scrollTo(0, {i});")
-                time.sleep(random.uniform(0.1, 0.3))
-            
-            # 在页面停留随机时间（15-30秒）
-            time.sleep(random.uniform(5, 10))
-            
-            # 关闭当前标签页并切回原标签页
-            self.driver.close()
-            self.driver.switch_to.window(original_window)
-            
-        except Exception as e:
-            logger.error(f"模拟用户浏览时出错: {str(e)}")
-            # 确保切回原始窗口
-            try:
-                self.driver.switch_to.window(original_window)
-            except:
-                pass
+def export_record_stream(read_records, filename, competitor_layout="auto"):
+    """
+    把可以重复读取的结果流导出到一个Excel文件
+    
+    竞争对手列表不留在内存中，先读一遍构建摘要，导出时再逐条读出。
+    
+    参数:
+        read_records (callable): 每次调用返回一个新的结果迭代器
+    
+    返回:
+        list: 每个(关键词, 域名)一行的摘要
+    """
+    results = [_without_competitors(record) for record in read_records()]
+    summary = _summary_rows(results)
+    if not results:
+        logger.warning("没有可导出的结果")
+        return summary
+    multiple = len({(r['search_engine'], r['region']) for r in results}) > 1
+    export_excel(filename, summary, read_records(), len(results), competitor_layout, multiple)
+    logger.info(f"结果已导出到 {filename}")
+    return summary
 
-    def search_keyword(self, keyword, search_engine="google", num_pages=8):
-        """
-        搜索关键词并分析结果
-        
-        参数:
-            keyword (str): 要搜索的关键词
-            search_engine (str): 使用的搜索引擎 ("google", "bing")
-            num_pages (int): 要分析的搜索结果页数
-        
-        返回:
-            dict: 包含排名信息的字典
-        """
-        keyword_data = {
-            'keyword': keyword,
-            'found': False,
-            'rank': None,
-            'page': None,
-            'url': None,
-            'competitors': []
+
+def export_queue_results(queue, filename, competitor_layout="auto"):
+    """
+    把任务队列中所有分片的结果合并导出到一个Excel文件
+    
+    返回:
+        list: 每个(关键词, 域名)一行的摘要
+    """
+    return export_record_stream(queue.iter_results, filename, competitor_layout)
+
+
+def analytics_main(argv):
+    """竞争对手分析子命令: 分析已有的结果日志或多进程任务队列"""
+    parser = argparse.ArgumentParser(prog='seo-research-tool.py analytics',
+                                     description='从结果日志或任务队列计算竞争对手的可见度、曝光份额和关键词重叠')
+    parser.add_argument('journal', nargs='?',
+                        help='结果日志路径 (运行时的 --journal，默认为 输出文件名.journal.jsonl)')
+    parser.add_argument('--queue', '-q', type=str,
+                        help='改为分析多进程任务队列中已完成的结果')
+    parser.add_argument('--domain', '-d', type=str,
+                        help='计算重叠使用的主域名 (默认: 结果中的第一个跟踪域名)')
+    parser.add_argument('--limit', type=int, default=20,
+                        help='打印的主机数 (默认: 20)')
+    parser.add_argument('--output', '-o', type=str,
+                        help='把全部主机的分析表写入CSV文件')
+    args = parser.parse_args(argv)
+    
+    path = args.queue or args.journal
+    if not path:
+        parser.error("需要结果日志路径或 --queue")
+    if not os.path.exists(path):
+        logger.error(f"{path} 不存在")
+        return 1
+    
+    queue = JobQueue(path) if args.queue else None
+    records = queue.iter_results() if queue is not None else ResultJournal.read_latest(path)
+    started = time.perf_counter()
+    frame, task_count = competitor_frame(records)
+    domain = _normalize_domain(args.domain) if args.domain else None
+    if domain is None:
+        tracked = frame.loc[frame['tracked'], 'host']
+        domain = tracked.iloc[0] if len(tracked) else None
+    table = competitor_analytics(frame, task_count, domain)
+    elapsed = time.perf_counter() - started
+    if queue is not None:
+        queue.close()
+    
+    if args.output:
+        table.to_csv(args.output, index=False, encoding='utf-8-sig')
+        logger.info(f"分析表已写入 {args.output}")
+    _log_analytics(table.head(args.limit))
+    logger.info(f"共 {task_count} 个结果, {len(frame)} 条排名, {len(table)} 个主机 (主域名: {domain or '无'}, "
+                f"耗时 {elapsed:.2f} 秒)")
+    return 0
+
+
+def _format_progress(progress):
+    text = f"已完成 {progress['done']}/{progress['total']} 个分片, 执行中 {progress['leased']}, 等待 {progress['pending']}"
+    if progress['expired']:
+        text += f", 租约过期待重新领取 {progress['expired']}"
+    return text
+
+
+def coordinator_main(argv):
+    """多进程运行的协调子命令: 切分关键词、等待工作进程完成并合并导出"""
+    parser = argparse.ArgumentParser(prog='seo-research-tool.py coordinator',
+                                     description='把关键词切成分片写入任务队列，等待工作进程执行完后合并导出')
+    parser.add_argument('--config', '-c', type=str, default='config.yaml',
+                        help='配置文件路径 (默认: config.yaml)')
+    parser.add_argument('--queue', '-q', type=str,
+                        help='任务队列路径 (默认: seo_jobs.db)')
+    parser.add_argument('--domain', '-d', type=str,
+                        help='要分析的目标域名，多个用逗号分隔，第一个为主域名')
+    parser.add_argument('--keywords', '-k', type=str,
+                        help='要分析的关键词，用逗号分隔')
+    parser.add_argument('--keywords-file', type=str,
+                        help='关键词文件 (CSV/TSV/TXT)，流式读取并去重，CSV可按行覆盖搜索引擎、区域和页数')
+    parser.add_argument('--region', '-r', type=str,
+                        help='Google搜索的区域，多个区域用逗号分隔')
+    parser.add_argument('--search-engine', '-s', type=str,
+                        help='使用的搜索引擎 (google, bing)，多个引擎用逗号分隔')
+    parser.add_argument('--pages', '-p', type=int,
+                        help='要检查的搜索结果页数')
+    parser.add_argument('--shard-size', type=int,
+                        help='每个分片的关键词数 (默认: 50)')
+    parser.add_argument('--reset', action='store_true',
+                        help='清空已有的任务队列重新切分；默认继续等待已有队列')
+    parser.add_argument('--submit-only', action='store_true',
+                        help='只写入任务队列，不等待和导出 (之后再次运行coordinator即可合并)')
+    parser.add_argument('--poll', type=float, default=10,
+                        help='检查进度的间隔(秒) (默认: 10)')
+    parser.add_argument('--output', '-o', type=str,
+                        help='输出文件名')
+    parser.add_argument('--competitor-layout', type=str, choices=['auto', 'sheets', 'long'],
+                        help='竞争对手的导出方式 (默认: auto)')
+    parser.add_argument('--store', type=str,
+                        help='历史排名库路径，设置后合并的结果写入一个run')
+    args = parser.parse_args(argv)
+    
+    config = load_config(args.config)
+    queue_path = args.queue or config.get('queue', 'seo_jobs.db')
+    output = args.output or config.get('output', 'seo_analysis_results.xlsx')
+    competitor_layout = args.competitor_layout or config.get('competitor_layout', 'auto')
+    store_path = args.store or config.get('store')
+    
+    queue = JobQueue(queue_path)
+    progress = queue.progress()
+    if progress['total'] and not args.reset:
+        logger.info(f"继续已有的任务队列 {queue_path} (使用 --reset 重新切分)")
+    else:
+        domains = _split_list(args.domain or config.get('domains') or config.get('domain'))
+        search_engines = _split_list(args.search_engine or config.get('search_engine', 'google'))
+        regions = _split_list(args.region or config.get('region', 'com'))
+        unsupported = [e for e in search_engines if e not in SERP_SELECTORS]
+        if unsupported or not search_engines:
+            logger.error(f"不支持的搜索引擎: {', '.join(unsupported)}")
+            return 1
+        if not domains:
+            logger.error("未提供目标域名，请通过命令行参数 --domain 或配置文件指定")
+            return 1
+        keywords_list = _load_keywords(args.keywords, config, args.keywords_file)
+        if keywords_list is None:
+            return 1
+        settings = {
+            'domains': domains,
+            'search_engines': search_engines,
+            'regions': regions,
+            'pages': args.pages or config.get('pages', 3),
+            'created_at': time.time(),
         }
-        
-        logger.info(f"搜索关键词: '{keyword}'")
-        
-        for page in range(1, num_pages + 1):
-            # 根据搜索引擎构建URL
-            if search_engine == "google":
-                # 谷歌搜索的起始结果索引是(page-1)*10
-                start_index = (page - 1) * 10
-                search_url = f"https://www.google.{self.region}/search?q={quote_plus(keyword)}&start={start_index}&hl=zh-CN"
-            elif search_engine == "bing":
-                # 必应搜索的页码参数
-                search_url = f"https://www.bing.com/search?q={quote_plus(keyword)}&first={(page-1)*10+1}"
-            else:
-                logger.error(f"不支持的搜索引擎: {search_engine}")
-                return keyword_data
-            
-            try:
-                logger.info(f"请求页面 {page}: {search_url}")
-                
-                if self.use_browser:
-                    html_content = self._get_page_with_browser(search_url)
-                    if not html_content:
-                        continue
-                else:
-                    response = requests.get(search_url, headers=self.get_random_headers(), timeout=10)
-                    if response.status_code != 200:
-                        logger.warning(f"请求失败，状态码: {response.status_code}")
-                        continue
-                    html_content = response.text
-                
-                soup = BeautifulSoup(html_content, 'html.parser')
-                
-                # 解析搜索结果
-                if search_engine == "google":
-                    # 更新选择器以适应Google的新HTML结构
-                    search_results = soup.select('div[class*="g"]')
-                    if not search_results:
-                        # 备用选择器
-                        search_results = soup.select('div[data-hveid]')
-                        if not search_results:
-                            # 第二备用选择器
-                            search_results = soup.select('div.MjjYud')
-                    
-                    if not search_results:
-                        logger.warning(f"页面 {page} 未找到搜索结果")
-                        continue
-                    
-                    for index, result in enumerate(search_results):
-                        # 提取链接和标题
-                        link_element = result.select_one('a[href]')
-                        if not link_element:
-                            continue
-                            
-                        link = link_element.get('href', '')
-                        
-                        # 有时Google会在URL前添加/url?q=
-                        if link.startswith('/url?q='):
-                            link = link.split('/url?q=')[1].split('&')[0]
-                        
-                        # 提取标题
-                        title_element = result.select_one('h3')
-                        title = title_element.get_text() if title_element else "无标题"
-                        
-                        # 计算实际排名
-                        rank = index + 1 + (page - 1) * 10
-                        
-                        # 检查是否是目标网站
-                        if self.target_domain in link:
-                            keyword_data['found'] = True
-                            keyword_data['rank'] = rank
-                            keyword_data['page'] = page
-                            keyword_data['url'] = link
-                            logger.info(f"在结果中找到目标网站: 排名 #{rank}, 页面 #{page}, URL: {link}")
-                            
-                            # 模拟用户点击和浏览行为
-                            if self.use_browser:
-                                self._simulate_user_browsing(link)
-                        
-                        # 收集竞争对手数据
-                        if not self.target_domain in link:
-                            keyword_data['competitors'].append({
-                                'rank': rank,
-                                'title': title,
-                                'url': link
-                            })
-                elif search_engine == "bing":
-                    # 必应搜索结果解析逻辑
-                    search_results = soup.select('li.b_algo')
-                    
-                    for index, result in enumerate(search_results):
-                        link_element = result.select_one('a')
-                        if not link_element:
-                            continue
-                            
-                        link = link_element.get('href', '')
-                        
-                        # 提取标题
-                        title = link_element.get_text() if link_element else "无标题"
-                        
-                        # 计算实际排名
-                        rank = index + 1 + (page - 1) * 10
-                        
-                        # 检查是否是目标网站
-                        if self.target_domain in link:
-                            keyword_data['found'] = True
-                            keyword_data['rank'] = rank
-                            keyword_data['page'] = page
-                            keyword_data['url'] = link
-                            logger.info(f"在必应结果中找到目标网站: 排名 #{rank}, 页面 #{page}, URL: {link}")
-                        
-                        # 收集竞争对手数据
-                        if not self.target_domain in link:
-                            keyword_data['competitors'].append({
-                                'rank': rank,
-                                'title': title,
-                                'url': link
-                            })
-                
-                # 如果已经找到目标网站，可以提前退出循环
-                if keyword_data['found']:
-                    break
-                    
-                # 随机延迟，避免被搜索引擎检测为自动脚本
-                delay_time = random.uniform(self.delay_min, self.delay_max)
-                logger.info(f"等待 {delay_time:.2f} 秒后继续...")
-                time.sleep(delay_time)
-                
-            except Exception as e:
-                logger.error(f"处理关键词 '{keyword}' 时出错: {str(e)}")
-                # 遇到错误时的延迟时间也相应减少
-                time.sleep(random.uniform(self.delay_min, self.delay_max * 1.5))
-        
-        return keyword_data
+        shard_size = args.shard_size or config.get('shard_size', 50)
+        count = queue.create(keywords_list, shard_size, settings)
+        logger.info(f"已写入任务队列 {queue_path}: {count} 个分片, 每个最多 {shard_size} 个关键词")
     
-    def analyze_keywords(self, keywords_list, search_engine="google", num_pages=10):
-        """
-        分析多个关键词的排名
-        
-        参数:
-            keywords_list (list): 要分析的关键词列表
-            search_engine (str): 使用的搜索引擎
-            num_pages (int): 要检查的页数
-            
-        返回:
-            pandas.DataFrame: 包含所有关键词排名数据的DataFrame
-        """
-        self.results = []
-        
-        for keyword in keywords_list:
-            result = self.search_keyword(keyword, search_engine, num_pages)
-            self.results.append(result)
-            
-            # 减少延迟时间
-            delay_time = random.uniform(self.delay_min, self.delay_max)
-            logger.info(f"分析下一个关键词前等待 {delay_time:.2f} 秒...")
-            time.sleep(delay_time)
-        
-        # 将结果转换为DataFrame
-        df_results = pd.DataFrame([{
-            'keyword': r['keyword'],
-            'found': r['found'],
-            'rank': r['rank'],
-            'page': r['page'],
-            'url': r['url'],
-            'competitor_count': len(r['competitors']),
-        } for r in self.results])
-        
-        return df_results
+    if args.submit_only:
+        queue.close()
+        return 0
     
-    def export_results(self, filename="seo_analysis_results.xlsx"):
-        """
-        将结果导出到Excel文件
-        
-        参数:
-            filename (str): 输出文件名
-        """
-        if not self.results:
-            logger.warning("没有可导出的结果")
-            return
-            
-        # 创建一个Excel writer对象
-        writer = pd.ExcelWriter(filename, engine='openpyxl')
-        
-        # 主结果表
-        main_results = pd.DataFrame([{
-            'keyword': r['keyword'],
-            'found': r['found'],
-            'rank': r['rank'],
-            'page': r['page'],
-            'url': r['url'],
-            'competitor_count': len(r['competitors']),
-        } for r in self.results])
-        
-        main_results.to_excel(writer, sheet_name='主要结果', index=False)
-        
-        # 为每个关键词创建单独的竞争对手表
-        for result in self.results:
-            keyword = result['keyword']
-            sheet_name = f"{keyword[:28]}竞争对手" if len(keyword) > 28 else f"{keyword}竞争对手"
-            
-            if result['competitors']:
-                competitors_df = pd.DataFrame(result['competitors'])
-                competitors_df.to_excel(writer, sheet_name=sheet_name, index=False)
-        
-        # 保存文件
-        writer.close()
-        logger.info(f"结果已导出到 {filename}")
-        
-        return filename
+    # 等待所有分片完成
+    last = None
+    while True:
+        progress = queue.progress()
+        if progress != last:
+            logger.info(_format_progress(progress))
+            last = progress
+        if progress['done'] == progress['total']:
+            break
+        time.sleep(args.poll)
+    
+    settings = queue.settings()
+    summary = export_queue_results(queue, output, competitor_layout)
+    if store_path:
+        store = RankStore(store_path)
+        run_id = store.start_run(settings['created_at'])
+        ranking_count, competitor_count = store.save_results(run_id, queue.iter_results(), settings['created_at'])
+        store.close()
+        logger.info(f"已写入历史排名库 {store_path}: run {run_id}, 排名 {ranking_count} 行, 竞争对手 {competitor_count} 行")
+    queue.close()
+    
+    if summary:
+        _log_run_summary(summary, settings['domains'])
+    return 0
 
-    def __del__(self):
-        """析构函数，确保浏览器正确关闭"""
-        if self.driver:
-            try:
-                self.driver.quit()
-            except:
-                pass
 
-def load_config(config_file='config.yaml'):
+def worker_main(argv):
+    """多进程运行的工作子命令: 从任务队列领取分片执行，结果写回队列"""
+    parser = argparse.ArgumentParser(prog='seo-research-tool.py worker',
+                                     description='从任务队列领取关键词分片执行，结果写回队列')
+    parser.add_argument('--config', '-c', type=str, default='config.yaml',
+                        help='配置文件路径，只使用其中的抓取设置 (默认: config.yaml)')
+    parser.add_argument('--queue', '-q', type=str,
+                        help='任务队列路径 (默认: seo_jobs.db)')
+    parser.add_argument('--worker-id', type=str,
+                        help='工作进程标识 (默认: 主机名-进程号)')
+    parser.add_argument('--lease', type=float,
+                        help='分片租约时长(秒)，执行期间自动续约，进程失联超过该时长后分片被重新领取 (默认: 600)')
+    parser.add_argument('--poll', type=float, default=10,
+                        help='没有可领取的分片时的等待间隔(秒) (默认: 10)')
+    parser.add_argument('--exit-when-idle', action='store_true',
+                        help='没有可领取的分片时立即退出，不等待其他工作进程')
+    parser.add_argument('--daily-budget', type=int,
+                        help='同一队列所有工作进程合计的每个搜索主机每天的请求数上限，0为不限 (默认: 0)')
+    _add_tool_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    config = load_config(args.config)
+    queue_path = args.queue or config.get('queue', 'seo_jobs.db')
+    lease_seconds = args.lease or config.get('lease', 600)
+    worker_id = args.worker_id or f"{platform.node()}-{os.getpid()}"
+    daily_budget = args.daily_budget if args.daily_budget is not None else config.get('daily_budget', 0)
+    if not os.path.exists(queue_path):
+        logger.error(f"任务队列 {queue_path} 不存在，请先运行 coordinator")
+        return 1
+    
+    queue = JobQueue(queue_path)
+    settings = queue.settings()
+    if not settings:
+        logger.error(f"任务队列 {queue_path} 中没有任务")
+        return 1
+    
+    metrics = Metrics()
+    # 限速和每日预算记在队列里，多开工作进程不会加快对同一搜索主机的请求
+    tool = _build_tool(args, config, settings['domains'], settings['regions'][0], metrics,
+                       daily_budget=daily_budget, queue=queue)
+    logger.info(f"[{worker_id}] 开始处理任务队列 {queue_path}")
+    with tool:
+        finished = run_worker(queue, tool, worker_id, lease_seconds, args.poll, args.exit_when_idle)
+    queue.close()
+    
+    logger.info(f"[{worker_id}] 完成 {finished} 个分片")
+    _log_metrics_summary(metrics)
+    return 0
+
+
+def _day_start(ts):
+    """ts所在本地日期的零点"""
+    t = time.localtime(ts)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+class _DaemonDay:
+    """常驻模式一天的输出: 当天的结果日志、历史排名库中的run、列式文件和Excel"""
+
+    def __init__(self, now, output, store=None, columnar_dir=None, columnar_format='parquet'):
+        self.start = _day_start(now)
+        # 加26小时再取零点，夏令时切换的日子也落在第二天
+        self.end = _day_start(self.start + 26 * 3600)
+        stamp = time.strftime('%Y%m%d', time.localtime(self.start))
+        base = os.path.splitext(output)[0]
+        self.output = f"{base}.{stamp}.xlsx"
+        # 同一天重启时在当天的日志上继续
+        self.journal = ResultJournal(f"{base}.{stamp}.journal.jsonl", resume=True)
+        self.store = store
+        self.run_id = store.start_run(now, 'daemon') if store is not None else None
+        self.columnar = ColumnarWriter(columnar_dir, columnar_format, now) if columnar_dir else None
+        self.checked = 0
+
+    def record(self, tool, record):
+        """写入一条结果: 历史排名库、结果日志和列式文件"""
+        if self.store is not None:
+            # 竞争对手曝光在当天结束时汇总一次，不必每条结果都重新汇总整个run
+            self.store.save_results(self.run_id, [record], self.start, refresh_share=False)
+        tool.record_result(record)
+        self.checked += 1
+
+    def close(self, competitor_layout='auto'):
+        """关闭当天的文件，并从结果日志导出当天每个任务最新一次的结果"""
+        if self.store is not None:
+            self.store.refresh_share(self.run_id)
+        if self.columnar is not None:
+            self.columnar.close()
+        self.journal.close()
+        path = self.journal.path
+        if self.checked or os.path.getsize(path):
+            export_record_stream(lambda: ResultJournal.read_latest(path), self.output, competitor_layout)
+
+
+def run_daemon(tool, scheduler, output, store=None, columnar_dir=None, columnar_format='parquet',
+               competitor_layout='auto', stop=None, status_interval=600):
     """
-    从配置文件加载配置
+    常驻运行: 按计划持续检查关键词，直到stop被设置
+    
+    工具实例、连接池和解析器在整个运行期间保持复用。到期的任务提交到线程池，
+    每日请求预算由工具的限速器在每个真实请求（含重试和大页请求）放行前扣除；
+    主机当天剩余的预算不够一个任务的页数时，该任务推迟到第二天零点，
+    执行中途用完预算的任务其余页面记为未完成，按计划在下一次检查时重试。
+    结果按本地日期轮换写入当天的结果日志、历史排名库的run和列式文件，
+    日期切换和退出时导出当天的Excel。
     
     参数:
-        config_file (str): 配置文件路径
-        
+        tool (SEOResearchTool): 工具实例，其输出由本函数通过set_outputs按天替换
+        scheduler (KeywordScheduler): 检查计划
+        output (str): 输出文件名，实际文件名带日期，如 results.20240101.xlsx
+        store (RankStore): 历史排名库，None时只在内存中记录排名波动
+        stop (threading.Event): 设置后等待进行中的任务完成再退出
+        status_interval (float): 打印运行状态的间隔(秒)
+    
     返回:
-        dict: 包含配置的字典
+        int: 完成的检查次数
     """
-    if not os.path.exists(config_file):
-        logger.warning(f"配置文件 {config_file} 不存在，将使用默认配置")
-        return {}
-        
-    try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            if config_file.endswith('.yaml') or config_file.endswith('.yml'):
-                config = yaml.safe_load(f)
-            elif config_file.endswith('.json'):
-                config = json.load(f)
-            else:
-                logger.error(f"不支持的配置文件格式: {config_file}")
-                return {}
+    stop = stop or threading.Event()
+    limiter = tool.rate_limiter
+    hosts = {}
+    in_flight = {}
+    exhausted = set()
+    checked = 0
+    day = None
+    last_status = time.time()
+    
+    def task_host(task):
+        _, search_engine, region, _ = task
+        if (search_engine, region) not in hosts:
+            hosts[search_engine, region] = tool.search_host(search_engine, region)
+        return hosts[search_engine, region]
+    
+    def open_day(now):
+        day = _DaemonDay(now, output, store, columnar_dir, columnar_format)
+        # 结果逐条写入当天的日志，不在内存中保留
+        tool.set_outputs(day.journal, day.columnar)
+        logger.info(f"开始 {time.strftime('%Y-%m-%d', time.localtime(day.start))} 的检查，"
+                    f"结果写入 {day.journal.path}")
+        return day
+    
+    def finish(future):
+        # run_task 不会抛出异常，失败的任务也返回一条结果
+        nonlocal checked
+        task = in_flight.pop(future)
+        record = future.result()
+        day.record(tool, record)
+        scheduler.complete(task, record)
+        checked += 1
+    
+    def log_status(now):
+        used = limiter.requests_today()
+        budget = ', '.join(f"{host} {used.get(host, 0)}" + (f"/{limiter.daily_budget}" if limiter.daily_budget else '')
+                           for host in sorted(set(hosts.values())))
+        until = scheduler.seconds_until_due(now)
+        logger.info(f"已完成 {checked} 次检查，进行中 {len(in_flight)}，计划中 {len(scheduler)}，"
+                    f"下一个到期 {0 if until is None else until / 60:.0f} 分钟后；今日请求: {budget or '无'}")
+    
+    with ThreadPoolExecutor(max_workers=tool.workers) as executor:
+        try:
+            while not stop.is_set():
+                now = time.time()
+                if day is None or now >= day.end:
+                    # 日期切换: 先让进行中的任务写入前一天
+                    for future in list(in_flight):
+                        finish(future)
+                    if day is not None:
+                        day.close(competitor_layout)
+                    day = open_day(now)
+                    exhausted.clear()
                 
-        logger.info(f"已从 {config_file} 加载配置")
-        return config
-    except Exception as e:
-        logger.error(f"读取配置文件 {config_file} 时出错: {str(e)}")
-        return {}
+                # 提交到期的任务
+                while len(in_flight) < tool.workers:
+                    task = scheduler.pop_due(now)
+                    if task is None:
+                        break
+                    host, pages = task_host(task), task[3]
+                    # 限速器在每个请求放行前扣除预算，这里只挡住当天已经不够一个任务的主机；
+                    # 并发的任务用完剩余预算时，其余页面记为未完成，不会超出预算
+                    remaining = limiter.remaining_today(host)
+                    if remaining is not None and remaining < pages:
+                        if host not in exhausted:
+                            exhausted.add(host)
+                            logger.warning(f"{host} 今日请求已达上限 {limiter.daily_budget}，该主机的关键词推迟到明天")
+                        scheduler.push(task, day.end)
+                        continue
+                    future = executor.submit(tool.run_task, task[0], task[1], pages, task[2])
+                    in_flight[future] = task
+                
+                # 等待任务完成或下一个任务到期，最长等待一段时间以便检查stop和日期
+                timeout = min(5.0, max(day.end - now, 0.0))
+                until = scheduler.seconds_until_due(now)
+                if until is not None and len(in_flight) < tool.workers:
+                    timeout = min(timeout, until)
+                if in_flight:
+                    done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(future)
+                else:
+                    stop.wait(timeout)
+                
+                if time.time() - last_status >= status_interval:
+                    last_status = time.time()
+                    log_status(last_status)
+        except KeyboardInterrupt:
+            logger.info("收到中断信号，等待进行中的任务完成...")
+        finally:
+            for future in list(in_flight):
+                finish(future)
+            if day is not None:
+                log_status(time.time())
+                day.close(competitor_layout)
+    return checked
+
+
+def daemon_main(argv):
+    """常驻子命令: 保持工具实例常驻，按排名波动和上次检查时间持续调度关键词"""
+    parser = argparse.ArgumentParser(prog='seo-research-tool.py daemon',
+                                     description='常驻运行，按排名波动和距上次检查的时间持续检查关键词，'
+                                                 '每个搜索主机每天的请求数不超过预算')
+    parser.add_argument('--config', '-c', type=str, default='config.yaml',
+                        help='配置文件路径 (默认: config.yaml)')
+    parser.add_argument('--domain', '-d', type=str,
+                        help='要分析的目标域名，多个用逗号分隔，第一个为主域名')
+    parser.add_argument('--keywords', '-k', type=str,
+                        help='要分析的关键词，用逗号分隔')
+    parser.add_argument('--keywords-file', type=str,
+                        help='关键词文件 (CSV/TSV/TXT)，启动时读取，CSV可按行覆盖搜索引擎、区域和页数')
+    parser.add_argument('--region', '-r', type=str,
+                        help='Google搜索的区域，多个区域用逗号分隔')
+    parser.add_argument('--search-engine', '-s', type=str,
+                        help='使用的搜索引擎 (google, bing)，多个引擎用逗号分隔')
+    parser.add_argument('--pages', '-p', type=int,
+                        help='要检查的搜索结果页数')
+    parser.add_argument('--output', '-o', type=str,
+                        help='输出文件名，每天的结果写入带日期的文件，如 结果.20240101.xlsx')
+    parser.add_argument('--competitor-layout', type=str, choices=['auto', 'sheets', 'long'],
+                        help='竞争对手的导出方式 (默认: auto)')
+    parser.add_argument('--store', type=str,
+                        help='历史排名库路径，每天的结果写入一个run，启动时据此恢复检查计划 (建议设置)')
+    parser.add_argument('--columnar-dir', type=str,
+                        help='同时把结果写成列式文件的目录，每天一个分区')
+    parser.add_argument('--columnar-format', type=str, choices=list(ColumnarWriter.FORMATS),
+                        help='列式文件格式 (默认: parquet)')
+    parser.add_argument('--interval', type=float,
+                        help='排名稳定的关键词的检查间隔(小时)，排名波动越大间隔越短 (默认: 24)')
+    parser.add_argument('--min-interval', type=float,
+                        help='最短检查间隔(小时) (默认: 1)')
+    parser.add_argument('--daily-budget', type=int,
+                        help='每个搜索主机每天的请求数上限，0为不限 (默认: 1000)')
+    parser.add_argument('--metrics-port', type=int,
+                        help='在该端口提供Prometheus格式的 /metrics')
+    _add_tool_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    config = load_config(args.config)
+    domains = _split_list(args.domain or config.get('domains') or config.get('domain'))
+    regions = _split_list(args.region or config.get('region', 'com'))
+    search_engines = _split_list(args.search_engine or config.get('search_engine', 'google'))
+    pages = args.pages or config.get('pages', 3)
+    output = args.output or config.get('output', 'seo_analysis_results.xlsx')
+    competitor_layout = args.competitor_layout or config.get('competitor_layout', 'auto')
+    store_path = args.store or config.get('store')
+    columnar_dir = args.columnar_dir or config.get('columnar_dir')
+    columnar_format = args.columnar_format or config.get('columnar_format', 'parquet')
+    interval = args.interval or config.get('interval', 24)
+    min_interval = args.min_interval or config.get('min_interval', 1)
+    daily_budget = args.daily_budget if args.daily_budget is not None else config.get('daily_budget', 1000)
+    metrics_port = args.metrics_port or config.get('metrics_port')
+    
+    unsupported = [e for e in search_engines if e not in SERP_SELECTORS]
+    if unsupported or not search_engines:
+        logger.error(f"不支持的搜索引擎: {', '.join(unsupported)}")
+        return 1
+    if not domains:
+        logger.error("未提供目标域名，请通过命令行参数 --domain 或配置文件指定")
+        return 1
+    keywords_list = _load_keywords(args.keywords, config, args.keywords_file)
+    if keywords_list is None:
+        return 1
+    if columnar_dir:
+        # 启动时检查pyarrow、格式和目录，不必等到第一天的文件打开时才报错
+        try:
+            ColumnarWriter.check(columnar_dir, columnar_format)
+        except (ImportError, ValueError) as e:
+            logger.error(str(e))
+            return 1
+    
+    store = None
+    history = {}
+    if store_path:
+        store = RankStore(store_path)
+        history = store.scan_history(domains[0], keep=10)
+    else:
+        logger.warning("未设置历史排名库 (--store)，重启后所有关键词立即重新检查")
+    
+    metrics = Metrics()
+    metrics_server = None
+    if metrics_port:
+        metrics_server = metrics.serve(metrics_port)
+        logger.info(f"指标地址: http://127.0.0.1:{metrics_port}/metrics")
+    tool = _build_tool(args, config, domains, regions[0], metrics, daily_budget=daily_budget)
+    scheduler = KeywordScheduler(tool.iter_tasks(keywords_list, search_engines, regions, pages),
+                                 history, interval * 3600, min_interval * 3600)
+    logger.info(f"常驻运行: {len(scheduler)} 个任务，其中 {scheduler.due_count(time.time())} 个已到期；检查间隔 {interval} 小时"
+                f"(最短 {min_interval} 小时)，每个主机每天最多 {daily_budget or '不限'} 次请求")
+    
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    with tool:
+        checked = run_daemon(tool, scheduler, output, store, columnar_dir, columnar_format,
+                             competitor_layout, stop)
+    if store is not None:
+        store.close()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    logger.info(f"常驻运行结束，共完成 {checked} 次检查")
+    _log_metrics_summary(metrics)
+    return 0
+
+
+# 子命令: python seo-research-tool.py <子命令> ...
+SUBCOMMANDS = {
+    'bench': bench_main,
+    'history': history_main,
+    'coordinator': coordinator_main,
+    'worker': worker_main,
+    'analytics': analytics_main,
+    'daemon': daemon_main,
+}
+
 
 def main():
     """主函数，处理命令行参数并执行分析"""
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        return SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+    
     parser = argparse.ArgumentParser(description='SEO关键词研究与排名分析工具')
     
     parser.add_argument('--config', '-c', type=str, default='config.yaml',
                         help='配置文件路径 (默认: config.yaml)')
     
     parser.add_argument('--domain', '-d', type=str,
-                        help='要分析的目标域名 (例如 example.com)')
+                        help='要分析的目标域名，多个用逗号分隔，第一个为主域名 (例如 example.com,rival.com)')
     
     parser.add_argument('--keywords', '-k', type=str,
                         help='要分析的关键词，用逗号分隔 (例如 "SEO优化,网站推广,网络营销")')
     
+    parser.add_argument('--keywords-file', type=str,
+                        help='关键词文件 (CSV/TSV/TXT)，边读边查，按行去重；CSV的 search_engine、region、pages 列可按行覆盖设置')
+    
     parser.add_argument('--region', '-r', type=str,
-                        help='Google搜索的区域 (例如: com, com.hk, co.jp)')
+                        help='Google搜索的区域，多个区域用逗号分隔 (例如: com, com.hk, co.jp)')
     
     parser.add_argument('--search-engine', '-s', type=str,
-                        choices=['google', 'bing'],
-                        help='使用的搜索引擎')
+                        help='使用的搜索引擎 (google, bing)，多个引擎用逗号分隔')
     
     parser.add_argument('--pages', '-p', type=int,
                         help='要检查的搜索结果页数')
     
-    parser.add_argument('--delay-min', type=float,
-                        help='请求之间的最小延迟(秒)')
-    
-    parser.add_argument('--delay-max', type=float,
-                        help='请求之间的最大延迟(秒)')
-    
     parser.add_argument('--output', '-o', type=str,
                         help='输出文件名')
     
-    parser.add_argument('--use-browser', '-b', action='store_true',
-                        help='使用浏览器模式进行搜索 (默认: False)')
+    _add_tool_arguments(parser)
+    
+    parser.add_argument('--journal', type=str,
+                        help='结果日志路径 (默认: 输出文件名.journal.jsonl)')
+    
+    parser.add_argument('--resume', action='store_true',
+                        help='继续上次中断的运行，跳过结果日志中已完成的关键词')
+    
+    parser.add_argument('--store', type=str,
+                        help='历史排名库路径，设置后每次运行的结果都会写入 (例如 seo_rank_history.db)')
+    
+    parser.add_argument('--competitor-layout', type=str, choices=['auto', 'sheets', 'long'],
+                        help='竞争对手的导出方式: sheets每个关键词一个工作表, long全部写在一个长表, '
+                             'auto关键词较多时自动使用长表 (默认: auto)')
+    
+    parser.add_argument('--columnar-dir', type=str,
+                        help='列式输出目录，设置后同时输出按运行分区的Parquet/Arrow数据集 (需要pyarrow)')
+    
+    parser.add_argument('--columnar-format', type=str, choices=list(ColumnarWriter.FORMATS),
+                        help='列式输出格式 (默认: parquet)')
+    
+    parser.add_argument('--adaptive', action='store_true',
+                        help='自适应扫描: 按历史排名库中上次的排名先请求预测的页，连续多次未找到的关键词降低检查频率 (需要 --store)')
+    
+    parser.add_argument('--adaptive-skip-after', type=int,
+                        help='自适应扫描中连续多少次未找到后开始跳过 (默认: 3)')
+    
+    parser.add_argument('--adaptive-recheck-days', type=float,
+                        help='自适应扫描中跳过的关键词每隔多少天复查一次 (默认: 7)')
+    
+    parser.add_argument('--analytics', action='store_true',
+                        help='运行结束后按主机分析竞争对手 (可见度、曝光份额、关键词重叠)，并写入"竞争对手分析"表')
+    
+    parser.add_argument('--metrics-file', type=str,
+                        help='运行结束时把各环节耗时等指标以Prometheus文本格式写入此文件')
+    
+    parser.add_argument('--metrics-port', type=int,
+                        help='运行期间在 127.0.0.1:<端口>/metrics 提供Prometheus指标')
     
     args = parser.parse_args()
     
@@ -511,71 +4929,127 @@ def main():
     config = load_config(args.config)
     
     # 命令行参数优先于配置文件，配置文件优先于默认值
-    domain = args.domain or config.get('domain')
-    keywords_str = args.keywords or config.get('keywords')
+    domain = args.domain or config.get('domains') or config.get('domain')
+    domains = _split_list(domain)
     region = args.region or config.get('region', 'com')
     search_engine = args.search_engine or config.get('search_engine', 'google')
     pages = args.pages or config.get('pages', 3)
-    delay_min = args.delay_min or config.get('delay_min', 0.5)
-    delay_max = args.delay_max or config.get('delay_max', 1.5)
     output = args.output or config.get('output', 'seo_analysis_results.xlsx')
-    use_browser = args.use_browser or config.get('use_browser', False)
+    journal_path = args.journal or config.get('journal') or f"{os.path.splitext(output)[0]}.journal.jsonl"
+    resume = args.resume or config.get('resume', False)
+    store_path = args.store or config.get('store')
+    competitor_layout = args.competitor_layout or config.get('competitor_layout', 'auto')
+    columnar_dir = args.columnar_dir or config.get('columnar_dir')
+    columnar_format = args.columnar_format or config.get('columnar_format', 'parquet')
+    adaptive = args.adaptive or config.get('adaptive', False)
+    adaptive_skip_after = args.adaptive_skip_after or config.get('adaptive_skip_after', 3)
+    adaptive_recheck_days = args.adaptive_recheck_days or config.get('adaptive_recheck_days', 7)
+    analytics = args.analytics or config.get('analytics', False)
+    metrics_file = args.metrics_file or config.get('metrics_file')
+    metrics_port = args.metrics_port or config.get('metrics_port')
+    regions = _split_list(region)
+    search_engines = _split_list(search_engine)
     
     # 参数验证
-    if not domain:
-        logger.error("未提供目标域名，请通过命令行参数 --domain 或配置文件指定")
+    unsupported = [e for e in search_engines if e not in SERP_SELECTORS]
+    if unsupported or not search_engines:
+        logger.error(f"不支持的搜索引擎: {', '.join(unsupported) or search_engine}")
         return
-        
-    if not keywords_str and not (config.get('keywords_list') or config.get('keywords')):
-        logger.error("未提供关键词，请通过命令行参数 --keywords 或配置文件指定")
+    
+    if not domains:
+        logger.error("未提供目标域名，请通过命令行参数 --domain 或配置文件指定")
         return
     
     # 处理关键词
-    if keywords_str:
-        # 从命令行参数获取关键词列表
-        keywords_list = [k.strip() for k in keywords_str.split(',')]
-    elif isinstance(config.get('keywords'), str):
-        # 配置文件中的关键词是字符串
-        keywords_list = [k.strip() for k in config['keywords'].split(',')]
-    elif isinstance(config.get('keywords_list'), list):
-        # 配置文件中的关键词是列表
-        keywords_list = config['keywords_list']
-    else:
-        logger.error("无法解析关键词列表")
+    keywords_list = _load_keywords(args.keywords, config, args.keywords_file)
+    if keywords_list is None:
         return
     
-    logger.info(f"开始分析域名 {domain} 的 {len(keywords_list)} 个关键词...")
-    logger.info(f"使用搜索引擎: {search_engine}, 区域: {region}, 检查页数: {pages}")
+    if isinstance(keywords_list, list):
+        logger.info(f"开始分析域名 {', '.join(domains)} 的 {len(keywords_list)} 个关键词...")
+    else:
+        logger.info(f"开始分析域名 {', '.join(domains)} 的关键词...")
     
     # 创建SEO研究工具实例
-    tool = SEOResearchTool(domain, delay_min, delay_max, region, use_browser)
+    started_at = time.time()
+    columnar = None
+    if columnar_dir:
+        try:
+            columnar = ColumnarWriter(columnar_dir, columnar_format, started_at)
+        except (ImportError, ValueError) as e:
+            logger.error(str(e))
+            return
+    journal = ResultJournal(journal_path, resume)
+    metrics = Metrics()
+    metrics_server = None
+    if metrics_port:
+        metrics_server = metrics.serve(metrics_port)
+        logger.info(f"指标地址: http://127.0.0.1:{metrics_port}/metrics")
+    planner = None
+    if adaptive and not store_path:
+        logger.warning("自适应扫描需要历史排名库 (--store)，本次从第1页开始顺序扫描")
+    elif adaptive:
+        store = RankStore(store_path)
+        history = store.scan_history(domains[0], max(adaptive_skip_after, 1))
+        store.close()
+        planner = ScanPlanner(history, adaptive_skip_after, adaptive_recheck_days * 86400)
+        logger.info(f"自适应扫描: 历史排名库中有 {len(history)} 个关键词的记录")
+    tool = _build_tool(args, config, domains, regions[0], metrics, journal, columnar, planner)
+    if planner is not None and tool.planner is None:
+        logger.warning("大页模式下不使用自适应扫描")
+    logger.info(f"使用搜索引擎: {', '.join(search_engines)}, 区域: {', '.join(regions)}, "
+                f"检查页数: {pages}, 并发数: {tool.workers}")
+    
+    # 分析关键词，完成后立即关闭浏览器和连接
+    with tool:
+        summary = tool.check_keywords(keywords_list, search_engines, pages, regions)
+    if columnar is not None:
+        columnar.close()
+        logger.info(f"列式结果已写入 {columnar.paths['results']} 和 {columnar.paths['competitors']}")
+    
+    # 写入历史排名库
+    if store_path:
+        store = RankStore(store_path)
+        run_id = store.start_run(started_at)
+        ranking_count, competitor_count = store.save_results(run_id, tool.iter_full_results(), started_at)
+        store.close()
+        logger.info(f"已写入历史排名库 {store_path}: run {run_id}, 排名 {ranking_count} 行, 竞争对手 {competitor_count} 行")
     
-    # 分析关键词
-    results_df = tool.analyze_keywords(keywords_list, search_engine, pages)
+    # 竞争对手分析
+    analytics_table = tool.competitor_analytics() if analytics and tool.results else None
     
     # 导出结果
-    output_file = tool.export_results(output)
+    output_file = tool.export_results(output, competitor_layout, analytics_table)
+    journal.close()
     
     logger.info("分析完成!")
     logger.info(f"结果已保存到: {output_file}")
     
-    # 打印摘要
-    found_count = results_df['found'].sum()
-    logger.info("\n关键词排名摘要:")
-    logger.info(f"- 分析的关键词总数: {len(keywords_list)}")
-    logger.info(f"- 在搜索结果中找到的关键词数: {found_count}")
-    logger.info(f"- 未找到的关键词数: {len(keywords_list) - found_count}")
+    if tool.cache is not None:
+        logger.info(f"缓存命中 {tool.cache.hits} 页, 未命中 {tool.cache.misses} 页")
+    if not tool.use_browser:
+        connection_stats = tool.fetcher.connection_stats()
+        logger.info(f"HTTP请求 {connection_stats['requests']} 次, 新建连接 {connection_stats['connections']} 个, "
+                    f"复用连接 {connection_stats['reused']} 次")
     
-    if found_count > 0:
-        avg_rank = results_df.loc[results_df['found'], 'rank'].mean()
-        logger.info(f"- 平均排名位置: {avg_rank:.2f}")
-        
-        # 打印排名靠前的关键词
-        top_keywords = results_df.loc[results_df['found']].sort_values('rank').head(5)
-        if not top_keywords.empty:
-            logger.info("\n排名最好的关键词:")
-            for _, row in top_keywords.iterrows():
-                logger.info(f"- '{row['keyword']}': #{row['rank']} (第{row['page']}页)")
+    if tool.planner is not None:
+        scanned = metrics.counter('scan_pages_total')
+        fetched, sequential = scanned.get('fetched', 0), scanned.get('sequential', 0)
+        skipped = sum(metrics.counter('keywords_skipped_total').values())
+        logger.info(f"自适应扫描: 请求 {fetched} 页, 从第1页顺序扫描需要 {sequential} 页, "
+                    f"节省 {sequential - fetched} 次请求 (其中跳过 {skipped} 个连续多次未找到的关键词)")
+    
+    _log_metrics_summary(metrics)
+    if metrics_file:
+        metrics.write_textfile(metrics_file)
+        logger.info(f"指标已写入 {metrics_file}")
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    
+    # 打印摘要
+    _log_run_summary(summary, tool.target_domains)
+    if analytics_table is not None:
+        _log_analytics(analytics_table.head(10))
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
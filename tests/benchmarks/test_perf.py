@@ -0,0 +1,113 @@
+"""
+pytest-benchmark 性能基准，与本机保存的基线对比防止性能回退
+
+    # 在本机记录基线（保存在 .benchmarks/，不提交）
+    python -m pytest tests/benchmarks --benchmark-autosave
+    # 之后与最近一次保存的基线对比，中位数慢20%以上时失败
+    python -m pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=median:20%
+
+耗时与机器的CPU和负载相关，基线只在同一台机器上对比才有意义，所以不提交到仓库。
+导出的峰值内存与机器无关，直接断言上限。
+"""
+import os
+import tracemalloc
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+FIXTURE_PAGES = [
+    ('google_mjjyud_p1.html', 'google'),
+    ('google_hveid_p1.html', 'google'),
+    ('bing_b_algo_p1.html', 'bing'),
+]
+
+EXPORT_SIZES = [100, 1000, 10000]
+
+# 导出是流式的，峰值内存不随关键词数增长；留出足够余量，只拦住退回整表在内存中的实现
+EXPORT_PEAK_MB = {'excel': 8, 'parquet': 32}
+
+
+@pytest.mark.parametrize('backend', ['lxml', 'bs4'])
+@pytest.mark.parametrize('name, engine', FIXTURE_PAGES, ids=[name for name, _ in FIXTURE_PAGES])
+def test_parse(benchmark, seo, serp_fixture, backend, name, engine):
+    extractor = seo.SERPExtractor(backend)
+    if extractor.backend != backend:
+        pytest.skip("未安装lxml")
+    html = serp_fixture(name)
+    results = benchmark(extractor.extract, html, engine)
+    assert len(results) == 10
+
+
+def test_match(benchmark, seo, serp_fixture):
+    extractor = seo.SERPExtractor()
+    links = [link for name, engine in FIXTURE_PAGES
+             for _, _, link in extractor.extract(serp_fixture(name), engine)]
+    matcher = seo.DomainMatcher(['example.com', 'zhihu.com', 'wikipedia.org', 'nowhere.invalid'])
+
+    def match_all():
+        return [matcher.match(link) for link in links]
+
+    matched = benchmark(match_all)
+    assert matched.count('example.com') == 3
+
+
+def test_end_to_end(benchmark, make_tool):
+    """模拟服务器上20个关键词、每个3页，目标域名不在样本中，每个关键词都翻满3页"""
+    keywords = [f"关键词{i}" for i in range(20)]
+
+    def run():
+        tool = make_tool(['nowhere.invalid'], workers=4)
+        return tool.check_keywords(keywords, 'google', 3)
+
+    summary = benchmark.pedantic(run, rounds=5, warmup_rounds=1)
+    assert len(summary) == 20
+
+
+def _export(seo, fmt, directory, size, summary):
+    """把size个关键词的模拟结果逐条导出，结果由生成器产生，和从结果日志读取时一样不整表留在内存中"""
+    records = seo._synthetic_results(size)
+    if fmt == 'excel':
+        seo.export_excel(os.path.join(directory, 'benchmark.xlsx'), summary, records, size, 'long')
+        return
+    writer = seo.ColumnarWriter(directory, fmt)
+    for record in records:
+        writer.write(record)
+    writer.close()
+
+
+@pytest.fixture(scope='module')
+def export_summaries(seo):
+    """各规模的摘要行，不计入导出的耗时和内存"""
+    return {size: seo._summary_rows([seo._without_competitors(record) for record in seo._synthetic_results(size)])
+            for size in EXPORT_SIZES}
+
+
+@pytest.mark.parametrize('fmt', ['excel', 'parquet'])
+@pytest.mark.parametrize('size', EXPORT_SIZES)
+def test_export(benchmark, seo, tmp_path_factory, export_summaries, fmt, size):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+
+    def run():
+        _export(seo, fmt, str(tmp_path_factory.mktemp('export')), size, export_summaries[size])
+
+    # 1万个关键词的Excel导出要数十秒，大规模只跑一轮
+    benchmark.pedantic(run, rounds=3 if size <= 1000 else 1)
+
+
+@pytest.mark.parametrize('fmt', ['excel', 'parquet'])
+@pytest.mark.parametrize('size', EXPORT_SIZES)
+def test_export_peak_memory(seo, tmp_path, tmp_path_factory, export_summaries, fmt, size):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    # 先导出一条，openpyxl、pyarrow的模块导入不计入
+    _export(seo, fmt, str(tmp_path_factory.mktemp('warmup')), 1, export_summaries[EXPORT_SIZES[0]][:1])
+    tracemalloc.start()
+    try:
+        _export(seo, fmt, str(tmp_path), size, export_summaries[size])
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+    print(f"{fmt} {size} 个关键词: 峰值内存 {peak_mb:.1f} MB")
+    assert peak_mb < EXPORT_PEAK_MB[fmt]
@@ -0,0 +1,58 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'fixtures', 'serp')
+
+
+def _load_tool_module():
+    """脚本文件名带连字符，不能直接import，按路径加载一次"""
+    if 'seo_research_tool' not in sys.modules:
+        spec = importlib.util.spec_from_file_location('seo_research_tool',
+                                                      os.path.join(ROOT, 'seo-research-tool.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['seo_research_tool'] = module
+        spec.loader.exec_module(module)
+    return sys.modules['seo_research_tool']
+
+
+@pytest.fixture(scope='session')
+def seo():
+    return _load_tool_module()
+
+
+@pytest.fixture(scope='session')
+def serp_fixture():
+    """按文件名读取 fixtures/serp 中的结果页"""
+    def read(name):
+        with open(os.path.join(FIXTURES, name), 'rb') as f:
+            return f.read()
+    return read
+
+
+@pytest.fixture
+def stand_in(seo, serp_fixture):
+    """返回谷歌样本页（第1、2页交替）的本地模拟搜索服务器"""
+    pages = {'google': [serp_fixture('google_mjjyud_p1.html'), serp_fixture('google_mjjyud_p2.html')],
+             'bing': [serp_fixture('bing_b_algo_p1.html'), serp_fixture('bing_b_algo_p2.html')]}
+    with seo.StandInSearchServer(pages=pages) as server:
+        yield server
+
+
+@pytest.fixture
+def make_tool(seo, stand_in):
+    """创建指向模拟服务器、请求间不延迟的SEOResearchTool"""
+    tools = []
+
+    def make(domains=('example.com',), **kwargs):
+        kwargs.setdefault('workers', 2)
+        tool = seo.SEOResearchTool(list(domains), 0, 0, **kwargs)
+        tool.search_endpoints = stand_in.search_endpoints()
+        tools.append(tool)
+        return tool
+    yield make
+    for tool in tools:
+        tool.close()
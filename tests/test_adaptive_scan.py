@@ -0,0 +1,40 @@
+"""自适应扫描的页码顺序与失败页记录"""
+
+
+def test_scan_order(seo):
+    assert seo._scan_order(3, 5) == [3, 2, 4, 1, 5]
+    assert seo._scan_order(1, 3) == [1, 2, 3]
+    assert seo._scan_order(9, 5) == [5, 4, 3, 2, 1]
+
+
+def test_circuit_open_marks_only_unfetched_pages(seo, make_tool):
+    tool = make_tool(['nowhere.invalid'])
+    calls = []
+    fetch = tool._get_results_page
+
+    def get_results_page(keyword, search_engine, region, start, num, budget=None):
+        page = start // 10 + 1
+        calls.append(page)
+        if page == 2:
+            raise seo.FetchError('circuit_open', "熔断")
+        return fetch(keyword, search_engine, region, start, num, budget)
+
+    tool._get_results_page = get_results_page
+    result = tool.search_keyword('seo', 'google', 5, predicted_page=3)
+    # 第3页已取到；第2页熔断，之后的4、1、5页不再请求
+    assert calls == [3, 2]
+    assert result['incomplete_pages'] == [1, 2, 4, 5]
+
+
+def test_failed_page_in_order_mode_is_recorded_once(seo, make_tool):
+    tool = make_tool(['nowhere.invalid'])
+    fetch = tool._get_results_page
+
+    def get_results_page(keyword, search_engine, region, start, num, budget=None):
+        if start // 10 + 1 == 4:
+            raise seo.FetchError('server', "状态码 500", 500)
+        return fetch(keyword, search_engine, region, start, num, budget)
+
+    tool._get_results_page = get_results_page
+    result = tool.search_keyword('seo', 'google', 5, predicted_page=3)
+    assert result['incomplete_pages'] == [4]
@@ -0,0 +1,72 @@
+"""competitor_frame 与 competitor_analytics 的分组汇总"""
+import pytest
+
+pytest.importorskip('pandas')
+
+
+def _record(seo, rank, competitors):
+    return {
+        'keyword': 'kw', 'search_engine': 'google', 'region': 'com',
+        'rankings': [{'domain': 'example.com', 'found': rank is not None, 'rank': rank}],
+        'competitors': [seo.Competitor(r, '', f'https://{host}/{r}') for r, host in competitors],
+    }
+
+
+@pytest.fixture
+def analytics(seo):
+    """
+    4个结果: 主域名排第3、未找到、排第1，最后一个结果没有任何竞争对手。
+    a.com 在第一个结果里出现两次（按最好的第1名计），www. 前缀归到同一主机。
+    """
+    results = [
+        _record(seo, 3, [(1, 'a.com'), (2, 'b.com'), (5, 'www.a.com')]),
+        _record(seo, None, [(4, 'a.com'), (12, 'c.com')]),
+        _record(seo, 1, [(6, 'b.com')]),
+        _record(seo, None, []),
+    ]
+    frame, task_count = seo.competitor_frame(results)
+    assert task_count == 4
+    assert len(frame) == 8
+    return frame, task_count
+
+
+def test_competitor_analytics_by_hand(seo, analytics):
+    table = seo.competitor_analytics(*analytics, 'example.com')
+    assert list(table.columns) == seo.ANALYTICS_COLUMNS
+    assert list(table['host']) == ['example.com', 'a.com', 'b.com', 'c.com']
+    rows = {row['host']: row for row in seo._analytics_rows(table)}
+
+    ours = rows['example.com']
+    assert ours['tracked'] and (ours['keywords'], ours['hits'], ours['best_rank'], ours['top10']) == (2, 2, 1, 2)
+    assert ours['avg_rank'] == 2.0
+    assert ours['visibility'] == pytest.approx((1 / 3 + 1) / 4)
+    assert (ours['overlap'], ours['outranks']) == (0, 0)
+
+    a = rows['a.com']
+    assert not a['tracked'] and (a['keywords'], a['hits'], a['best_rank'], a['top10']) == (2, 3, 1, 2)
+    assert a['avg_rank'] == 2.5
+    assert (a['overlap'], a['outranks']) == (1, 1)
+
+    b = rows['b.com']
+    assert (b['keywords'], b['hits'], b['avg_rank'], b['overlap'], b['outranks']) == (2, 2, 4.0, 2, 1)
+
+    c = rows['c.com']
+    assert (c['keywords'], c['avg_rank'], c['top10'], c['overlap']) == (1, 12.0, 0, 0)
+
+    # 可见度之和为 (4/3 + 5/4 + 2/3 + 1/12) / 4 = 10/9，份额按它归一
+    shares = {host: row['share_of_voice'] for host, row in rows.items()}
+    assert shares == pytest.approx({'example.com': 0.4, 'a.com': 0.375, 'b.com': 0.2, 'c.com': 0.025})
+
+
+def test_top_hosts_keep_share_of_all_hosts(seo, analytics):
+    table = seo.competitor_analytics(*analytics, 'example.com', limit=3)
+    assert list(table['host']) == ['example.com', 'a.com', 'b.com']
+    # 份额仍按全部主机计算，前3名合计不是100%
+    assert table['share_of_voice'].sum() == pytest.approx(0.975)
+
+
+def test_empty_frame(seo):
+    frame, task_count = seo.competitor_frame([_record(seo, None, [])])
+    assert task_count == 1
+    table = seo.competitor_analytics(frame, task_count, 'example.com')
+    assert table.empty and list(table.columns) == seo.ANALYTICS_COLUMNS
@@ -0,0 +1,88 @@
+"""浏览器模式: 用假浏览器代替Chrome测试浏览器池和关键词对浏览器的占用"""
+import itertools
+
+import pytest
+
+pytest.importorskip('selenium')
+
+
+class FakeDriver:
+    """只实现工具用到的WebDriver接口，get返回模拟服务器上的页面"""
+    ids = itertools.count(1)
+
+    def __init__(self, fetch):
+        self.id = next(self.ids)
+        self.fetch = fetch
+        self.crashed = False
+        self.crash_on_get = False
+        self.current_url = None
+        self.page_source = ''
+        self.current_window_handle = 'serp'
+        self.window_handles = ['serp']
+
+    def get(self, url):
+        if self.crash_on_get:
+            self.crashed = True
+        if self.crashed:
+            raise RuntimeError("浏览器已崩溃")
+        self.current_url = url
+        self.page_source = self.fetch(url)
+
+    def find_element(self, by, value):
+        return object()
+
+    def execute_script(self, script, *args):
+        if self.crashed:
+            raise RuntimeError("浏览器已崩溃")
+        return 1
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def browser_tool(seo, make_tool):
+    class FakePool(seo.BrowserPool):
+        def _create_driver(self):
+            return FakeDriver(lambda url: tool.fetcher.get(url)[1])
+
+    tool = make_tool(workers=2)
+    tool.browser_pool = FakePool(tool.workers, tool.user_agents)
+    tool.use_browser = True
+    yield tool
+    tool.browser_pool.close()
+    tool.browser_pool = None
+
+
+def test_browsing_uses_the_driver_showing_the_serp(browser_tool, monkeypatch):
+    clicked = []
+    monkeypatch.setattr(browser_tool, '_simulate_user_browsing',
+                        lambda url, driver: clicked.append((url, driver.current_url)))
+    result = browser_tool.search_keyword('seo', 'google', 2)
+    assert result['rankings'][0]['rank'] == 5
+    [(url, shown)] = clicked
+    assert url == 'https://www.example.com/seo-guide'
+    assert shown == browser_tool._build_search_url('seo', 'google', 0, 'com')
+
+
+def test_keyword_keeps_one_driver_and_returns_it(browser_tool):
+    tool = browser_tool
+    tool.target_domains[:] = ['nowhere.invalid']
+    tool.domain_matcher = type(tool.domain_matcher)(tool.target_domains)
+    tool.search_keyword('seo', 'google', 2)
+    assert len(tool.browser_pool._drivers) == 1
+    assert len(tool.browser_pool._idle) == 1
+    assert tool._browser_local.driver is None
+
+
+def test_crashed_driver_is_replaced_for_the_remaining_pages(seo, browser_tool):
+    tool = browser_tool
+    driver = tool.browser_pool.checkout()
+    driver.crash_on_get = True
+    tool.browser_pool.checkin(driver)
+    tool.retry_budget = 2
+    result = tool.search_keyword('seo', 'google', 1)
+    # 第一次请求在崩溃的浏览器上失败，重试时换了新浏览器
+    assert result['rankings'][0]['rank'] == 5
+    assert driver not in tool.browser_pool._drivers
+    assert len(tool.browser_pool._drivers) == 1
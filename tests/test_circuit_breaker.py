@@ -0,0 +1,82 @@
+"""CircuitBreaker 与抓取路径中的熔断"""
+
+
+def test_breaker_opens_and_recovers_after_probe(seo):
+    breaker = seo.CircuitBreaker(threshold=2, cooldown=0)
+    assert breaker.allow('h')
+    assert not breaker.record_failure('h')
+    assert breaker.record_failure('h')
+    # 冷却期过后只放行一个试探请求
+    assert breaker.allow('h')
+    assert not breaker.allow('h')
+    breaker.record_success('h')
+    assert breaker.allow('h') and breaker.allow('h')
+
+
+def test_failed_probe_reopens(seo):
+    breaker = seo.CircuitBreaker(threshold=1, cooldown=0)
+    breaker.record_failure('h')
+    assert breaker.allow('h')
+    assert breaker.record_failure('h')
+    assert breaker.allow('h')
+
+
+def test_released_probe_allows_next_probe(seo):
+    breaker = seo.CircuitBreaker(threshold=1, cooldown=0)
+    breaker.record_failure('h')
+    assert breaker.allow('h')
+    breaker.release('h')
+    assert breaker.allow('h')
+
+
+def test_local_error_during_probe_does_not_wedge_host(seo, make_tool):
+    tool = make_tool(breaker=seo.CircuitBreaker(threshold=1, cooldown=0), retry_budget=0)
+    host = seo.urlsplit(tool.search_endpoints['google']).netloc
+    tool.breaker.record_failure(host)
+
+    calls = []
+    extract = tool._extract
+
+    def failing_once(html, engine):
+        calls.append(engine)
+        if len(calls) == 1:
+            raise RuntimeError("解析进程异常")
+        return extract(html, engine)
+
+    tool._extract = failing_once
+    first = tool.search_keyword('seo', 'google', 1)
+    assert first['incomplete_pages'] == [1]
+    # 试探请求因本地错误失败后，之后的请求仍会被放行
+    second = tool.search_keyword('seo', 'google', 1)
+    assert second['rankings'][0]['rank'] == 5
+    assert len(calls) == 2
+
+
+def _end_early_server(seo, serp_fixture, tail):
+    """第1页有结果，之后的页面都是tail"""
+    return seo.StandInSearchServer(pages={'google': [serp_fixture('google_mjjyud_p1.html')] + [tail] * 5})
+
+
+def test_results_ending_partway_are_not_failures(seo, serp_fixture, make_tool):
+    tool = make_tool(['nowhere.invalid'], breaker=seo.CircuitBreaker(threshold=1, cooldown=60))
+    with _end_early_server(seo, serp_fixture, b'<html><body><p>No more results</p></body></html>') as server:
+        tool.search_endpoints = server.search_endpoints()
+        host = tool.search_host('google')
+        result = tool.search_keyword('long tail keyword', 'google', 6)
+    # 第2页为空即结果末尾: 不重试、不算未完成、不计入熔断
+    assert result['incomplete_pages'] == []
+    assert not result['rankings'][0]['found']
+    assert tool.rate_limiter.requests_today() == {host: 2}
+    assert tool.breaker.allow(host)
+
+
+def test_blocked_empty_page_is_retried(seo, serp_fixture, make_tool):
+    tool = make_tool(['nowhere.invalid'], retry_budget=1)
+    tool._retry_delay = lambda attempt, kind: 0
+    blocked = b'<html><body><form action="/sorry/index"><div class="g-recaptcha"></div></form></body></html>'
+    with _end_early_server(seo, serp_fixture, blocked) as server:
+        tool.search_endpoints = server.search_endpoints()
+        host = tool.search_host('google')
+        result = tool.search_keyword('seo', 'google', 2)
+    assert result['incomplete_pages'] == [2]
+    assert tool.rate_limiter.requests_today() == {host: 3}
@@ -0,0 +1,54 @@
+"""列式输出"""
+import pytest
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def test_resume_writes_only_current_keywords_once(seo, make_tool, tmp_path):
+    journal_path = str(tmp_path / 'run.journal.jsonl')
+    first = seo.ColumnarWriter(str(tmp_path / 'dataset'), 'parquet', 1700000000)
+    tool = make_tool(journal=seo.ResultJournal(journal_path), columnar=first)
+    tool.check_keywords(['a', 'b', 'c'], 'google', 2)
+    first.close()
+    tool.journal.close()
+
+    # 两次继续运行，只保留其中一个关键词
+    for run_ts in (1700000100, 1700000200):
+        columnar = seo.ColumnarWriter(str(tmp_path / 'dataset'), 'parquet', run_ts)
+        tool = make_tool(journal=seo.ResultJournal(journal_path, resume=True), columnar=columnar)
+        tool.check_keywords(['b'], 'google', 2)
+        columnar.close()
+        tool.journal.close()
+        table = pq.read_table(columnar.paths['results'])
+        assert table.column('keyword').to_pylist() == ['b']
+
+
+def test_check_creates_nothing(seo, tmp_path):
+    directory = tmp_path / 'dataset' / 'nested'
+    seo.ColumnarWriter.check(str(directory), 'arrow')
+    assert list(tmp_path.iterdir()) == []
+    with pytest.raises(ValueError):
+        seo.ColumnarWriter.check(str(directory), 'csv')
+    # 路径上已有同名文件
+    (tmp_path / 'taken').write_text('')
+    with pytest.raises(ValueError):
+        seo.ColumnarWriter.check(str(tmp_path / 'taken' / 'dataset'), 'parquet')
+
+
+def test_daemon_validates_columnar_settings_without_writing(seo, tmp_path):
+    config = tmp_path / 'config.yaml'
+    config.write_text('columnar_format: csv\n', encoding='utf-8')
+    argv = ['--config', str(config), '--domain', 'example.com', '--keywords', 'seo',
+            '--columnar-dir', str(tmp_path / 'dataset')]
+    assert seo.daemon_main(argv) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['config.yaml']
+
+
+def test_runs_in_the_same_second_get_separate_partitions(seo, tmp_path):
+    directory = str(tmp_path / 'dataset')
+    writers = [seo.ColumnarWriter(directory, 'parquet', 1700000000.25) for _ in range(2)]
+    assert writers[0].partition.startswith('run=20231114T221320.250000Z-')
+    assert writers[0].paths['results'] != writers[1].paths['results']
+    for writer in writers:
+        writer.close()
+    assert len(list((tmp_path / 'dataset' / 'results').iterdir())) == 2
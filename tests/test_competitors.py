@@ -0,0 +1,23 @@
+"""Competitor 与竞争对手字符串共享"""
+
+
+def test_library_use_shares_competitor_strings(make_tool):
+    tool = make_tool(['nowhere.invalid'])
+    tool.check_keywords(['a', 'b'], 'google', 1)
+    first, second = (record['competitors'] for record in tool.results)
+    assert first[0].url == second[0].url
+    assert first[0].url is second[0].url
+
+
+def test_journal_run_does_not_pin_strings(seo, make_tool, tmp_path):
+    tool = make_tool(journal=seo.ResultJournal(str(tmp_path / 'run.journal.jsonl')))
+    assert tool._strings is None
+    tool.check_keywords(['a'], 'google', 1)
+    assert 'competitors' not in tool.results[0]
+    tool.journal.close()
+
+
+def test_competitor_json_roundtrip(seo):
+    competitor = seo.Competitor(3, '标题', 'https://example.org/')
+    assert seo.Competitor.from_json([3, '标题', 'https://example.org/']) == competitor
+    assert seo.Competitor.from_json({'rank': 3, 'title': '标题', 'url': 'https://example.org/'}) == competitor
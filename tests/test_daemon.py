@@ -0,0 +1,54 @@
+"""常驻模式: 每日请求预算与检查计划"""
+import threading
+
+import pytest
+
+
+def test_limiter_budget_counts_every_request(seo):
+    limiter = seo.HostRateLimiter(0, 0, daily_budget=2)
+    limiter.acquire('www.google.com')
+    limiter.acquire('www.google.com')
+    with pytest.raises(seo.FetchError) as excinfo:
+        limiter.acquire('www.google.com')
+    assert excinfo.value.kind == 'budget'
+    # 其他主机的预算互不影响
+    limiter.acquire('www.bing.com')
+    assert limiter.requests_today() == {'www.google.com': 2, 'www.bing.com': 1}
+    assert limiter.remaining_today('www.google.com') == 0
+    assert seo.HostRateLimiter(0, 0).remaining_today('www.google.com') is None
+
+
+def test_budget_exhausted_mid_keyword_marks_rest_incomplete(make_tool):
+    tool = make_tool(['nowhere.invalid'], daily_budget=1)
+    result = tool.search_keyword('seo', 'google', 3, 'com')
+    assert result['incomplete_pages'] == [2, 3]
+    host = tool.search_host('google', 'com')
+    assert tool.rate_limiter.requests_today() == {host: 1}
+
+
+def test_daemon_defers_tasks_over_budget(seo, make_tool, tmp_path):
+    tool = make_tool(daily_budget=2, workers=1)
+    tasks = tool.iter_tasks(['seo', 'python', 'rank'], ['google'], ['com'], 1)
+    scheduler = seo.KeywordScheduler(tasks, interval=86400, min_interval=3600)
+    stop = threading.Event()
+    timer = threading.Timer(1.5, stop.set)
+    timer.start()
+    try:
+        checked = seo.run_daemon(tool, scheduler, str(tmp_path / 'results.xlsx'), stop=stop)
+    finally:
+        timer.cancel()
+    host = tool.search_host('google', 'com')
+    assert checked == 2
+    assert tool.rate_limiter.requests_today() == {host: 2}
+    # 第三个关键词推迟到明天，前两个按间隔重新排入计划
+    assert len(scheduler) == 3
+    assert scheduler.due_count(seo.time.time()) == 0
+
+
+def test_scheduler_orders_by_due_time(seo):
+    scheduler = seo.KeywordScheduler([('a', 'google', 'com', 1), ('b', 'bing', None, 1)])
+    scheduler.push(('c', 'google', 'com', 1), 1e18)
+    assert scheduler.due_count(0) == 2
+    assert scheduler.pop_due(0) == ('a', 'google', 'com', 1)
+    assert scheduler.pop_due(0) == ('b', 'bing', None, 1)
+    assert scheduler.pop_due(0) is None
@@ -0,0 +1,42 @@
+"""DomainMatcher 的子域名、相似后缀与多个跟踪域名"""
+import pytest
+
+
+@pytest.fixture
+def matcher(seo):
+    return seo.DomainMatcher(['https://www.Example.com/path', 'blog.example.com', 'competitor.co.uk',
+                              'example.com', ' Other.org '])
+
+
+def test_domains_are_normalized_and_deduplicated(matcher):
+    assert matcher.domains == ['example.com', 'blog.example.com', 'competitor.co.uk', 'other.org']
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://example.com/', 'example.com'),
+    ('https://www.example.com/a?b=c', 'example.com'),
+    ('http://EXAMPLE.COM:8080/', 'example.com'),
+    ('https://shop.eu.example.com/item', 'example.com'),
+    # 嵌套的跟踪域名取最具体的那个
+    ('https://blog.example.com/post', 'blog.example.com'),
+    ('https://cdn.blog.example.com/img.png', 'blog.example.com'),
+    ('https://www.competitor.co.uk/', 'competitor.co.uk'),
+    ('https://other.org/', 'other.org'),
+])
+def test_subdomains_match_their_domain(matcher, url, expected):
+    assert matcher.match(url) == expected
+
+
+@pytest.mark.parametrize('url', [
+    'https://notexample.com/',
+    'https://example.com.evil.net/',
+    'https://example.co/',
+    'https://co.uk/',
+    'https://mycompetitor.co.uk/',
+    'https://www.google.com/url?q=https://example.com/',
+    '/relative/path',
+    'https://[invalid/',
+    '',
+])
+def test_look_alikes_and_invalid_urls_do_not_match(matcher, url):
+    assert matcher.match(url) is None
@@ -0,0 +1,70 @@
+"""export_excel 的工作表与 _unique_sheet_name 的表名限制"""
+import pytest
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+def _record(seo, keyword, competitors=2, engine='google', region='com'):
+    return {
+        'keyword': keyword, 'search_engine': engine, 'region': region, 'checked_at': 1700000000.0,
+        'rankings': [{'domain': 'example.com', 'found': True, 'rank': 1, 'page': 1,
+                      'url': 'https://example.com/'}],
+        'competitors': [seo.Competitor(rank, f'标题 {rank}', f'https://site{rank}.com/')
+                        for rank in range(2, 2 + competitors)],
+        'incomplete_pages': [],
+    }
+
+
+def test_unique_sheet_name_limits(seo):
+    used = {'主要结果', '竞争对手'}
+    long_keyword = 'how to choose the best running shoes for beginners'
+    first = seo._unique_sheet_name(long_keyword, '竞争对手', used)
+    assert len(first) == 31 and first == long_keyword[:27] + '竞争对手'
+    # 截断后重名时加序号，长度仍不超过31
+    second = seo._unique_sheet_name(long_keyword + ' 2024', '竞争对手', used)
+    assert second == long_keyword[:25] + '~2竞争对手' and len(second) == 31
+    third = seo._unique_sheet_name(long_keyword + ' 2025', '竞争对手', used)
+    assert third == long_keyword[:25] + '~3竞争对手'
+    # 非法字符替换为下划线；Excel表名不区分大小写
+    assert seo._unique_sheet_name('a/b:c?d*[e]\\f', '竞争对手', used) == 'a_b_c_d__e__f竞争对手'
+    assert seo._unique_sheet_name('SEO', '竞争对手', used) == 'SEO竞争对手'
+    assert seo._unique_sheet_name('seo', '竞争对手', used) == 'seo~2竞争对手'
+    # 与固定的表名冲突
+    assert seo._unique_sheet_name('', '竞争对手', used) == '~2竞争对手'
+
+
+def test_export_sheets_layout(seo, tmp_path):
+    results = [_record(seo, 'seo tools'), _record(seo, 'SEO Tools', 3), _record(seo, 'no competitors', 0),
+               _record(seo, 'x' * 40, 1)]
+    path = str(tmp_path / 'out.xlsx')
+    seo.export_excel(path, seo._summary_rows(results), results, len(results), 'sheets')
+    workbook = openpyxl.load_workbook(path)
+    assert workbook.sheetnames == ['主要结果', 'seo tools竞争对手', 'SEO Tools~2竞争对手', 'x' * 27 + '竞争对手']
+    summary = workbook['主要结果']
+    assert summary.max_row == 1 + len(results)
+    assert [cell.value for cell in summary[1]] == seo.SUMMARY_COLUMNS
+    assert workbook['SEO Tools~2竞争对手'].max_row == 1 + 3
+    assert [cell.value for cell in workbook['seo tools竞争对手'][2]] == [2, '标题 2', 'https://site2.com/']
+
+
+def test_export_long_layout_with_analytics(seo, tmp_path):
+    results = [_record(seo, f'关键词{i}', 3) for i in range(5)]
+    analytics = [dict.fromkeys(seo.ANALYTICS_COLUMNS, 0) | {'host': 'site2.com'}]
+    path = str(tmp_path / 'out.xlsx')
+    seo.export_excel(path, seo._summary_rows(results), iter(results), len(results), 'long',
+                     analytics_rows=analytics)
+    workbook = openpyxl.load_workbook(path)
+    assert workbook.sheetnames == ['主要结果', '竞争对手分析', '竞争对手']
+    competitors = workbook['竞争对手']
+    assert competitors.max_row == 1 + 5 * 3
+    assert [cell.value for cell in competitors[1]] == seo.COMPETITOR_COLUMNS
+    assert [cell.value for cell in competitors[2]][:4] == ['关键词0', 'google', 'com', 2]
+    assert workbook['竞争对手分析'].max_row == 2
+
+
+def test_auto_layout_switches_to_long(seo, tmp_path, monkeypatch):
+    monkeypatch.setattr(seo, 'MAX_COMPETITOR_SHEETS', 2)
+    results = [_record(seo, f'kw{i}') for i in range(3)]
+    path = str(tmp_path / 'out.xlsx')
+    seo.export_excel(path, seo._summary_rows(results), results, len(results))
+    assert openpyxl.load_workbook(path).sheetnames == ['主要结果', '竞争对手']
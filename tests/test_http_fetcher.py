@@ -0,0 +1,35 @@
+"""HTTPFetcher 的连接复用统计"""
+import pytest
+
+
+@pytest.mark.parametrize('http2', [False, True], ids=['requests', 'httpx'])
+def test_sequential_requests_reuse_one_connection(seo, http2):
+    if http2:
+        pytest.importorskip('h2')
+    fetcher = seo.HTTPFetcher(pool_size=2, http2=http2)
+    assert fetcher.http2 == http2
+    with seo.StandInSearchServer(b'<html>ok</html>') as server:
+        for i in range(20):
+            assert fetcher.get(f"{server.base_url}/search?q={i}") == (200, '<html>ok</html>')
+        stats = fetcher.connection_stats()
+    fetcher.close()
+    assert stats == {'requests': 20, 'connections': 1, 'reused': 19}
+
+
+def test_each_host_gets_its_own_connection(seo):
+    fetcher = seo.HTTPFetcher(pool_size=2)
+    with seo.StandInSearchServer() as first, seo.StandInSearchServer() as second:
+        for _ in range(5):
+            fetcher.get(first.base_url + '/')
+            fetcher.get(second.base_url + '/')
+        stats = fetcher.connection_stats()
+    fetcher.close()
+    assert stats == {'requests': 10, 'connections': 2, 'reused': 8}
+
+
+def test_tool_fetches_through_shared_pool(make_tool):
+    tool = make_tool(['nowhere.invalid'], workers=1)
+    tool.check_keywords(['a', 'b', 'c'], 'google', 2)
+    stats = tool.fetcher.connection_stats()
+    assert stats['requests'] == 6
+    assert stats['connections'] == 1
@@ -0,0 +1,91 @@
+"""JobQueue 的租约、日志模式与共享限速"""
+import sqlite3
+import threading
+
+import pytest
+
+
+SETTINGS = {'domains': ['example.com'], 'search_engines': ['google'], 'regions': ['com'],
+            'pages': 1, 'created_at': 1700000000.0}
+
+
+def test_queue_uses_rollback_journal(seo, tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    # 旧版本创建的WAL队列打开时改回回滚日志
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.close()
+    queue = seo.JobQueue(path)
+    assert queue._conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    queue.close()
+
+
+def test_concurrent_leases_never_share_a_shard(seo, tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    queue = seo.JobQueue(path)
+    assert queue.create((f"kw{i}" for i in range(200)), 5, SETTINGS) == 40
+    queue.close()
+
+    leased = []
+
+    def worker(name):
+        own = seo.JobQueue(path)
+        while True:
+            lease = own.lease(name, 600)
+            if lease is None:
+                break
+            leased.append(lease[0])
+        own.close()
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(leased) == sorted(set(leased))
+    assert len(leased) == 40
+
+
+def test_expired_lease_is_handed_out_again(seo, tmp_path):
+    queue = seo.JobQueue(str(tmp_path / 'jobs.db'))
+    queue.create(['a', 'b'], 10, SETTINGS)
+    shard_id, keywords, attempt = queue.lease('w1', -1)
+    assert (keywords, attempt) == (['a', 'b'], 1)
+    assert queue.lease('w2', 600) == (shard_id, ['a', 'b'], 2)
+    assert not queue.renew(shard_id, 'w1', 600)
+    queue.close()
+
+
+def test_rate_limit_and_budget_are_shared_between_processes(seo, tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    # 两个工作进程各自打开队列
+    first = seo.QueueRateLimiter(seo.JobQueue(path), 0.2, 0.2, daily_budget=3)
+    second = seo.QueueRateLimiter(seo.JobQueue(path), 0.2, 0.2, daily_budget=3)
+    started = seo.time.time()
+    first.acquire('www.google.com')
+    second.acquire('www.google.com')
+    first.acquire('www.google.com')
+    # 三个请求共用一条时间片链，间隔不因进程数而缩短
+    assert seo.time.time() - started >= 0.35
+    with pytest.raises(seo.FetchError) as excinfo:
+        second.acquire('www.google.com')
+    assert excinfo.value.kind == 'budget'
+    # 其他主机不受影响
+    assert second.acquire('www.bing.com') == 0
+    assert first.requests_today() == {'www.google.com': 3, 'www.bing.com': 1}
+    assert second.remaining_today('www.google.com') == 0
+    first.queue.close()
+    second.queue.close()
+
+
+def test_worker_uses_queue_limiter(seo, make_tool, tmp_path):
+    queue = seo.JobQueue(str(tmp_path / 'jobs.db'))
+    queue.create(['seo', 'python'], 1, SETTINGS)
+    tool = make_tool(rate_limiter=seo.QueueRateLimiter(queue, 0, 0))
+    assert seo.run_worker(queue, tool, 'w1', exit_when_idle=True) == 2
+    host = tool.search_host('google', 'com')
+    assert queue.requests_today() == {host: 2}
+    records = list(queue.iter_results())
+    assert [r['keyword'] for r in records] == ['seo', 'python']
+    assert records[0]['rankings'][0]['rank'] == 5
+    queue.close()
@@ -0,0 +1,57 @@
+"""iter_keyword_file 的规范化去重、按行覆盖设置与无效行"""
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_text_file_nfkc_and_case_dedupe(seo, tmp_path, caplog):
+    path = _write(tmp_path, 'keywords.txt',
+                  '# 注释行\nＳＥＯ　工具\n\nseo 工具\n  SEO   工具  \n关键词１\n关键词1\n')
+    caplog.set_level('INFO')
+    assert list(seo.iter_keyword_file(path)) == ['SEO 工具', '关键词1']
+    assert any('跳过 3 个重复的关键词' in record.getMessage() for record in caplog.records)
+    assert list(seo.iter_keyword_file(path, dedupe=False)) == ['SEO 工具', 'seo 工具', 'SEO 工具', '关键词1', '关键词1']
+
+
+def test_csv_overrides_and_invalid_rows(seo, tmp_path, caplog):
+    path = _write(tmp_path, 'keywords.csv', '\n'.join([
+        'Keyword,Search_Engine,Region,Pages',
+        'seo,google,com,2',
+        'seo,,,',
+        'SEO,GOOGLE,com,2',
+        'baidu only,yahoo,,',
+        'mixed,"google, yahoo",,',
+        'bad pages,,,abc',
+        'zero pages,,,0',
+        'negative pages,bing,,-3',
+        'bing deep,Bing,,5',
+        ',google,com,1',
+    ]) + '\n')
+    caplog.set_level('WARNING')
+    rows = list(seo.iter_keyword_file(path))
+    assert rows == [
+        {'keyword': 'seo', 'search_engine': 'google', 'region': 'com', 'pages': 2},
+        'seo',
+        'bad pages',
+        'zero pages',
+        {'keyword': 'negative pages', 'search_engine': 'bing'},
+        {'keyword': 'bing deep', 'search_engine': 'bing', 'pages': 5},
+    ]
+    warnings = [record.getMessage() for record in caplog.records]
+    assert sum('不支持的搜索引擎 yahoo' in message for message in warnings) == 2
+    assert sum('无效' in message for message in warnings) == 3
+    assert any('第 5 行' in message for message in warnings)
+
+
+def test_csv_without_header_uses_first_column(seo, tmp_path):
+    path = _write(tmp_path, 'keywords.tsv', 'seo\tignored\nrank tracker\t1\n')
+    assert list(seo.iter_keyword_file(path)) == ['seo', 'rank tracker']
+
+
+def test_bom_is_stripped(seo, tmp_path):
+    path = tmp_path / 'keywords.csv'
+    path.write_bytes('keyword,pages\nseo,3\n'.encode('utf-8-sig'))
+    assert list(seo.iter_keyword_file(str(path))) == [{'keyword': 'seo', 'pages': 3}]
@@ -0,0 +1,66 @@
+"""大页模式"""
+from urllib.parse import parse_qs, urlsplit
+
+
+def test_page_size_is_clamped_to_depth(make_tool):
+    tool = make_tool(large_pages=True)
+    assert tool._page_size('google', 300) == 100
+    assert tool._page_size('google', 30) == 30
+    assert tool._page_size('google', 10) == 10
+    assert tool._page_size('bing', 80) == 50
+    assert make_tool()._page_size('google', 300) == 10
+
+
+def _serp(links):
+    """只含自然结果的谷歌结果页"""
+    blocks = ''.join(f'<div class="MjjYud"><a href="{link}"><h3>{link}</h3></a></div>' for link in links)
+    return f'<html><body>{blocks}</body></html>'
+
+
+def test_short_large_page_keeps_probing_when_num_is_ignored(make_tool):
+    links = [f'https://site{rank}.test/' for rank in range(1, 26)]
+    links[18] = 'https://example.com/seo'
+    tool = make_tool(large_pages=True)
+    requested = []
+
+    def fetch_page(search_url, search_engine='google'):
+        # 忽略num参数，每次只返回9条
+        start = int(parse_qs(urlsplit(search_url).query)['start'][0])
+        requested.append(start)
+        return _serp(links[start:start + 9])
+
+    tool._fetch_page = fetch_page
+    result = tool.search_keyword('seo', 'google', 3)
+    assert result['rankings'][0]['rank'] == 19
+    assert result['incomplete_pages'] == []
+    assert requested == [0, 10]
+    assert 'google' not in tool._large_pages_ignored
+
+
+def test_short_page_is_last_once_num_is_honoured(make_tool):
+    tool = make_tool(large_pages=True)
+    assert tool._covered_results('google', 100, 9) == 10
+    assert tool._covered_results('google', 100, 57) == 100
+    # 参数有效后结果少于请求数就是最后一页，也不再计入忽略次数
+    for _ in range(5):
+        assert tool._covered_results('google', 100, 4) == 100
+    assert 'google' not in tool._large_pages_ignored
+
+
+def test_large_pages_disabled_after_consecutive_strikes(seo, make_tool):
+    tool = make_tool(large_pages=True)
+    # 不超过10条: 只按10条推进，连续多次才认定参数被忽略
+    for _ in range(seo.LARGE_PAGE_STRIKES - 1):
+        assert tool._covered_results('google', 100, 10) == 10
+    assert 'google' not in tool._large_pages_ignored
+    assert tool._covered_results('google', 100, 8) == 10
+    assert 'google' in tool._large_pages_ignored
+    assert tool._page_size('google', 300) == 10
+    assert 'bing' not in tool._large_pages_ignored
+
+
+def test_large_page_request_uses_clamped_num(make_tool):
+    tool = make_tool(large_pages=True)
+    result = tool.search_keyword('seo', 'google', 3)
+    assert result['rankings'][0]['rank'] == 5
+    assert '&num=30' in tool._build_search_url('seo', 'google', 0, 'com', tool._page_size('google', 30))
@@ -0,0 +1,82 @@
+"""Metrics 的直方图分位数与 Prometheus 文本输出"""
+import urllib.error
+import urllib.request
+
+import pytest
+
+
+@pytest.fixture
+def metrics(seo):
+    """fetch: 50个3ms、45个20ms、5个700ms；parse: 一个超出最大桶的120秒"""
+    metrics = seo.Metrics()
+    for seconds, times in ((0.003, 50), (0.02, 45), (0.7, 5)):
+        for _ in range(times):
+            metrics.observe('fetch', seconds)
+    metrics.observe('parse', 120.0)
+    metrics.inc('http_responses_total', 200, 97)
+    metrics.inc('http_responses_total', 429, 3)
+    metrics.inc('fetch_errors_total', 'throttled')
+    return metrics
+
+
+def test_summary_quantiles_are_bucket_upper_bounds(metrics):
+    rows = {row[0]: row[1:] for row in metrics.summary_rows()}
+    # 只列出有记录的环节
+    assert set(rows) == {'fetch', 'parse'}
+    count, total, mean_ms, p50_ms, p95_ms, max_ms = rows['fetch']
+    assert count == 100
+    assert total == pytest.approx(4.55)
+    assert mean_ms == pytest.approx(45.5)
+    assert (p50_ms, p95_ms) == pytest.approx((5.0, 25.0))
+    assert max_ms == pytest.approx(700.0)
+    # 落在+Inf桶里时用最大值
+    assert rows['parse'][3:] == pytest.approx((120000.0, 120000.0, 120000.0))
+
+
+def test_quantile_never_exceeds_maximum(seo):
+    metrics = seo.Metrics()
+    metrics.observe('match', 0.0002)
+    assert metrics.summary_rows()[0][4] == pytest.approx(0.2)
+
+
+def test_render_cumulative_buckets_and_counters(metrics):
+    lines = metrics.render().splitlines()
+    for line in [
+        'seo_phase_seconds_bucket{phase="fetch",le="0.001"} 0',
+        'seo_phase_seconds_bucket{phase="fetch",le="0.005"} 50',
+        'seo_phase_seconds_bucket{phase="fetch",le="0.025"} 95',
+        'seo_phase_seconds_bucket{phase="fetch",le="0.5"} 95',
+        'seo_phase_seconds_bucket{phase="fetch",le="1.0"} 100',
+        'seo_phase_seconds_bucket{phase="fetch",le="+Inf"} 100',
+        'seo_phase_seconds_sum{phase="fetch"} 4.550000',
+        'seo_phase_seconds_count{phase="fetch"} 100',
+        'seo_phase_seconds_bucket{phase="parse",le="60.0"} 0',
+        'seo_phase_seconds_bucket{phase="parse",le="+Inf"} 1',
+        'seo_phase_seconds_count{phase="keyword"} 0',
+        '# TYPE seo_http_responses_total counter',
+        'seo_http_responses_total{code="200"} 97',
+        'seo_http_responses_total{code="429"} 3',
+        'seo_fetch_errors_total{kind="throttled"} 1',
+    ]:
+        assert line in lines
+    assert lines[1] == '# TYPE seo_phase_seconds histogram'
+
+
+def test_textfile_and_http_endpoint(metrics, tmp_path):
+    path = tmp_path / 'seo.prom'
+    metrics.write_textfile(str(path))
+    assert path.read_text(encoding='utf-8') == metrics.render()
+    assert [p.name for p in tmp_path.iterdir()] == ['seo.prom']
+
+    server = metrics.serve(0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(base + '/metrics') as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert response.read().decode('utf-8') == metrics.render()
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(base + '/other')
+        assert excinfo.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
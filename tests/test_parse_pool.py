@@ -0,0 +1,44 @@
+"""ParsePool 在解析进程中的结果与进程内 SERPExtractor 一致"""
+import pytest
+
+PAGES = [
+    ('google_mjjyud_p1.html', 'google'),
+    ('google_mjjyud_p2.html', 'google'),
+    ('google_hveid_p1.html', 'google'),
+    ('google_hveid_p2.html', 'google'),
+    ('bing_b_algo_p1.html', 'bing'),
+    ('bing_b_algo_p2.html', 'bing'),
+]
+
+
+@pytest.fixture(scope='module')
+def pool(seo):
+    pool = seo.ParsePool(2)
+    yield pool
+    pool.close()
+
+
+@pytest.mark.parametrize('name, engine', PAGES)
+def test_pool_matches_in_process_extractor(seo, serp_fixture, pool, name, engine):
+    html = serp_fixture(name)
+    expected = seo.SERPExtractor().extract(html, engine)
+    assert len(expected) == 10
+    assert pool.extract(html, engine) == expected
+
+
+def test_concurrent_submissions_keep_page_order(seo, serp_fixture, pool):
+    pages = [(serp_fixture(name), engine) for name, engine in PAGES] * 3
+    futures = [pool.submit(html, engine) for html, engine in pages]
+    extractor = seo.SERPExtractor()
+    assert [f.result() for f in futures] == [extractor.extract(html, engine) for html, engine in pages]
+
+
+def test_tool_ranks_through_parse_pool(make_tool):
+    in_process = make_tool()
+    pooled = make_tool(parse_workers=2)
+    assert pooled.parse_pool is not None
+    keywords = ['seo', 'seo tools']
+    expected = in_process.check_keywords(keywords, 'google', 2)
+    results = pooled.check_keywords(keywords, 'google', 2)
+    assert results == expected
+    assert [row['rank'] for row in results] == [5, 5]
@@ -0,0 +1,92 @@
+"""RankStore 的排名走势、变化最大的关键词、曝光份额与 history 子命令"""
+import pytest
+
+
+def _record(seo, keyword, ts, rank, competitors=(), incomplete=()):
+    return {
+        'keyword': keyword, 'search_engine': 'google', 'region': 'com', 'checked_at': ts, 'pages': 3,
+        'rankings': [{'domain': 'example.com', 'found': rank is not None, 'rank': rank,
+                      'page': (rank - 1) // 10 + 1 if rank else None,
+                      'url': f'https://example.com/{keyword}' if rank else None}],
+        'competitors': [seo.Competitor(r, f'{host} {keyword}', f'https://{host}/{keyword}')
+                        for r, host in competitors],
+        'incomplete_pages': list(incomplete),
+    }
+
+
+@pytest.fixture
+def store_path(seo, tmp_path):
+    """两次运行: alpha 5->2, beta 12->未找到, gamma 未找到->30, delta 3->3"""
+    path = str(tmp_path / 'history.db')
+    store = seo.RankStore(path)
+    first = store.start_run(1000.0)
+    store.save_results(first, [
+        _record(seo, 'alpha', 1000.0, 5),
+        _record(seo, 'beta', 1000.0, 12),
+        _record(seo, 'gamma', 1000.0, None),
+        _record(seo, 'delta', 1000.0, 3),
+    ])
+    second = store.start_run(2000.0)
+    store.save_results(second, [
+        _record(seo, 'alpha', 2000.0, 2, [(1, 'a.com'), (3, 'b.com')]),
+        _record(seo, 'beta', 2000.0, None, [(2, 'a.com')]),
+        _record(seo, 'gamma', 2000.0, 30, [(1, 'c.org')]),
+        _record(seo, 'delta', 2000.0, 3),
+        # 有页面没取到时"未找到"不可靠，不写入
+        _record(seo, 'epsilon', 2000.0, None, incomplete=[2]),
+    ])
+    store.close()
+    return path
+
+
+def test_rank_history(seo, store_path):
+    store = seo.RankStore(store_path)
+    assert store.rank_history('www.example.com', 'alpha') == [
+        (1000.0, 1, 'google', 'com', 5, 1),
+        (2000.0, 2, 'google', 'com', 2, 1),
+    ]
+    assert store.rank_history('example.com', 'alpha', search_engine='bing') == []
+    assert store.rank_history('example.com', 'epsilon') == []
+    store.close()
+
+
+def test_movers_sign_and_order(seo, store_path):
+    store = seo.RankStore(store_path)
+    # 未找到按101名计；上升为正，按变化幅度排序，没有变化的不列出
+    assert store.movers('example.com') == [
+        ('beta', 'google', 'com', 12, None, -89),
+        ('gamma', 'google', 'com', None, 30, 71),
+        ('alpha', 'google', 'com', 5, 2, 3),
+    ]
+    assert store.movers('example.com', 1, 2, limit=1) == [('beta', 'google', 'com', 12, None, -89)]
+    # 反过来对比时符号相反
+    assert store.movers('example.com', 2, 1)[2] == ('alpha', 'google', 'com', 2, 5, -3)
+    store.close()
+
+
+def test_share_of_voice(seo, store_path):
+    store = seo.RankStore(store_path)
+    rows = {row[0]: row[1:] for row in store.share_of_voice()}
+    assert rows == {
+        'a.com': (2, 2, 1.5, 0.5),
+        'b.com': (1, 1, 3.0, 0.25),
+        'c.org': (1, 1, 1.0, 0.25),
+    }
+    assert store.share_of_voice()[0][0] == 'a.com'
+    # 第一次运行没有竞争对手
+    assert store.share_of_voice(1) == []
+    store.close()
+
+
+def test_history_subcommand(seo, store_path, caplog):
+    caplog.set_level('INFO')
+    seo.history_main(['movers', '--store', store_path, '--domain', 'example.com'])
+    seo.history_main(['rank', '--store', store_path, '--domain', 'example.com', '--keyword', 'beta'])
+    seo.history_main(['sov', '--store', store_path, '--limit', '1'])
+    lines = [record.getMessage() for record in caplog.records]
+    assert "- 'beta' [google/com]: #12 -> 未找到 (-89)" in lines
+    assert "- 'gamma' [google/com]: 未找到 -> #30 (+71)" in lines
+    assert "- 'alpha' [google/com]: #5 -> #2 (+3)" in lines
+    assert any(line.endswith("run 1 [google/com]: #12") for line in lines)
+    assert "- a.com: 50.0% (出现 2 次, 覆盖 2 个关键词, 平均排名 1.5)" in lines
+    assert sum(line.startswith('共 ') for line in lines) == 3
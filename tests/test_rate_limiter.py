@@ -0,0 +1,71 @@
+"""HostRateLimiter 的按主机间隔与主机之间互不阻塞"""
+import threading
+
+
+class FakeClock:
+    """手动推进的时钟，sleep直接把时间往后拨"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_requests_to_one_host_are_spaced(seo):
+    clock = FakeClock()
+    limiter = seo.HostRateLimiter(2, 2, clock=clock, sleep=clock.sleep)
+    assert limiter.acquire('www.google.com') == 0
+    assert limiter.acquire('www.google.com') == 2
+    assert limiter.acquire('www.google.com') == 2
+    assert clock.now == 104.0
+    # 距上一个时间片已超过间隔时不再等待
+    clock.now += 10
+    assert limiter.acquire('www.google.com') == 0
+
+
+def test_hosts_have_independent_slots(seo):
+    clock = FakeClock()
+    limiter = seo.HostRateLimiter(3, 3, clock=clock, sleep=clock.sleep)
+    limiter.acquire('www.google.com')
+    limiter.acquire('www.google.com.hk')
+    limiter.acquire('www.bing.com')
+    assert clock.sleeps == []
+    assert limiter.acquire('www.bing.com') == 3
+
+
+def test_backoff_pushes_only_that_host(seo):
+    clock = FakeClock()
+    limiter = seo.HostRateLimiter(1, 1, clock=clock, sleep=clock.sleep)
+    limiter.acquire('www.google.com')
+    limiter.acquire('www.bing.com')
+    limiter.backoff('www.google.com', 5)
+    assert limiter.acquire('www.bing.com') == 1
+    # 下一个时间片 101 推迟到 max(101, 101) + 5
+    assert limiter.acquire('www.google.com') == 5
+
+
+def test_waiting_thread_does_not_block_other_hosts(seo):
+    clock = FakeClock()
+    release = threading.Event()
+    waiting = threading.Event()
+
+    def sleep(seconds):
+        waiting.set()
+        release.wait(5)
+
+    limiter = seo.HostRateLimiter(10, 10, clock=clock, sleep=sleep)
+    limiter.acquire('www.google.com')
+    thread = threading.Thread(target=limiter.acquire, args=('www.google.com',))
+    thread.start()
+    assert waiting.wait(5)
+    # google的线程正在等时间片，bing照常放行
+    assert limiter.acquire('www.bing.com') == 0
+    release.set()
+    thread.join(5)
+    assert not thread.is_alive()
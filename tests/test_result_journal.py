@@ -0,0 +1,53 @@
+"""ResultJournal 的写入与继续运行"""
+import json
+
+import pytest
+
+
+def _record(seo, keyword):
+    return {
+        'keyword': keyword,
+        'search_engine': 'google',
+        'region': 'com',
+        'checked_at': 1700000000.0,
+        'rankings': [{'domain': 'example.com', 'found': True, 'rank': 3, 'page': 1,
+                      'url': 'https://example.com/'}],
+        'competitors': [seo.Competitor(1, '标题', 'https://other.example/')],
+        'incomplete_pages': [],
+    }
+
+
+def test_resume_after_torn_final_line(seo, tmp_path):
+    path = str(tmp_path / 'run.journal.jsonl')
+    journal = seo.ResultJournal(path)
+    journal.append(_record(seo, 'a'))
+    journal.close()
+    # 模拟写 'b' 时进程崩溃: 最后一行只写了一半，没有换行符
+    line = json.dumps(_record(seo, 'b'), ensure_ascii=False)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line[:len(line) // 2])
+
+    journal = seo.ResultJournal(path, resume=True)
+    journal.append(_record(seo, 'c'))
+    assert [record['keyword'] for record in journal] == ['a', 'c']
+    journal.close()
+
+
+@pytest.mark.parametrize('content', ['', '{"keyword": "torn'])
+def test_resume_on_empty_or_fully_torn_journal(seo, tmp_path, content):
+    path = tmp_path / 'run.journal.jsonl'
+    path.write_text(content, encoding='utf-8')
+    journal = seo.ResultJournal(str(path), resume=True)
+    journal.append(_record(seo, 'a'))
+    assert [record['keyword'] for record in journal] == ['a']
+    journal.close()
+
+
+def test_without_resume_clears_journal(seo, tmp_path):
+    path = str(tmp_path / 'run.journal.jsonl')
+    journal = seo.ResultJournal(path)
+    journal.append(_record(seo, 'a'))
+    journal.close()
+    journal = seo.ResultJournal(path)
+    assert list(journal) == []
+    journal.close()
@@ -0,0 +1,30 @@
+"""SERPCache 的读写与计数"""
+import threading
+
+
+def test_cache_roundtrip_and_counters(seo, tmp_path):
+    cache = seo.SERPCache(str(tmp_path))
+    key = seo.SERPCache.make_key('google', 'com', 'seo', 0)
+    assert cache.get(key) is None
+    cache.put(key, '<html>页面</html>')
+    assert cache.get(key) == '<html>页面</html>'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_counters_are_thread_safe(seo, tmp_path):
+    cache = seo.SERPCache(str(tmp_path))
+    key = seo.SERPCache.make_key('google', 'com', 'seo', 0)
+    cache.put(key, '<html></html>')
+    missing = seo.SERPCache.make_key('google', 'com', 'missing', 0)
+
+    def worker():
+        for _ in range(200):
+            cache.get(key)
+            cache.get(missing)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.hits, cache.misses) == (1600, 1600)
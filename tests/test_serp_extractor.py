@@ -0,0 +1,76 @@
+"""SERPExtractor 在离线结果页样本上的golden测试，lxml和BeautifulSoup两个后端结果必须完全一致"""
+import pytest
+
+PAGE_1 = [
+    (1, 'SEO优化到底怎么做？ - 知乎', 'https://www.zhihu.com/question/1234567'),
+    (2, '搜索引擎优化 (SEO) 新手指南 | Google 搜索中心',
+     'https://developers.google.com/search/docs/fundamentals/seo-starter-guide?hl=zh-cn'),
+    (3, 'SEO（搜索引擎优化）_百度百科', 'https://baike.baidu.com/item/SEO'),
+    (4, '搜索引擎优化 - 维基百科，自由的百科全书', 'https://zh.wikipedia.org/wiki/搜索引擎优化'),
+    (5, 'SEO 入门指南：从关键词研究到排名追踪 - Example', 'https://www.example.com/seo-guide'),
+    (6, "The Beginner's Guide to SEO - Moz", 'https://moz.com/beginners-guide-to-seo'),
+    (7, 'SEO基础：新手入门指南 - Ahrefs', 'https://ahrefs.com/zh/blog/seo-basics'),
+    (8, '什么是SEO？搜索引擎优化全面解析 - Semrush', 'https://www.semrush.com/blog/what-is-seo'),
+    (9, '前端开发者需要知道的SEO技巧 - 掘金', 'https://juejin.cn/post/7123456789'),
+    (10, '网站SEO优化的20个方法 - 博客园', 'https://www.cnblogs.com/someone/p/1234.html'),
+]
+
+PAGE_2 = [
+    (1, '给独立站做SEO，我踩过的那些坑 - 少数派', 'https://sspai.com/post/45678'),
+    (2, '2024年SEO趋势解读 - InfoQ', 'https://www.infoq.cn/article/seo-2024'),
+    (3, 'SEO关键词排名查询工具推荐 - CSDN博客', 'https://blog.csdn.net/user/article/details/1357'),
+    (4, '有没有好用的SEO排名查询工具？ - 豆瓣', 'https://www.douban.com/group/topic/2468'),
+    (5, 'seo-tools · GitHub Topics', 'https://github.com/topics/seo-tools'),
+    (6, '自建站SEO求助 - V2EX', 'https://www.v2ex.com/t/987654'),
+    (7, '搜索引擎优化 (SEO) 新手入门指南 - Search Console帮助',
+     'https://support.google.com/webmasters/answer/7451184?hl=zh-Hans'),
+    (8, '【SEO教程】从零开始学搜索引擎优化 - 哔哩哔哩', 'https://www.bilibili.com/video/BV1xx411c7mD'),
+    (9, 'SEO实战：三个月把流量翻倍 - 简书', 'https://www.jianshu.com/p/abcdef123'),
+    (10, '开源SEO工具汇总 - 开源中国', 'https://www.oschina.net/news/112233'),
+]
+
+
+def _replace(page, rank, url):
+    return [(r, title, url if r == rank else u) for r, title, u in page]
+
+
+# 无JS结构的链接是 /url?q= 跳转，q参数中的URL保持编码
+HVEID_PAGE_1 = _replace(_replace(PAGE_1, 2, 'https://developers.google.com/search/docs/fundamentals/'
+                                            'seo-starter-guide%3Fhl%3Dzh-cn'),
+                        4, 'https://zh.wikipedia.org/wiki/'
+                           '%E6%90%9C%E7%B4%A2%E5%BC%95%E6%93%8E%E4%BC%98%E5%8C%96')
+HVEID_PAGE_2 = _replace(PAGE_2, 7, 'https://support.google.com/webmasters/answer/7451184%3Fhl%3Dzh-Hans')
+
+GOLDEN = [
+    ('google_mjjyud_p1.html', 'google', PAGE_1),
+    ('google_mjjyud_p2.html', 'google', PAGE_2),
+    ('google_hveid_p1.html', 'google', HVEID_PAGE_1),
+    ('google_hveid_p2.html', 'google', HVEID_PAGE_2),
+    ('bing_b_algo_p1.html', 'bing', PAGE_1),
+    ('bing_b_algo_p2.html', 'bing', PAGE_2),
+]
+
+
+@pytest.mark.parametrize('backend', ['lxml', 'bs4'])
+@pytest.mark.parametrize('name, engine, expected', GOLDEN, ids=[g[0] for g in GOLDEN])
+def test_extract_golden(seo, serp_fixture, backend, name, engine, expected):
+    extractor = seo.SERPExtractor(backend)
+    if backend == 'lxml' and extractor.backend != 'lxml':
+        pytest.skip("未安装lxml")
+    assert extractor.extract(serp_fixture(name), engine) == expected
+
+
+@pytest.mark.parametrize('backend', ['lxml', 'bs4'])
+def test_extract_accepts_text(seo, serp_fixture, backend):
+    html = serp_fixture('google_mjjyud_p1.html').decode('utf-8')
+    assert seo.SERPExtractor(backend).extract(html, 'google') == PAGE_1
+
+
+def test_extract_empty_page(seo):
+    assert seo.SERPExtractor().extract('', 'google') == []
+    assert seo.SERPExtractor().extract('<html><body></body></html>', 'bing') == []
+
+
+def test_extract_unknown_engine(seo):
+    with pytest.raises(ValueError):
+        seo.SERPExtractor().extract('<html></html>', 'yahoo')